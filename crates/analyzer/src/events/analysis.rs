@@ -7,15 +7,15 @@
  */
 
 use fapolicy_trust::db::DB as TrustDB;
-use std::collections::hash_map::Entry;
+use rayon::prelude::*;
 use std::collections::HashMap;
 
 use crate::error::Error;
 use crate::error::Error::AnalyzerError;
 use crate::events::db::DB as EventDB;
-use crate::events::event::{Event, Perspective};
+use crate::events::event::{Event, Perspective, TimeRange};
 use fapolicy_rules::Decision::*;
-use fapolicy_rules::Permission;
+use fapolicy_rules::{Decision, Permission, SubjPart};
 use fapolicy_trust::stat::Status::{Discrepancy, Missing, Trusted};
 
 #[derive(Clone, Debug)]
@@ -42,57 +42,121 @@ pub struct ObjAnalysis {
     pub perm: String,
 }
 
+/// Summary of the decisions made for a subject across a set of events
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub struct SubjAccess {
+    pub allows: bool,
+    pub denials: bool,
+}
+
+impl SubjAccess {
+    fn record(&mut self, dec: &Decision) {
+        match dec {
+            Allow | AllowLog | AllowSyslog | AllowAudit => self.allows = true,
+            Deny | DenyLog | DenySyslog | DenyAudit => self.denials = true,
+        }
+    }
+
+    pub fn merge(&mut self, other: &SubjAccess) {
+        self.allows |= other.allows;
+        self.denials |= other.denials;
+    }
+
+    /// A for only allowed, D for only denied, P for partial
+    pub fn display(&self) -> &'static str {
+        match (self.allows, self.denials) {
+            (true, false) => "A",
+            (false, true) => "D",
+            _ => "P",
+        }
+    }
+}
+
+/// Summarize the access of each subject in a single pass over the events
+/// Events are scanned in parallel and the per-thread summaries merged.
+pub fn subject_access<'a, I>(events: I) -> HashMap<&'a str, SubjAccess>
+where
+    I: IntoParallelIterator<Item = &'a Event>,
+{
+    events
+        .into_par_iter()
+        .fold(HashMap::new, |mut acc: HashMap<&'a str, SubjAccess>, e| {
+            if let Some(exe) = subj_exe(e) {
+                acc.entry(exe).or_default().record(&e.dec);
+            }
+            acc
+        })
+        .reduce(HashMap::new, |mut lhs, rhs| {
+            for (exe, sa) in rhs {
+                lhs.entry(exe).or_default().merge(&sa);
+            }
+            lhs
+        })
+}
+
+// borrow the subject exe rather than cloning it for every event
+fn subj_exe(e: &Event) -> Option<&str> {
+    e.subj.parts.iter().find_map(|p| match p {
+        SubjPart::Exe(path) => Some(path.as_str()),
+        _ => None,
+    })
+}
+
 pub fn analyze(db: &EventDB, from: Perspective, trust: &TrustDB) -> Vec<Analysis> {
-    let fit_events: Vec<Event> = db.events.iter().cloned().filter(|e| from.fit(e)).collect();
-    let mut access_map: HashMap<String, String> = HashMap::new();
+    analyze_within(db, from, &TimeRange::default(), trust)
+}
+
+/// Analyze the events that fit the perspective within the time range
+/// The access of each subject is summarized over every event that fits the
+/// perspective, only the events within the range are analyzed.
+pub fn analyze_within(
+    db: &EventDB,
+    from: Perspective,
+    range: &TimeRange,
+    trust: &TrustDB,
+) -> Vec<Analysis> {
+    let access_map = subject_access(db.fit(&from));
 
-    fit_events
-        .iter()
+    db.fit_within(&from, range)
+        .into_par_iter()
         .map(|e| {
-            let sp = e.subj.exe().unwrap();
-            let op = e.obj.path().unwrap();
-
-            let ed = match e.dec {
-                Allow | AllowLog | AllowSyslog | AllowAudit => "A".to_string(),
-                Deny | DenyLog | DenySyslog | DenyAudit => "D".to_string(),
-            };
-
-            let sa = match access_map.entry(sp.clone()) {
-                Entry::Occupied(e) => e.get().clone(),
-                Entry::Vacant(e) => {
-                    let sa = match (
-                        any_allows_for_subject(&sp, &fit_events),
-                        any_denials_for_subject(&sp, &fit_events),
-                    ) {
-                        (true, false) => "A".to_string(),
-                        (false, true) => "D".to_string(),
-                        _ => "P".to_string(),
-                    };
-                    e.insert(sa.clone());
-                    sa
-                }
-            };
-
-            Analysis {
-                event: e.clone(),
-                subject: SubjAnalysis {
-                    trust: trust_source(&sp, trust).unwrap(),
-                    status: trust_status(&sp, trust).unwrap(),
-                    access: sa,
-                    file: sp,
-                },
-                object: ObjAnalysis {
-                    trust: trust_source(&op, trust).unwrap(),
-                    status: trust_status(&op, trust).unwrap(),
-                    access: ed,
-                    perm: perm_to_display(&e.perm),
-                    file: op,
-                },
-            }
+            let sa = subj_exe(e)
+                .and_then(|sp| access_map.get(sp))
+                .copied()
+                .unwrap_or_default();
+            analyze_event(e, &sa, trust)
         })
         .collect()
 }
 
+/// Analyze a single event given the access summary of its subject
+pub fn analyze_event(e: &Event, sa: &SubjAccess, trust: &TrustDB) -> Analysis {
+    let sp = e.subj.exe().unwrap();
+    let op = e.obj.path().unwrap();
+
+    let ed = match e.dec {
+        Allow | AllowLog | AllowSyslog | AllowAudit => "A".to_string(),
+        Deny | DenyLog | DenySyslog | DenyAudit => "D".to_string(),
+    };
+
+    Analysis {
+        event: e.clone(),
+        subject: SubjAnalysis {
+            trust: trust_source(&sp, trust).unwrap(),
+            status: trust_status(&sp, trust).unwrap(),
+            access: sa.display().to_string(),
+            file: sp,
+        },
+        object: ObjAnalysis {
+            trust: trust_source(&op, trust).unwrap(),
+            status: trust_status(&op, trust).unwrap(),
+            access: ed,
+            perm: perm_to_display(&e.perm),
+            file: op,
+        },
+    }
+}
+
 const PERM_SPLIT: usize = "perm=".len();
 fn perm_to_display(p: &Permission) -> String {
     p.to_string().split_at(PERM_SPLIT).1.to_string()
@@ -117,17 +181,3 @@ fn trust_status(path: &str, db: &TrustDB) -> Result<String, Error> {
         _ => Ok("U".into()),
     }
 }
-
-fn any_denials_for_subject(p: &str, events: &[Event]) -> bool {
-    events
-        .iter()
-        .filter(|e| matches!( e.subj.exe(), Some(exe) if exe == p))
-        .any(|e| matches!(e.dec, Deny | DenyLog | DenySyslog | DenyAudit))
-}
-
-fn any_allows_for_subject(p: &str, events: &[Event]) -> bool {
-    events
-        .iter()
-        .filter(|e| matches!(e.subj.exe(), Some(exe) if exe == p))
-        .any(|e| matches!(e.dec, Allow | AllowLog | AllowSyslog | AllowAudit))
-}
@@ -8,7 +8,7 @@
 
 use crate::error::Error;
 use crate::error::Error::MetaError;
-use crate::events::event::Event;
+use crate::events::event::{Event, TimeRange};
 use audit::Parser;
 use chrono::{DateTime, NaiveDateTime, Utc};
 use fapolicy_auparse::audit;
@@ -18,12 +18,29 @@ use fapolicy_auparse::record::Type::Fanotify;
 use fapolicy_rules::{Decision, Object, Permission, Subject};
 use std::path::PathBuf;
 
-pub fn events(path: Option<String>) -> Result<Vec<Event>, Error> {
+pub fn events(path: Option<String>, range: TimeRange) -> Result<Vec<Event>, Error> {
     let logs = match path {
         Some(p) => Logs::filtered_from(&PathBuf::from(p), Box::new(Parse), fanotify_only),
         None => Logs::filtered(Box::new(Parse), fanotify_only),
+    }?;
+    within(logs, range)
+}
+
+/// Parse the events in text read from an audit log
+pub fn events_in(text: &str, range: TimeRange) -> Result<Vec<Event>, Error> {
+    within(
+        Logs::filtered_text(text, Box::new(Parse), fanotify_only)?,
+        range,
+    )
+}
+
+fn within(logs: Logs<Event, Error>, range: TimeRange) -> Result<Vec<Event>, Error> {
+    let logs = if range.is_unbounded() {
+        logs
+    } else {
+        logs.between(range.start, range.stop)?
     };
-    Ok(logs?.collect())
+    Ok(logs.collect())
 }
 
 fn fanotify_only(x: Type) -> bool {
@@ -6,17 +6,66 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use crate::events::event::Event;
+use crate::events::event::{Event, Perspective, TimeRange};
+use std::collections::HashMap;
 use std::slice::Iter;
 
+/// Inverted indexes over the events, each list holds event ids in log order
+#[derive(Default, Clone, Debug)]
+struct Index {
+    by_subject: HashMap<String, Vec<usize>>,
+    by_uid: HashMap<i32, Vec<usize>>,
+    by_gid: HashMap<i32, Vec<usize>>,
+    /// ids sorted by event time, events without a time sort first
+    by_time: Vec<usize>,
+}
+
+impl Index {
+    fn build(events: &[Event]) -> Self {
+        let mut idx = Index::default();
+        idx.extend(events, 0);
+        idx
+    }
+
+    /// index the events from the first new id onward
+    fn extend(&mut self, events: &[Event], first: usize) {
+        for (id, e) in events.iter().enumerate().skip(first) {
+            if let Some(exe) = e.subj.exe() {
+                self.by_subject.entry(exe).or_default().push(id);
+            }
+            self.by_uid.entry(e.uid).or_default().push(id);
+            for gid in &e.gid {
+                let ids = self.by_gid.entry(*gid).or_default();
+                // an event lists each gid once in its own posting list
+                if ids.last() != Some(&id) {
+                    ids.push(id);
+                }
+            }
+        }
+        // appended events are mostly in time order, the stable sort
+        // merges them with the existing ids in near linear time
+        self.by_time.extend(first..events.len());
+        self.by_time.sort_by_key(|id| events[*id].when);
+    }
+}
+
 #[derive(Default, Clone)]
 pub struct DB {
     pub(crate) events: Vec<Event>,
+    index: Index,
 }
 
 impl DB {
     pub fn from(es: Vec<Event>) -> Self {
-        DB { events: es }
+        let index = Index::build(&es);
+        DB { events: es, index }
+    }
+
+    /// Append events to the db, only the new events are indexed
+    pub fn append(&mut self, es: Vec<Event>) {
+        let first = self.events.len();
+        self.events.extend(es);
+        self.index.extend(&self.events, first);
     }
 
     pub fn len(&self) -> usize {
@@ -31,4 +80,178 @@ impl DB {
     pub fn iter(&self) -> Iter<'_, Event> {
         self.events.iter()
     }
+
+    /// Get an iterator to the distinct subject paths
+    pub fn subjects(&self) -> impl Iterator<Item = &str> {
+        self.index.by_subject.keys().map(|s| s.as_str())
+    }
+
+    /// Get the events that fit the perspective, in log order
+    pub fn fit(&self, from: &Perspective) -> Vec<&Event> {
+        self.fit_ids(from)
+            .iter()
+            .map(|id| &self.events[*id])
+            .collect()
+    }
+
+    /// Get the events that fit the perspective within the time range, in log order
+    /// The ids within the range are sliced from the time index and intersected
+    /// with the ids of the perspective, searching the longer list for the ids
+    /// of the shorter.
+    pub fn fit_within(&self, from: &Perspective, range: &TimeRange) -> Vec<&Event> {
+        if range.is_unbounded() {
+            return self.fit(from);
+        }
+        let fit = self.fit_ids(from);
+        let mut within = self.ids_within(range);
+        within.sort_unstable();
+
+        let (short, long) = if fit.len() < within.len() {
+            (fit, within.as_slice())
+        } else {
+            (within.as_slice(), fit)
+        };
+        short
+            .iter()
+            .filter(|id| long.binary_search(id).is_ok())
+            .map(|id| &self.events[*id])
+            .collect()
+    }
+
+    /// Get an iterator to the events ordered by time
+    pub fn iter_by_time(&self) -> impl Iterator<Item = &Event> {
+        self.index.by_time.iter().map(move |id| &self.events[*id])
+    }
+
+    fn fit_ids(&self, from: &Perspective) -> &[usize] {
+        let ids = match from {
+            Perspective::User(uid) => self.index.by_uid.get(uid),
+            Perspective::Group(gid) => self.index.by_gid.get(gid),
+            Perspective::Subject(path) => self.index.by_subject.get(path),
+        };
+        ids.map(Vec::as_slice).unwrap_or_default()
+    }
+
+    /// ids of the events within the range, found by binary search of the time
+    /// index, events without a time sort first and are always within range
+    fn ids_within(&self, range: &TimeRange) -> Vec<usize> {
+        let by_time = &self.index.by_time;
+        let when = |id: &usize| self.events[*id].when.map(|t| t.timestamp());
+        let untimed = by_time.partition_point(|id| when(id).is_none());
+        let timed = &by_time[untimed..];
+        let lo = timed.partition_point(|id| range.start.map_or(false, |s| when(id) < Some(s)));
+        let hi = timed.partition_point(|id| range.stop.map_or(true, |s| when(id) <= Some(s)));
+        by_time[..untimed]
+            .iter()
+            .chain(timed[lo..hi.max(lo)].iter())
+            .copied()
+            .collect()
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use chrono::{DateTime, NaiveDateTime, Utc};
+    use fapolicy_rules::{Decision, Object, Permission, Subject};
+
+    fn event(pid: i32, exe: &str, uid: i32, gid: Vec<i32>, t: i64) -> Event {
+        Event {
+            rule_id: 0,
+            dec: Decision::Allow,
+            perm: Permission::Any,
+            uid,
+            gid,
+            pid,
+            subj: Subject::from_exe(exe),
+            obj: Object::from_path("/x"),
+            when: Some(DateTime::from_utc(NaiveDateTime::from_timestamp(t, 0), Utc)),
+        }
+    }
+
+    fn db() -> DB {
+        DB::from(vec![
+            event(0, "/a", 1, vec![10], 3),
+            event(1, "/b", 2, vec![10, 20], 1),
+            event(2, "/a", 2, vec![20, 20], 2),
+        ])
+    }
+
+    fn pids(es: Vec<&Event>) -> Vec<i32> {
+        es.iter().map(|e| e.pid).collect()
+    }
+
+    #[test]
+    fn perspective_lookup() {
+        let db = db();
+        assert_eq!(pids(db.fit(&Perspective::User(2))), vec![1, 2]);
+        assert_eq!(pids(db.fit(&Perspective::Group(10))), vec![0, 1]);
+        assert_eq!(pids(db.fit(&Perspective::Group(20))), vec![1, 2]);
+        assert_eq!(pids(db.fit(&Perspective::Subject("/a".into()))), vec![0, 2]);
+        assert!(db.fit(&Perspective::User(99)).is_empty());
+
+        let mut subjects: Vec<_> = db.subjects().collect();
+        subjects.sort_unstable();
+        assert_eq!(subjects, vec!["/a", "/b"]);
+    }
+
+    #[test]
+    fn time_ordered() {
+        let db = db();
+        let times: Vec<_> = db
+            .iter_by_time()
+            .map(|e| e.when.unwrap().timestamp())
+            .collect();
+        assert_eq!(times, vec![1, 2, 3]);
+    }
+
+    #[test]
+    fn append_indexes_new_events() {
+        let mut db = db();
+        db.append(vec![
+            event(3, "/c", 1, vec![30], 0),
+            event(4, "/a", 3, vec![10], 4),
+        ]);
+        assert_eq!(db.len(), 5);
+        assert_eq!(pids(db.fit(&Perspective::User(1))), vec![0, 3]);
+        assert_eq!(pids(db.fit(&Perspective::Group(10))), vec![0, 1, 4]);
+        assert_eq!(
+            pids(db.fit(&Perspective::Subject("/a".into()))),
+            vec![0, 2, 4]
+        );
+        assert_eq!(pids(db.fit(&Perspective::Subject("/c".into()))), vec![3]);
+
+        let pids: Vec<_> = db.iter_by_time().map(|e| e.pid).collect();
+        assert_eq!(pids, vec![3, 1, 2, 0, 4]);
+    }
+
+    #[test]
+    fn perspective_within_time_range() {
+        let mut db = db();
+        db.append(vec![Event {
+            when: None,
+            ..event(3, "/a", 2, vec![20], 0)
+        }]);
+        let within = |from, start, stop| pids(db.fit_within(&from, &TimeRange::new(start, stop)));
+
+        assert_eq!(within(Perspective::User(2), None, None), vec![1, 2, 3]);
+        assert_eq!(within(Perspective::User(2), Some(2), None), vec![2, 3]);
+        assert_eq!(within(Perspective::User(2), None, Some(1)), vec![1, 3]);
+        assert_eq!(within(Perspective::Group(10), Some(1), Some(2)), vec![1]);
+        assert_eq!(
+            within(Perspective::Subject("/a".into()), Some(2), Some(3)),
+            vec![0, 2, 3]
+        );
+        assert_eq!(
+            within(Perspective::User(1), Some(4), None),
+            Vec::<i32>::new()
+        );
+        assert_eq!(
+            within(Perspective::User(1), Some(3), Some(1)),
+            Vec::<i32>::new()
+        );
+        assert!(db
+            .fit_within(&Perspective::User(99), &TimeRange::new(Some(0), None))
+            .is_empty());
+    }
 }
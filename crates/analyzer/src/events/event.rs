@@ -68,7 +68,7 @@ impl Display for Event {
     }
 }
 
-#[derive(Clone)]
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
 pub enum Perspective {
     User(i32),
     Group(i32),
@@ -84,3 +84,31 @@ impl Perspective {
         }
     }
 }
+
+/// Inclusive time bounds in epoch seconds, an open bound is unlimited
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq, Hash)]
+pub struct TimeRange {
+    pub start: Option<i64>,
+    pub stop: Option<i64>,
+}
+
+impl TimeRange {
+    pub fn new(start: Option<i64>, stop: Option<i64>) -> Self {
+        TimeRange { start, stop }
+    }
+
+    /// True when neither bound is set
+    pub fn is_unbounded(&self) -> bool {
+        self.start.is_none() && self.stop.is_none()
+    }
+
+    /// Check the time against the bounds
+    pub fn contains(&self, t: i64) -> bool {
+        self.start.map_or(true, |s| t >= s) && self.stop.map_or(true, |s| t <= s)
+    }
+
+    /// Check the event against the bounds, an event without a time is always in range
+    pub fn fit(&self, e: &Event) -> bool {
+        e.when.map_or(true, |t| self.contains(t.timestamp()))
+    }
+}
@@ -0,0 +1,428 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::fs;
+use std::fs::File;
+use std::io;
+use std::io::{ErrorKind, Read, Seek, SeekFrom};
+use std::os::unix::fs::MetadataExt;
+
+use crate::error::Error;
+use crate::events::audit;
+use crate::events::event::{Event, TimeRange};
+use crate::events::read::{collect, read_full, seek_start, EventReader, LineFilter, PROBE_SIZE};
+
+/// An event source that is read incrementally as it grows
+pub trait Follow: Send {
+    /// Read the events added to the source since the last poll
+    fn poll(&mut self) -> Result<Vec<Event>, Error>;
+}
+
+/// Follows a text log by the offset of the last whole line read
+/// Rotation is detected by a change of inode at the log path, the rest of the
+/// rotated log is read before the new one. A log truncated in place is read
+/// again from the beginning.
+pub struct LogFollower {
+    path: String,
+    filter: LineFilter,
+    range: TimeRange,
+    file: Option<File>,
+    ino: u64,
+    offset: u64,
+}
+
+impl LogFollower {
+    pub(crate) fn new(path: &str, filter: LineFilter, range: TimeRange) -> Self {
+        LogFollower {
+            path: path.to_string(),
+            filter,
+            range,
+            file: None,
+            ino: 0,
+            offset: 0,
+        }
+    }
+
+    // open the log at the path, positioned near the start of the range
+    fn open(&mut self) -> Result<(), Error> {
+        let mut f = File::open(&self.path)?;
+        self.ino = f.metadata()?.ino();
+        self.offset = match self.range.start {
+            Some(start) => seek_start(&mut f, start)?,
+            None => 0,
+        };
+        self.file = Some(f);
+        Ok(())
+    }
+
+    // read the lines appended to the open log, a trailing partial line is left
+    // for the next read unless this is the last read of the log
+    fn read_appended(&mut self, last: bool) -> Result<Vec<Event>, Error> {
+        let f = match self.file.as_mut() {
+            Some(f) => f,
+            None => return Ok(vec![]),
+        };
+        let len = f.metadata()?.len();
+        if len < self.offset {
+            self.offset = 0;
+        }
+        let end = if last {
+            len
+        } else {
+            line_end(f, self.offset, len)?
+        };
+        if end <= self.offset {
+            return Ok(vec![]);
+        }
+
+        f.seek(SeekFrom::Start(self.offset))?;
+        let reader =
+            EventReader::new(f.take(end - self.offset), self.filter).with_range(self.range);
+        let events = collect(reader)?;
+        self.offset = end;
+        Ok(events)
+    }
+}
+
+impl Follow for LogFollower {
+    fn poll(&mut self) -> Result<Vec<Event>, Error> {
+        let current = match fs::metadata(&self.path) {
+            Ok(m) => Some(m.ino()),
+            Err(e) if e.kind() == ErrorKind::NotFound => None,
+            Err(e) => return Err(e.into()),
+        };
+
+        let mut events = vec![];
+        if self.file.is_some() {
+            let rotated = current != Some(self.ino);
+            events.extend(self.read_appended(rotated)?);
+            if rotated {
+                self.file = None;
+            }
+        }
+        if self.file.is_none() && current.is_some() {
+            self.open()?;
+            events.extend(self.read_appended(false)?);
+        }
+        Ok(events)
+    }
+}
+
+/// the log auparse reads when no log is given
+const AUDIT_LOG: &str = "/var/log/audit/audit.log";
+
+/// Follows the audit log from the end of the last record read
+/// The logs are first searched by auparse from the start of the range, after
+/// which only the lines appended to the active log are parsed. The records of
+/// the last event in a read are held back until the log stops growing, as the
+/// rest of them may not be written yet. On rotation or truncation the logs are
+/// searched again from the time of the last event read, events in the last
+/// second read are counted so that those already read are skipped.
+pub struct AuditFollower {
+    path: Option<String>,
+    range: TimeRange,
+    last: Option<i64>,
+    seen: usize,
+    tail: Option<Tail>,
+}
+
+// position in the active audit log
+struct Tail {
+    ino: u64,
+    offset: u64,
+    // length of the log when the records of its last event were held back
+    held: Option<u64>,
+}
+
+impl AuditFollower {
+    pub(crate) fn new(path: Option<String>, range: TimeRange) -> Self {
+        AuditFollower {
+            path,
+            range,
+            last: None,
+            seen: 0,
+            tail: None,
+        }
+    }
+
+    fn log_path(&self) -> &str {
+        self.path.as_deref().unwrap_or(AUDIT_LOG)
+    }
+
+    // search the logs from the last event read, then continue from the
+    // length the active log had before the search
+    fn search(&mut self) -> Result<Vec<Event>, Error> {
+        let before = stat(self.log_path())?;
+        let start = match (self.range.start, self.last) {
+            (Some(start), Some(last)) => Some(start.max(last)),
+            (start, last) => start.or(last),
+        };
+        let events = audit::events(self.path.clone(), TimeRange::new(start, self.range.stop))?;
+
+        let mut skip = self.seen;
+        let mut events: Vec<Event> = events
+            .into_iter()
+            .filter(|e| {
+                let repeat = skip > 0 && timestamp(e) == self.last;
+                if repeat {
+                    skip -= 1;
+                }
+                !repeat
+            })
+            .collect();
+
+        self.tail = before.map(|(ino, offset)| Tail {
+            ino,
+            offset,
+            held: None,
+        });
+        // the search may have read records appended after the log length was taken
+        let appended = self.read_tail(false)?;
+        let n = overlap(&events, &appended);
+        events.extend(appended.into_iter().skip(n));
+        Ok(events)
+    }
+
+    // parse the whole lines appended to the active log
+    fn read_tail(&mut self, hold: bool) -> Result<Vec<Event>, Error> {
+        let mut f = match self.tail.as_ref() {
+            Some(_) => File::open(self.log_path())?,
+            None => return Ok(vec![]),
+        };
+        let meta = f.metadata()?;
+        let tail = match self.tail.as_mut() {
+            Some(tail) if tail.ino == meta.ino() && tail.offset <= meta.len() => tail,
+            // replaced since it was checked, the next poll searches again
+            _ => {
+                self.tail = None;
+                return Ok(vec![]);
+            }
+        };
+        let len = meta.len();
+        let end = line_end(&mut f, tail.offset, len)?;
+        if end <= tail.offset {
+            return Ok(vec![]);
+        }
+
+        let mut buf = vec![0; (end - tail.offset) as usize];
+        f.seek(SeekFrom::Start(tail.offset))?;
+        f.read_exact(&mut buf)?;
+        let n = if hold && tail.held != Some(len) {
+            last_event_start(&buf)
+        } else {
+            buf.len()
+        };
+        tail.held = if n < buf.len() { Some(len) } else { None };
+        tail.offset += n as u64;
+        audit::events_in(&String::from_utf8_lossy(&buf[..n]), self.range)
+    }
+}
+
+impl Follow for AuditFollower {
+    fn poll(&mut self) -> Result<Vec<Event>, Error> {
+        let current = stat(self.log_path())?;
+        let events = match (&self.tail, current) {
+            (Some(tail), Some((ino, len))) if tail.ino == ino && tail.offset <= len => {
+                self.read_tail(true)?
+            }
+            _ => self.search()?,
+        };
+
+        for t in events.iter().map(timestamp).filter(Option::is_some) {
+            if t == self.last {
+                self.seen += 1;
+            } else {
+                self.last = t;
+                self.seen = 1;
+            }
+        }
+        Ok(events)
+    }
+}
+
+// inode and length of the file at the path, none when there is no file
+fn stat(path: &str) -> Result<Option<(u64, u64)>, Error> {
+    match fs::metadata(path) {
+        Ok(m) => Ok(Some((m.ino(), m.len()))),
+        Err(e) if e.kind() == ErrorKind::NotFound => Ok(None),
+        Err(e) => Err(e.into()),
+    }
+}
+
+// the number of leading events of b that repeat the trailing events of a
+fn overlap(a: &[Event], b: &[Event]) -> usize {
+    (0..=a.len().min(b.len()))
+        .rev()
+        .find(|&n| a[a.len() - n..] == b[..n])
+        .unwrap_or(0)
+}
+
+const SERIAL: &[u8] = b"msg=audit(";
+
+// the time and serial that identify the event a record belongs to
+fn serial(line: &[u8]) -> Option<&[u8]> {
+    let start = line.windows(SERIAL.len()).position(|w| w == SERIAL)? + SERIAL.len();
+    let len = memchr::memchr(b')', &line[start..])?;
+    Some(&line[start..start + len])
+}
+
+// offset of the trailing lines that are records of the same event as the last line
+fn last_event_start(buf: &[u8]) -> usize {
+    let mut start = buf.len();
+    let mut last = None;
+    while start > 0 {
+        let prev = memchr::memrchr(b'\n', &buf[..start - 1]).map_or(0, |i| i + 1);
+        let s = serial(&buf[prev..start]);
+        if s.is_none() || (last.is_some() && s != last) {
+            break;
+        }
+        last = s;
+        start = prev;
+    }
+    start
+}
+
+fn timestamp(e: &Event) -> Option<i64> {
+    e.when.map(|t| t.timestamp())
+}
+
+// offset just past the last newline between from and to, from when there is none
+fn line_end<R: Read + Seek>(r: &mut R, from: u64, to: u64) -> io::Result<u64> {
+    let mut buf = vec![0; PROBE_SIZE];
+    let mut end = to;
+    while end > from {
+        let start = end.saturating_sub(PROBE_SIZE as u64).max(from);
+        r.seek(SeekFrom::Start(start))?;
+        let n = read_full(r, &mut buf[..(end - start) as usize])?;
+        if let Some(i) = memchr::memrchr(b'\n', &buf[..n]) {
+            return Ok(start + i as u64 + 1);
+        }
+        end = start;
+    }
+    Ok(from)
+}
+
+#[cfg(test)]
+mod tests {
+    use std::fs::OpenOptions;
+    use std::io::Write;
+
+    use tempfile::TempDir;
+
+    use super::*;
+    use crate::events::parse::parse_event;
+    use crate::events::read::follow_debug;
+
+    fn line(rule: i32) -> String {
+        format!(
+            "rule={} dec=allow perm=open uid=0 gid=0 pid=1 exe=/bin/a : path=/x ftype=text/plain\n",
+            rule
+        )
+    }
+
+    fn append(path: &str, s: &str) {
+        let mut f = OpenOptions::new()
+            .create(true)
+            .append(true)
+            .open(path)
+            .unwrap();
+        f.write_all(s.as_bytes()).unwrap();
+    }
+
+    fn ids(f: &mut LogFollower) -> Vec<i32> {
+        f.poll().unwrap().iter().map(|e| e.rule_id).collect()
+    }
+
+    #[test]
+    fn reads_only_appended_lines() {
+        let dir = TempDir::new().unwrap();
+        let path = dir.path().join("debug.log").display().to_string();
+        let mut f = follow_debug(&path, TimeRange::default());
+
+        // nothing to read until the log exists
+        assert!(ids(&mut f).is_empty());
+
+        append(&path, &format!("{}{}", line(1), line(2)));
+        assert_eq!(ids(&mut f), vec![1, 2]);
+        assert!(ids(&mut f).is_empty());
+
+        // a partial line waits for the rest of it
+        let l3 = line(3);
+        append(&path, &l3[..10]);
+        assert!(ids(&mut f).is_empty());
+        append(&path, &format!("{}{}", &l3[10..], line(4)));
+        assert_eq!(ids(&mut f), vec![3, 4]);
+    }
+
+    #[test]
+    fn follows_rotation() {
+        let dir = TempDir::new().unwrap();
+        let path = dir.path().join("debug.log").display().to_string();
+        let rotated = dir.path().join("debug.log.1");
+        append(&path, &line(1));
+        let mut f = follow_debug(&path, TimeRange::default());
+        assert_eq!(ids(&mut f), vec![1]);
+
+        // written before the rotation was noticed
+        append(&path, &line(2));
+        fs::rename(&path, &rotated).unwrap();
+        append(&path, &line(3));
+        assert_eq!(ids(&mut f), vec![2, 3]);
+
+        append(&path, &line(4));
+        assert_eq!(ids(&mut f), vec![4]);
+    }
+
+    #[test]
+    fn follows_truncation() {
+        let dir = TempDir::new().unwrap();
+        let path = dir.path().join("debug.log").display().to_string();
+        append(&path, &format!("{}{}", line(1), line(2)));
+        let mut f = follow_debug(&path, TimeRange::default());
+        assert_eq!(ids(&mut f), vec![1, 2]);
+
+        File::create(&path).unwrap();
+        append(&path, &line(3));
+        assert_eq!(ids(&mut f), vec![3]);
+    }
+
+    #[test]
+    fn finds_last_event() {
+        let buf = b"type=SYSCALL msg=audit(1.000:1): a\n\
+                    type=FANOTIFY msg=audit(1.000:1): b\n\
+                    type=SYSCALL msg=audit(1.000:2): c\n\
+                    type=PATH msg=audit(1.000:2): d\n";
+        assert_eq!(last_event_start(buf), 71);
+        assert_eq!(last_event_start(&buf[..71]), 0);
+        assert_eq!(last_event_start(b"no serial\n"), 10);
+        assert_eq!(last_event_start(b""), 0);
+    }
+
+    #[test]
+    fn finds_overlap() {
+        let events: Vec<Event> = (1..=4)
+            .map(|i| parse_event(line(i).trim_end()).unwrap().1)
+            .collect();
+        assert_eq!(overlap(&events[..3], &events[1..]), 2);
+        assert_eq!(overlap(&events[..2], &events[2..]), 0);
+        assert_eq!(overlap(&events, &[]), 0);
+    }
+
+    #[test]
+    fn finds_line_end() {
+        let mut r = io::Cursor::new(b"ab\ncd\nef".to_vec());
+        assert_eq!(line_end(&mut r, 0, 8).unwrap(), 6);
+        assert_eq!(line_end(&mut r, 6, 8).unwrap(), 6);
+        assert_eq!(line_end(&mut r, 0, 2).unwrap(), 0);
+
+        let mut long = vec![b'x'; PROBE_SIZE * 3];
+        long[10] = b'\n';
+        let mut r = io::Cursor::new(long);
+        assert_eq!(line_end(&mut r, 0, PROBE_SIZE as u64 * 3).unwrap(), 11);
+    }
+}
@@ -10,5 +10,7 @@ pub mod analysis;
 pub mod audit;
 pub mod db;
 pub mod event;
+pub mod follow;
 pub mod parse;
 pub mod read;
+pub mod replay;
@@ -56,7 +56,7 @@ pub fn parse_event(i: &str) -> nom::IResult<&str, Event> {
     }
 }
 
-fn rfc3339_date(i: &str) -> nom::IResult<&str, DateTime<Utc>> {
+pub(crate) fn rfc3339_date(i: &str) -> nom::IResult<&str, DateTime<Utc>> {
     match nom::combinator::complete(nom::sequence::tuple((
         terminated(digit1, tag("-")), // y
         terminated(digit1, tag("-")), // m
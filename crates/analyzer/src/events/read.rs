@@ -8,39 +8,364 @@
 
 use std::fs::File;
 use std::io;
-use std::io::{BufRead, BufReader};
+use std::io::{Read, Seek, SeekFrom};
+use std::iter;
+
+use rayon::prelude::*;
 
 use crate::error::Error;
 use crate::events::audit;
-use crate::events::event::Event;
-use crate::events::parse::parse_event;
+use crate::events::event::{Event, TimeRange};
+use crate::events::follow::{AuditFollower, LogFollower};
+use crate::events::parse::{parse_event, rfc3339_date};
+
+/// size of the blocks read from a log, each block is parsed as a unit
+pub const CHUNK_SIZE: usize = 4 * 1024 * 1024;
+
+/// size of the blocks examined while searching a log for a time
+pub(crate) const PROBE_SIZE: usize = 64 * 1024;
+
+/// predicate that selects the log lines to parse as events
+pub type LineFilter = fn(&str) -> bool;
+
+fn debug_line(s: &str) -> bool {
+    !s.is_empty() && !s.starts_with('#')
+}
+
+fn syslog_line(s: &str) -> bool {
+    s.contains("fapolicyd") && s.contains("rule=")
+}
+
+pub fn from_debug(path: &str, range: TimeRange) -> Result<Vec<Event>, Error> {
+    collect(stream_debug(path, range)?)
+}
+
+pub fn from_syslog(path: &str, range: TimeRange) -> Result<Vec<Event>, Error> {
+    collect(stream_syslog(path, range)?)
+}
+
+/// Stream batches of events from a debug mode log
+pub fn stream_debug(path: &str, range: TimeRange) -> Result<EventReader<File>, Error> {
+    open(path, debug_line, range)
+}
+
+/// Stream batches of events from syslog
+pub fn stream_syslog(path: &str, range: TimeRange) -> Result<EventReader<File>, Error> {
+    open(path, syslog_line, range)
+}
+
+/// Follow a debug mode log, each poll reads the events appended since the last
+pub fn follow_debug(path: &str, range: TimeRange) -> LogFollower {
+    LogFollower::new(path, debug_line, range)
+}
+
+/// Follow syslog, each poll reads the events appended since the last
+pub fn follow_syslog(path: &str, range: TimeRange) -> LogFollower {
+    LogFollower::new(path, syslog_line, range)
+}
+
+pub fn from_auditlog(range: TimeRange) -> Result<Vec<Event>, Error> {
+    audit::events(None, range)
+}
+
+pub fn from_auditlog_file(path: &str, range: TimeRange) -> Result<Vec<Event>, Error> {
+    audit::events(Some(path.to_string()), range)
+}
+
+/// Follow the kernel audit log, each poll reads the events logged since the last
+pub fn follow_auditlog(range: TimeRange) -> AuditFollower {
+    AuditFollower::new(None, range)
+}
+
+// open a reader positioned near the start of the range
+fn open(path: &str, filter: LineFilter, range: TimeRange) -> Result<EventReader<File>, Error> {
+    let mut f = File::open(path)?;
+    if let Some(start) = range.start {
+        let offset = seek_start(&mut f, start)?;
+        f.seek(SeekFrom::Start(offset))?;
+    }
+    Ok(EventReader::new(f, filter).with_range(range))
+}
+
+pub(crate) fn collect<R: Read>(reader: EventReader<R>) -> Result<Vec<Event>, Error> {
+    let mut events = vec![];
+    for batch in reader {
+        events.extend(batch?);
+    }
+    Ok(events)
+}
 
-pub fn from_debug(path: &str) -> Result<Vec<Event>, Error> {
-    from_file(path, |s| !s.is_empty() && !s.starts_with('#'))
+/// Binary search a time ordered log for the start of the range
+/// Returns the offset of a line at or before the first line stamped at or after
+/// the start, falling back to the beginning of the log if no times are found.
+pub(crate) fn seek_start<R: Read + Seek>(r: &mut R, start: i64) -> io::Result<u64> {
+    let (mut lo, mut hi) = (0, r.seek(SeekFrom::End(0))?);
+    let mut buf = vec![0; PROBE_SIZE];
+    while lo + (PROBE_SIZE as u64) < hi {
+        let mid = lo + (hi - lo) / 2;
+        r.seek(SeekFrom::Start(mid))?;
+        let n = read_full(r, &mut buf)?;
+        match probe(&buf[..n]) {
+            Some((offset, t)) if t < start => lo = (mid + offset as u64).min(hi),
+            Some(_) => hi = mid,
+            None => break,
+        }
+    }
+    Ok(lo)
 }
 
-pub fn from_syslog(path: &str) -> Result<Vec<Event>, Error> {
-    from_file(path, |s| s.contains("fapolicyd") && s.contains("rule="))
+// the first whole line of the block that carries a time, with its offset in the block
+fn probe(block: &[u8]) -> Option<(usize, i64)> {
+    let mut start = memchr::memchr(b'\n', block)? + 1;
+    while let Some(len) = memchr::memchr(b'\n', &block[start..]) {
+        let line = &block[start..start + len];
+        if let Some((_, t)) = std::str::from_utf8(line)
+            .ok()
+            .and_then(|l| rfc3339_date(l).ok())
+        {
+            return Some((start, t.timestamp()));
+        }
+        start += len + 1;
+    }
+    None
 }
 
-pub fn from_auditlog() -> Result<Vec<Event>, Error> {
-    audit::events(None)
+pub(crate) fn read_full<R: Read>(r: &mut R, buf: &mut [u8]) -> io::Result<usize> {
+    let mut filled = 0;
+    while filled < buf.len() {
+        match r.read(&mut buf[filled..]) {
+            Ok(0) => break,
+            Ok(n) => filled += n,
+            Err(e) if e.kind() == io::ErrorKind::Interrupted => continue,
+            Err(e) => return Err(e),
+        }
+    }
+    Ok(filled)
 }
 
-pub fn from_auditlog_file(path: &str) -> Result<Vec<Event>, Error> {
-    audit::events(Some(path.to_string()))
+/// Reads events from a log in batches
+/// The log is read in blocks split at line boundaries, a batch of blocks is
+/// filtered and parsed in parallel. Only the blocks of the current batch are
+/// held in memory, never the entire log.
+pub struct EventReader<R> {
+    reader: R,
+    filter: LineFilter,
+    range: TimeRange,
+    chunk_size: usize,
+    batch_size: usize,
+    // partial line carried over to the next block
+    carry: Vec<u8>,
+    eof: bool,
 }
 
-fn from_file<P>(path: &str, predicate: P) -> Result<Vec<Event>, Error>
-where
-    P: FnMut(&&String) -> bool,
-{
-    let buff = BufReader::new(File::open(path)?);
-    let lines: Result<Vec<String>, io::Error> = buff.lines().collect();
-    Ok(lines?
-        .iter()
-        .filter(predicate)
+impl<R: Read> EventReader<R> {
+    pub fn new(reader: R, filter: LineFilter) -> Self {
+        EventReader {
+            reader,
+            filter,
+            range: TimeRange::default(),
+            chunk_size: CHUNK_SIZE,
+            batch_size: rayon::current_num_threads(),
+            carry: vec![],
+            eof: false,
+        }
+    }
+
+    /// Set the size of the blocks read from the log
+    pub fn with_chunk_size(self, chunk_size: usize) -> Self {
+        EventReader {
+            chunk_size: chunk_size.max(1),
+            ..self
+        }
+    }
+
+    /// Only read events within the time range
+    /// The log is assumed to be in time order, reading stops once
+    /// an entire batch is beyond the end of the range.
+    pub fn with_range(self, range: TimeRange) -> Self {
+        EventReader { range, ..self }
+    }
+
+    /// Set the number of blocks parsed together in a batch
+    pub fn with_batch_size(self, batch_size: usize) -> Self {
+        EventReader {
+            batch_size: batch_size.max(1),
+            ..self
+        }
+    }
+
+    // read the next block of whole lines, none at the end of the log
+    fn read_chunk(&mut self) -> io::Result<Option<Vec<u8>>> {
+        let mut buf = std::mem::take(&mut self.carry);
+        while !self.eof {
+            let start = buf.len();
+            buf.resize(start + self.chunk_size, 0);
+            let n = read_full(&mut self.reader, &mut buf[start..])?;
+            buf.truncate(start + n);
+            self.eof = n < self.chunk_size;
+
+            if self.eof {
+                break;
+            }
+            // a line longer than a block keeps reading until it ends
+            if let Some(i) = memchr::memrchr(b'\n', &buf[start..]) {
+                self.carry = buf.split_off(start + i + 1);
+                return Ok(Some(buf));
+            }
+        }
+        // the remainder of the log, whole lines or not
+        Ok(if buf.is_empty() { None } else { Some(buf) })
+    }
+}
+
+impl<R: Read> Iterator for EventReader<R> {
+    type Item = Result<Vec<Event>, Error>;
+
+    fn next(&mut self) -> Option<Self::Item> {
+        loop {
+            let mut chunks = vec![];
+            while chunks.len() < self.batch_size {
+                match self.read_chunk() {
+                    Ok(Some(c)) => chunks.push(c),
+                    Ok(None) => break,
+                    Err(e) => return Some(Err(e.into())),
+                }
+            }
+            if chunks.is_empty() {
+                return None;
+            }
+
+            let filter = self.filter;
+            let mut events: Vec<Event> = chunks
+                .par_iter()
+                .flat_map_iter(|c| parse_chunk(c, filter))
+                .collect();
+
+            if let Some(stop) = self.range.stop {
+                let first = events.iter().filter_map(|e| e.when).min();
+                if matches!(first, Some(t) if t.timestamp() > stop) {
+                    self.eof = true;
+                    self.carry.clear();
+                }
+            }
+            let range = self.range;
+            events.retain(|e| range.fit(e));
+
+            // a batch with no events is skipped, the next is read
+            if !events.is_empty() {
+                return Some(Ok(events));
+            }
+        }
+    }
+}
+
+fn parse_chunk(chunk: &[u8], filter: LineFilter) -> Vec<Event> {
+    let mut start = 0;
+    memchr::memchr_iter(b'\n', chunk)
+        .chain(iter::once(chunk.len()))
+        .filter_map(|end| {
+            let line = &chunk[start..end];
+            start = end + 1;
+            std::str::from_utf8(line).ok()
+        })
+        .map(|l| l.strip_suffix('\r').unwrap_or(l))
+        .filter(|l| filter(l))
         // todo;; should log the failures here instead of just flattening
         .flat_map(|l| parse_event(l).map(|r| r.1))
-        .collect())
+        .collect()
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use chrono::NaiveDateTime;
+
+    const LOG: &str = "\
+rule=1 dec=allow perm=open uid=0 gid=0 pid=1 exe=/bin/a : path=/x ftype=text/plain
+# comment
+rule=2 dec=deny_audit perm=execute uid=1 gid=1 pid=2 exe=/bin/b : path=/y ftype=text/plain
+
+rule=3 dec=allow perm=open uid=2 gid=2 pid=3 exe=/bin/c : path=/z ftype=text/plain";
+
+    fn read(chunk_size: usize, batch_size: usize) -> Vec<Vec<i32>> {
+        EventReader::new(LOG.as_bytes(), debug_line)
+            .with_chunk_size(chunk_size)
+            .with_batch_size(batch_size)
+            .map(|b| b.unwrap().iter().map(|e| e.rule_id).collect())
+            .collect()
+    }
+
+    #[test]
+    fn chunks_split_at_lines() {
+        let all = vec![1, 2, 3];
+        assert_eq!(read(CHUNK_SIZE, 1), vec![all.clone()]);
+
+        // any chunk size yields the same events in the same order
+        for chunk_size in [1, 7, 64, 100] {
+            for batch_size in [1, 3] {
+                let batches = read(chunk_size, batch_size);
+                assert_eq!(batches.concat(), all);
+            }
+        }
+    }
+
+    #[test]
+    fn small_chunks_stream_batches() {
+        assert_eq!(read(1, 1), vec![vec![1], vec![2], vec![3]]);
+    }
+
+    const T0: i64 = 1_640_000_000;
+
+    // a syslog with one event each second, the rule id is the offset from T0
+    fn syslog(n: i64) -> Vec<u8> {
+        (0..n)
+            .map(|i| {
+                let t = NaiveDateTime::from_timestamp(T0 + i, 0).format("%Y-%m-%dT%H:%M:%S%.6f");
+                format!("{}+00:00 host fapolicyd[1]: rule={} dec=allow perm=open uid=0 gid=0 pid=1 exe=/bin/a : path=/x ftype=text/plain\n", t, i)
+            })
+            .collect::<String>()
+            .into_bytes()
+    }
+
+    #[test]
+    fn seek_to_start_of_range() {
+        let log = syslog(20_000);
+        let mut r = io::Cursor::new(&log);
+
+        let offset = seek_start(&mut r, T0 + 15_000).unwrap() as usize;
+        assert!(offset > 0);
+        assert!(offset == 0 || log[offset - 1] == b'\n');
+
+        // lands before the start, within a probe of it
+        let (_, t) = rfc3339_date(std::str::from_utf8(&log[offset..]).unwrap()).unwrap();
+        assert!(t.timestamp() <= T0 + 15_000);
+        let first = log
+            .windows(14)
+            .position(|w| w == b"rule=15000 dec")
+            .unwrap();
+        assert!(first - offset <= PROBE_SIZE);
+
+        // no times to search on
+        let mut r = io::Cursor::new(LOG.as_bytes());
+        assert_eq!(seek_start(&mut r, T0).unwrap(), 0);
+    }
+
+    #[test]
+    fn range_bounds_events() {
+        let log = syslog(20_000);
+        let range = TimeRange::new(Some(T0 + 15_000), Some(T0 + 15_009));
+
+        let mut r = io::Cursor::new(&log);
+        let offset = seek_start(&mut r, T0 + 15_000).unwrap();
+        r.seek(SeekFrom::Start(offset)).unwrap();
+
+        let ids: Vec<i32> = EventReader::new(r, syslog_line)
+            .with_range(range)
+            .with_chunk_size(1024)
+            .with_batch_size(1)
+            .flat_map(|b| b.unwrap())
+            .map(|e| e.rule_id)
+            .collect();
+        assert_eq!(ids, (15_000..15_010).collect::<Vec<_>>());
+    }
 }
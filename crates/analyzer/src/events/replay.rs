@@ -0,0 +1,168 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use rayon::prelude::*;
+
+use fapolicy_rules::db::DB as RulesDB;
+use fapolicy_rules::engine::{Access, Engine, Verdict};
+use fapolicy_rules::{ObjPart, Rvalue, SubjPart};
+
+use crate::events::db::DB as EventDB;
+use crate::events::event::{Event, TimeRange};
+
+/// An event that two sets of rules decide differently
+#[derive(Clone, Debug, PartialEq)]
+pub struct DecisionChange {
+    /// position of the event in the log
+    pub event: usize,
+    pub before: Option<Verdict>,
+    pub after: Option<Verdict>,
+}
+
+/// The access that an event records
+pub fn access(e: &Event) -> Access<'_> {
+    let mut a = Access::new(e.perm.clone(), "", "");
+    a.uid = Some(e.uid as u32);
+    a.gid = e.gid.iter().map(|g| *g as u32).collect();
+    a.pid = Some(e.pid as u32);
+    for p in e.subj.parts.iter() {
+        match p {
+            SubjPart::Exe(exe) => a.exe = exe.as_str(),
+            SubjPart::Comm(comm) => a.comm = Some(comm.as_str()),
+            SubjPart::Pattern(pattern) => a.pattern = Some(pattern.as_str()),
+            SubjPart::Trust(t) => a.subj_trust = Some(*t),
+            _ => {}
+        }
+    }
+    for p in e.obj.parts.iter() {
+        match p {
+            ObjPart::Path(path) => a.path = path.as_str(),
+            ObjPart::Device(device) => a.device = Some(device.as_str()),
+            ObjPart::FileType(Rvalue::Literal(ftype)) => a.ftype = Some(ftype.as_str()),
+            ObjPart::Trust(t) => a.obj_trust = Some(*t),
+            _ => {}
+        }
+    }
+    a
+}
+
+/// Replay the events of a log within the time range against the rules before
+/// and after a change
+/// Returns the events whose decision changes, in log order. The rule that
+/// decides an event is reported, but an event decided the same way by another
+/// rule is not a change, as inserting a rule renumbers the rules after it.
+pub fn replay(
+    events: &EventDB,
+    range: &TimeRange,
+    before: &RulesDB,
+    after: &RulesDB,
+) -> Vec<DecisionChange> {
+    let (before, after) = rayon::join(|| Engine::compile(before), || Engine::compile(after));
+    events
+        .events
+        .par_iter()
+        .enumerate()
+        .filter(|(_, e)| range.fit(e))
+        .filter_map(|(i, e)| {
+            let a = access(e);
+            let (b, c) = (before.evaluate(&a), after.evaluate(&a));
+            if b.map(|v| &v.dec) == c.map(|v| &v.dec) {
+                return None;
+            }
+            Some(DecisionChange {
+                event: i,
+                before: b.cloned(),
+                after: c.cloned(),
+            })
+        })
+        .collect()
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use chrono::{DateTime, NaiveDateTime, Utc};
+    use fapolicy_rules::read::deserialize_rules_db;
+    use fapolicy_rules::Decision;
+    use std::error::Error;
+
+    fn event(line: &str) -> Event {
+        line.parse().unwrap()
+    }
+
+    #[test]
+    fn event_access() {
+        let e = event("rule=9 dec=allow perm=execute uid=1000 gid=1000,10 pid=7 exe=/usr/bin/bash : path=/usr/bin/ls ftype=application/x-executable trust=1");
+        let a = access(&e);
+        assert_eq!(a.exe, "/usr/bin/bash");
+        assert_eq!(a.path, "/usr/bin/ls");
+        assert_eq!(a.gid, vec![1000, 10]);
+        assert_eq!(a.ftype, Some("application/x-executable"));
+        assert_eq!(a.obj_trust, Some(true));
+        assert_eq!(a.subj_trust, None);
+    }
+
+    #[test]
+    fn replay_reports_changed_decisions() -> Result<(), Box<dyn Error>> {
+        let events = EventDB::from(vec![
+            event("rule=1 dec=allow perm=open uid=0 gid=0 pid=1 exe=/usr/bin/cat : path=/etc/hosts ftype=text/plain trust=1"),
+            event("rule=2 dec=deny_audit perm=execute uid=0 gid=0 pid=2 exe=/usr/bin/bash : path=/tmp/x ftype=application/x-executable trust=0"),
+            event("rule=1 dec=allow perm=open uid=0 gid=0 pid=3 exe=/usr/bin/bash : path=/tmp/y ftype=text/plain trust=0"),
+        ]);
+        let before = deserialize_rules_db(
+            "allow perm=open all : all\ndeny_audit perm=execute all : trust=0",
+        )?;
+        // a rule inserted first renumbers the rest, without changing their decisions
+        let after = deserialize_rules_db(
+            "allow perm=execute exe=/usr/bin/bash : dir=/tmp/\nallow perm=open all : all\ndeny_audit perm=execute all : trust=0",
+        )?;
+
+        let all = TimeRange::default();
+        let changes = replay(&events, &all, &before, &after);
+        assert_eq!(
+            changes,
+            vec![DecisionChange {
+                event: 1,
+                before: Some(Verdict {
+                    rule_id: 2,
+                    dec: Decision::DenyAudit
+                }),
+                after: Some(Verdict {
+                    rule_id: 1,
+                    dec: Decision::Allow
+                }),
+            }]
+        );
+        assert!(replay(&events, &all, &before, &before).is_empty());
+        Ok(())
+    }
+
+    #[test]
+    fn replay_within_time_range() -> Result<(), Box<dyn Error>> {
+        let at = |t| {
+            Event {
+            when: Some(DateTime::from_utc(NaiveDateTime::from_timestamp(t, 0), Utc)),
+            ..event("rule=1 dec=deny_audit perm=execute uid=0 gid=0 pid=2 exe=/usr/bin/bash : path=/tmp/x ftype=application/x-executable trust=0")
+        }
+        };
+        let events = EventDB::from(vec![at(1), at(2), at(3)]);
+        let before = deserialize_rules_db("deny_audit perm=execute all : trust=0")?;
+        let after = deserialize_rules_db("allow perm=execute all : all")?;
+
+        let changed = |range: TimeRange| -> Vec<usize> {
+            replay(&events, &range, &before, &after)
+                .iter()
+                .map(|c| c.event)
+                .collect()
+        };
+        assert_eq!(changed(TimeRange::default()), vec![0, 1, 2]);
+        assert_eq!(changed(TimeRange::new(Some(2), None)), vec![1, 2]);
+        assert_eq!(changed(TimeRange::new(Some(2), Some(2))), vec![1]);
+        Ok(())
+    }
+}
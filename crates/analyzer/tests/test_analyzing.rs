@@ -6,7 +6,9 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use fapolicy_analyzer::events::analysis::Analysis;
+use std::time::Instant;
+
+use fapolicy_analyzer::events::analysis::{subject_access, Analysis};
 use fapolicy_analyzer::events::db::DB as EventDB;
 use fapolicy_analyzer::events::event::{Event, Perspective};
 use fapolicy_rules::{Decision, Object, Permission, Subject};
@@ -235,3 +237,56 @@ fn subj_perspective() {
     let a = analyze_from_subject(&log, "/nada", &trust);
     assert_eq!(a.len(), 1);
 }
+
+#[test]
+fn subject_access_summary() {
+    let log = vec![
+        event("/foo", Decision::Allow, "x", 1, 999),
+        event("/foo", Decision::AllowLog, "y", 1, 999),
+        event("/bar", Decision::Allow, "x", 1, 999),
+        event("/bar", Decision::DenyAudit, "y", 1, 999),
+        event("/baz", Decision::Deny, "x", 1, 999),
+    ];
+
+    let sa = subject_access(&log);
+    assert_eq!(sa.len(), 3);
+    assert_eq!(sa["/foo"].display(), "A");
+    assert_eq!(sa["/bar"].display(), "P");
+    assert_eq!(sa["/baz"].display(), "D");
+}
+
+// the time per event should hold roughly constant as the log grows
+// cargo test --release -p fapolicy-analyzer -- --ignored --nocapture
+#[test]
+#[ignore]
+fn bench_analyze() {
+    let trust = TrustDB::default();
+    let mut per_event = vec![];
+
+    for n in [10_000, 100_000, 1_000_000] {
+        // one subject per hundred events, every fifth denied
+        let log: Vec<Event> = (0..n)
+            .map(|i| {
+                let dec = if i % 5 == 0 {
+                    Decision::Deny
+                } else {
+                    Decision::Allow
+                };
+                event(&format!("/usr/bin/s{}", i / 100), dec, "/x", 1, 1)
+            })
+            .collect();
+        let db = EventDB::from(log);
+
+        let t = Instant::now();
+        let a = fapolicy_analyzer::events::analysis::analyze(&db, Perspective::User(1), &trust);
+        let elapsed = t.elapsed();
+        assert_eq!(a.len(), n);
+
+        let ns = elapsed.as_nanos() as f64 / n as f64;
+        println!("{:>8} events: {:?}, {:.0} ns/event", n, elapsed, ns);
+        per_event.push(ns);
+    }
+
+    // a quadratic scan would be ~100x worse per event at each step
+    assert!(per_event[2] < per_event[0] * 10.0);
+}
@@ -9,6 +9,7 @@
 use serde::Deserialize;
 use serde::Serialize;
 use std::path::PathBuf;
+use std::sync::Arc;
 
 use fapolicy_analyzer::users::{read_groups, read_users, Group, User};
 use fapolicy_daemon::conf::ops::Changeset as ConfigChanges;
@@ -17,24 +18,36 @@ use fapolicy_daemon::fapolicyd::Version;
 use fapolicy_rules::db::DB as RulesDB;
 use fapolicy_rules::ops::Changeset as RuleChanges;
 use fapolicy_rules::read::load_rules_db;
+use fapolicy_trust::cache::DigestCache;
 use fapolicy_trust::db::DB as TrustDB;
 use fapolicy_trust::ops::Changeset as TrustChanges;
+use fapolicy_trust::stat::Tier;
 use fapolicy_trust::{check, load};
 
 use crate::cfg::{data_dir, All};
 use crate::error::Error;
 
+/// A changeset to one component of the application state
+pub enum Changes {
+    Trust(TrustChanges),
+    Rules(RuleChanges),
+    Config(ConfigChanges),
+}
+
 /// Represents an immutable view of the application state.
 /// Carries along the configuration that provided the state.
+/// The components are shared between states, applying a changeset only
+/// allocates for the component it changes.
 #[derive(Clone)]
 pub struct State {
     pub config: All,
     pub trust_db: TrustDB,
-    pub rules_db: RulesDB,
-    pub users: Vec<User>,
-    pub groups: Vec<Group>,
-    pub daemon_config: ConfDB,
+    pub rules_db: Arc<RulesDB>,
+    pub users: Arc<Vec<User>>,
+    pub groups: Arc<Vec<Group>>,
+    pub daemon_config: Arc<ConfDB>,
     pub daemon_version: Version,
+    pub digest_cache: Arc<DigestCache>,
 }
 
 impl State {
@@ -42,11 +55,12 @@ impl State {
         State {
             config: cfg.clone(),
             trust_db: TrustDB::default(),
-            rules_db: RulesDB::default(),
-            users: vec![],
-            groups: vec![],
-            daemon_config: ConfDB::default(),
+            rules_db: Default::default(),
+            users: Default::default(),
+            groups: Default::default(),
+            daemon_config: Default::default(),
             daemon_version: fapolicy_daemon::version(),
+            digest_cache: Arc::new(DigestCache::new()),
         }
     }
 
@@ -60,45 +74,78 @@ impl State {
         Ok(State {
             config: cfg.clone(),
             trust_db,
-            rules_db,
-            users: read_users()?,
-            groups: read_groups()?,
-            daemon_config: fapolicy_daemon::conf::from_file(&cfg.system.config_file_path)?,
+            rules_db: Arc::new(rules_db),
+            users: Arc::new(read_users()?),
+            groups: Arc::new(read_groups()?),
+            daemon_config: Arc::new(fapolicy_daemon::conf::from_file(
+                &cfg.system.config_file_path,
+            )?),
             daemon_version: fapolicy_daemon::version(),
+            digest_cache: Arc::new(DigestCache::from_data_dir(
+                cfg.data_dir(),
+                cfg.application.paranoid_digest,
+            )),
         })
     }
 
     pub fn load_checked(cfg: &All) -> Result<State, Error> {
         let state = State::load(cfg)?;
-        let trust_db = check::disk_sync(&state.trust_db)?;
+        let trust_db =
+            check::disk_sync_cached(&state.trust_db, Tier::default(), &state.digest_cache)?;
+        if let Err(e) = state.digest_cache.save() {
+            log::warn!("failed to save digest cache: {}", e);
+        }
         Ok(State { trust_db, ..state })
     }
 
     /// Apply a trust changeset to this state, results in a new immutable state
-    pub fn apply_trust_changes(&self, changes: TrustChanges) -> Self {
-        let modified = changes.apply(self.trust_db.clone());
-        Self {
-            config: self.config.clone(),
+    /// Fails when a file added by the changeset cannot be hashed.
+    pub fn apply_trust_changes(&self, changes: TrustChanges) -> Result<Self, Error> {
+        let modified = changes.try_apply(self.trust_db.clone())?;
+        Ok(Self {
             trust_db: modified,
-            rules_db: self.rules_db.clone(),
-            users: self.users.clone(),
-            groups: self.groups.clone(),
-            daemon_config: self.daemon_config.clone(),
-            daemon_version: self.daemon_version.clone(),
+            ..self.clone()
+        })
+    }
+
+    /// Apply a sequence of changesets to this state, results in one new immutable state
+    /// The trust changesets are joined and applied once, so a file changed by
+    /// several of them is hashed once. A rule or config changeset holds the whole
+    /// of its component, so only the last of each kind takes effect.
+    pub fn apply_changes(&self, changes: Vec<Changes>) -> Result<Self, Error> {
+        let mut trust: Option<TrustChanges> = None;
+        let mut rules = None;
+        let mut config = None;
+        for change in changes {
+            match change {
+                Changes::Trust(t) => match trust.as_mut() {
+                    Some(all) => all.append(t),
+                    None => trust = Some(t),
+                },
+                Changes::Rules(r) => rules = Some(r),
+                Changes::Config(c) => config = Some(c),
+            }
+        }
+
+        let mut state = self.clone();
+        if let Some(t) = trust {
+            state.trust_db = t.try_apply(state.trust_db)?;
         }
+        if let Some(r) = rules {
+            state.rules_db = Arc::new(r.apply().clone());
+        }
+        if let Some(c) = config {
+            state.daemon_config = Arc::new(c.apply().clone());
+        }
+        Ok(state)
     }
 
     /// Apply a rule changeset to this state, results in a new immutable state
     pub fn apply_rule_changes(&self, changes: RuleChanges) -> Self {
         let modified = changes.apply();
         Self {
-            config: self.config.clone(),
-            trust_db: self.trust_db.clone(),
-            rules_db: modified.clone(),
-            users: self.users.clone(),
-            groups: self.groups.clone(),
-            daemon_config: self.daemon_config.clone(),
-            daemon_version: self.daemon_version.clone(),
+            rules_db: Arc::new(modified.clone()),
+            ..self.clone()
         }
     }
 
@@ -106,13 +153,8 @@ impl State {
     pub fn apply_config_changes(&self, changes: ConfigChanges) -> Self {
         let modified = changes.apply();
         Self {
-            config: self.config.clone(),
-            trust_db: self.trust_db.clone(),
-            rules_db: self.rules_db.clone(),
-            users: self.users.clone(),
-            groups: self.groups.clone(),
-            daemon_config: modified.clone(),
-            daemon_version: self.daemon_version.clone(),
+            daemon_config: Arc::new(modified.clone()),
+            ..self.clone()
         }
     }
 }
@@ -121,12 +163,60 @@ impl State {
 pub struct Config {
     #[serde(default = "data_dir")]
     pub data_dir: String,
+
+    // rehash every file on trust checks, ignoring the digest cache
+    #[serde(default)]
+    pub paranoid_digest: bool,
 }
 
 impl Default for Config {
     fn default() -> Self {
         Self {
             data_dir: data_dir(),
+            paranoid_digest: false,
         }
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use fapolicy_trust::db::Rec;
+    use fapolicy_trust::Trust;
+
+    #[test]
+    fn changes_share_unchanged_components() {
+        let mut trust_db = TrustDB::new();
+        for i in 0..10_000 {
+            trust_db.put(Rec::without_source(Trust::new(&format!("/{}", i), 1, "00")));
+        }
+        let s0 = State {
+            trust_db,
+            ..State::empty(&All::default())
+        };
+
+        // 100 successive generations, each removing one trust entry
+        let mut s = s0.clone();
+        for i in 0..100 {
+            let mut changes = TrustChanges::new();
+            changes.del(&format!("/{}", i));
+            s = s.apply_trust_changes(changes).unwrap();
+        }
+
+        assert_eq!(s.trust_db.len(), 9_900);
+        assert_eq!(s0.trust_db.len(), 10_000);
+        assert!(Arc::ptr_eq(&s.rules_db, &s0.rules_db));
+        assert!(Arc::ptr_eq(&s.users, &s0.users));
+        assert!(Arc::ptr_eq(&s.groups, &s0.groups));
+        assert!(Arc::ptr_eq(&s.daemon_config, &s0.daemon_config));
+    }
+
+    #[test]
+    fn changes_fail_on_missing_file() {
+        let s0 = State::empty(&All::default());
+        let mut changes = TrustChanges::new();
+        changes.add("/nonexistent/file");
+        assert!(s0.apply_trust_changes(changes.clone()).is_err());
+        assert!(s0.apply_changes(vec![Changes::Trust(changes)]).is_err());
+    }
+}
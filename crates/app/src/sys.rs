@@ -49,13 +49,20 @@ pub fn deploy_app_state(state: &State) -> Result<(), Error> {
     )
     .map_err(WriteRulesFail)?;
 
-    // write file trust db
-    fapolicy_trust::write::db(
+    // write file trust db, only the trust files that changed are written
+    let stats = fapolicy_trust::write::sync(
         &state.trust_db,
         &PathBuf::from(&state.config.system.trust_dir_path),
         Some(&PathBuf::from(&state.config.system.trust_file_path)),
     )
     .map_err(WriteAncillaryFail)?;
+    log::info!(
+        "wrote {} trust files ({} bytes), {} unchanged, {} removed",
+        stats.written,
+        stats.bytes,
+        stats.unchanged,
+        stats.removed
+    );
 
     Ok(())
 }
@@ -71,6 +71,15 @@ impl<T, E> Logs<T, E> {
         Ok(Self { c, p, f })
     }
 
+    /// Restrict to events within the inclusive time range, bounds in epoch seconds
+    /// The range is applied by auparse so events outside it are never parsed.
+    pub fn between(self, start: Option<i64>, stop: Option<i64>) -> Result<Self, Error> {
+        Ok(Self {
+            c: self.c.with_time_range(start, stop)?,
+            ..self
+        })
+    }
+
     pub fn all_from(path: &Path, p: Box<dyn Parser<T, Error = E>>) -> Result<Self, Error> {
         Self::new(p, None, Some(path))
     }
@@ -81,4 +90,17 @@ impl<T, E> Logs<T, E> {
     ) -> Result<Self, Error> {
         Self::new(p, Some(filter), Some(path))
     }
+
+    /// Parse the records in the text, as read from a log
+    pub fn filtered_text(
+        text: &str,
+        p: Box<dyn Parser<T, Error = E>>,
+        filter: Filter,
+    ) -> Result<Self, Error> {
+        Ok(Self {
+            c: source::buffer(text)?,
+            p,
+            f: Some(filter),
+        })
+    }
 }
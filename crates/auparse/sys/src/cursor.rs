@@ -7,20 +7,60 @@
  */
 
 use crate::error::Error;
+use crate::error::Error::GeneralFail;
 use crate::event::Event;
 use crate::util::{audit_get_int, audit_get_str};
 use crate::{
     auparse_destroy, auparse_get_time, auparse_get_type, auparse_next_event, auparse_state_t,
+    ausearch_add_timestamp_item, ausearch_next_event, ausearch_rule_t_AUSEARCH_RULE_AND,
+    ausearch_rule_t_AUSEARCH_RULE_CLEAR, ausearch_set_stop, austop_t_AUSEARCH_STOP_EVENT,
 };
+use std::os::raw::c_char;
 use std::ptr::NonNull;
 
 pub struct Cursor {
     au: NonNull<auparse_state_t>,
+    search: bool,
+    started: bool,
 }
 
 impl Cursor {
     pub fn new(au: NonNull<auparse_state_t>) -> Self {
-        Cursor { au }
+        Cursor {
+            au,
+            search: false,
+            started: false,
+        }
+    }
+
+    /// Restrict the cursor to events in the time range, bounds are inclusive epoch seconds
+    /// The range is evaluated by auparse, events outside of it are never parsed into fields.
+    pub fn with_time_range(mut self, start: Option<i64>, stop: Option<i64>) -> Result<Self, Error> {
+        let mut how = ausearch_rule_t_AUSEARCH_RULE_CLEAR;
+        for (op, t) in [(">=\0", start), ("<=\0", stop)] {
+            if let Some(t) = t {
+                let r = unsafe {
+                    ausearch_add_timestamp_item(
+                        self.au.as_ptr(),
+                        op.as_ptr() as *const c_char,
+                        t,
+                        0,
+                        how,
+                    )
+                };
+                if r != 0 {
+                    return Err(GeneralFail(format!("invalid timestamp search {}", t)));
+                }
+                how = ausearch_rule_t_AUSEARCH_RULE_AND;
+                self.search = true;
+            }
+        }
+        if self.search
+            && unsafe { ausearch_set_stop(self.au.as_ptr(), austop_t_AUSEARCH_STOP_EVENT) } != 0
+        {
+            return Err(GeneralFail("failed to set search stop".to_string()));
+        }
+        Ok(self)
     }
 }
 
@@ -28,11 +68,21 @@ impl Iterator for Cursor {
     type Item = Event;
 
     fn next(&mut self) -> Option<Self::Item> {
-        unsafe {
-            match auparse_next_event(self.au.as_ptr()) {
-                1 => Some(Event::new(self.au)),
-                _ => None,
+        let r = unsafe {
+            if self.search {
+                // a search matches the current event until the cursor moves past it
+                if self.started && auparse_next_event(self.au.as_ptr()) < 1 {
+                    return None;
+                }
+                self.started = true;
+                ausearch_next_event(self.au.as_ptr())
+            } else {
+                auparse_next_event(self.au.as_ptr())
             }
+        };
+        match r {
+            1 => Some(Event::new(self.au)),
+            _ => None,
         }
     }
 }
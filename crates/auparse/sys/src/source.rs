@@ -8,9 +8,11 @@
 
 use crate::cursor::Cursor;
 use crate::error::Error;
-use crate::error::Error::NativeInitFail;
-use crate::{auparse_init, ausource_t_AUSOURCE_FILE, ausource_t_AUSOURCE_LOGS};
-use std::ffi::c_void;
+use crate::error::Error::{GeneralFail, NativeInitFail};
+use crate::{
+    auparse_init, ausource_t_AUSOURCE_BUFFER, ausource_t_AUSOURCE_FILE, ausource_t_AUSOURCE_LOGS,
+};
+use std::ffi::{c_void, CString};
 use std::path::Path;
 use std::ptr;
 use std::ptr::NonNull;
@@ -36,3 +38,13 @@ pub fn file(path: &Path) -> Result<Cursor, Error> {
         None => Err(NativeInitFail),
     }
 }
+
+/// Parse the records in the text rather than from a log, the text is copied by auparse
+pub fn buffer(text: &str) -> Result<Cursor, Error> {
+    let text = CString::new(text).map_err(|_| GeneralFail("nul in audit text".to_string()))?;
+    let au = unsafe { auparse_init(ausource_t_AUSOURCE_BUFFER, text.as_ptr() as *const c_void) };
+    match NonNull::new(au) {
+        Some(au) => Ok(Cursor::new(au)),
+        None => Err(NativeInitFail),
+    }
+}
@@ -6,15 +6,25 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use std::collections::HashSet;
+use std::collections::{HashMap, VecDeque};
+use std::fs::File;
+use std::sync::{Arc, Mutex};
 
+use pyo3::class::iter::PyIterProtocol;
+use pyo3::exceptions::PyRuntimeError;
 use pyo3::prelude::*;
 
-use fapolicy_analyzer::events::analysis::{analyze, Analysis, ObjAnalysis, SubjAnalysis};
+use fapolicy_analyzer::events::analysis::{
+    analyze_event, analyze_within, subject_access, Analysis, ObjAnalysis, SubjAccess, SubjAnalysis,
+};
 use fapolicy_analyzer::events::db::DB as EventDB;
-use fapolicy_analyzer::events::event::{Event, Perspective};
+use fapolicy_analyzer::events::event::{Event, Perspective, TimeRange};
+use fapolicy_analyzer::events::follow::Follow;
+use fapolicy_analyzer::events::read::EventReader;
 use fapolicy_trust::db::DB as TrustDB;
 
+use crate::system::PySystem;
+
 /// An Event parsed from a fapolicyd log
 #[pyclass(module = "log", name = "Event")]
 #[derive(Clone, Debug)]
@@ -184,31 +194,71 @@ impl PyObject {
 }
 
 #[pyclass(module = "log", name = "EventLog")]
-#[derive(Clone)]
 pub struct PyEventLog {
     pub(crate) rs: EventDB,
     pub(crate) rs_trust: TrustDB,
-    start: Option<i64>,
-    stop: Option<i64>,
+    pub(crate) range: TimeRange,
+    // the most recently used analyses first, an analysis stays valid until new
+    // events are read from a followed source or the trust is replaced on refresh
+    analyzed: Arc<Mutex<VecDeque<Analyzed>>>,
+    source: Option<Box<dyn Follow>>,
 }
 
+/// the number of analyses kept for reuse
+const ANALYZED_CAPACITY: usize = 4;
+
+type Analyzed = ((Perspective, TimeRange), Arc<Vec<Analysis>>);
+
 impl PyEventLog {
     pub(crate) fn new(rs: EventDB, trust: TrustDB) -> Self {
         Self {
             rs,
             rs_trust: trust,
-            start: None,
-            stop: None,
+            range: TimeRange::default(),
+            analyzed: Default::default(),
+            source: None,
+        }
+    }
+
+    /// the source the events were read from, followed on refresh
+    pub(crate) fn with_source(self, source: Box<dyn Follow>) -> Self {
+        Self {
+            source: Some(source),
+            ..self
         }
     }
 
-    fn temporal_filter(&self, e: &PyEvent) -> bool {
-        match (e.rs.event.when, self.start, self.stop) {
-            (None, _, _) | (_, None, None) => true,
-            (Some(t), Some(begin), None) => t.timestamp() >= begin,
-            (Some(t), None, Some(end)) => t.timestamp() <= end,
-            (Some(t), Some(begin), Some(end)) => t.timestamp() >= begin && t.timestamp() <= end,
+    /// the time range the events were loaded with
+    pub(crate) fn with_range(self, range: TimeRange) -> Self {
+        Self { range, ..self }
+    }
+
+    /// analyze from the perspective within the time range, reusing a
+    /// recent result
+    fn analyze(&self, from: Perspective) -> Arc<Vec<Analysis>> {
+        let key = (from, self.range);
+        if let Ok(mut m) = self.analyzed.lock() {
+            if let Some(hit) = m
+                .iter()
+                .position(|(k, _)| *k == key)
+                .and_then(|i| m.remove(i))
+            {
+                let a = hit.1.clone();
+                m.push_front(hit);
+                return a;
+            }
+        }
+        let a = Arc::new(analyze_within(
+            &self.rs,
+            key.0.clone(),
+            &key.1,
+            &self.rs_trust,
+        ));
+        if let Ok(mut m) = self.analyzed.lock() {
+            m.push_front((key, a.clone()));
+            m.truncate(ANALYZED_CAPACITY);
         }
+        a
     }
 }
 
@@ -216,50 +266,145 @@ impl PyEventLog {
 impl PyEventLog {
     /// Get all subjects from the event log
     fn subjects(&self) -> Vec<String> {
-        let m: HashSet<String> = self.rs.iter().filter_map(|e| e.subj.exe()).collect();
-        m.into_iter().collect()
+        self.rs.subjects().map(String::from).collect()
     }
 
     fn begin(&mut self, start: Option<i64>) {
-        self.start = start;
+        self.range.start = start;
     }
 
     fn until(&mut self, stop: Option<i64>) {
-        self.stop = stop;
+        self.range.stop = stop;
+    }
+
+    /// Read the events added to a followed source since it was last read
+    /// The new events are appended to the log, returns the number appended.
+    /// A log that is not followed never has new events. When a system is given
+    /// the events are analyzed against its current trust from then on.
+    #[args(system = "None")]
+    fn refresh(&mut self, py: Python, system: Option<PyRef<PySystem>>) -> PyResult<usize> {
+        if let Some(system) = system {
+            self.rs_trust = system.rs.trust_db.clone();
+            self.analyzed = Default::default();
+        }
+        let source = match self.source.as_mut() {
+            Some(source) => source,
+            None => return Ok(0),
+        };
+        let events = py
+            .allow_threads(|| source.poll())
+            .map_err(|e| PyRuntimeError::new_err(format!("{:?}", e)))?;
+
+        let count = events.len();
+        if count > 0 {
+            self.rs.append(events);
+            self.analyzed = Default::default();
+        }
+        Ok(count)
+    }
+
+    /// True when the log follows its source
+    fn is_following(&self) -> bool {
+        self.source.is_some()
     }
 
     /// Get events that fit the given subject perspective perspective
     fn by_subject(&self, path: &str) -> Vec<PyEvent> {
-        analyze(
-            &self.rs,
-            Perspective::Subject(path.to_string()),
-            &self.rs_trust,
-        )
-        .iter()
-        .flat_map(expand_on_gid)
-        .filter(|e| self.temporal_filter(e))
-        .collect()
+        self.analyze(Perspective::Subject(path.to_string()))
+            .iter()
+            .flat_map(expand_on_gid)
+            .collect()
     }
 
     /// Get events that fit the given user perspective
     fn by_user(&self, uid: i32) -> Vec<PyEvent> {
-        analyze(&self.rs, Perspective::User(uid), &self.rs_trust)
+        self.analyze(Perspective::User(uid))
             .iter()
             .flat_map(|e| expand_on_gid(e).into_iter().filter(|e| e.uid() == uid))
-            .filter(|e| self.temporal_filter(e))
             .collect()
     }
 
     /// Get events that fit the given group perspective
     fn by_group(&self, gid: i32) -> Vec<PyEvent> {
-        analyze(&self.rs, Perspective::Group(gid), &self.rs_trust)
+        self.analyze(Perspective::Group(gid))
             .iter()
             .flat_map(|e| expand_on_gid(e).into_iter().filter(|e| e.gid() == gid))
-            .filter(|e| self.temporal_filter(e))
             .collect()
     }
 }
 
+/// Streams events from a log in batches as they are parsed
+/// Subject access is summarized over the events read so far, the
+/// complete EventLog is available once the stream is exhausted.
+#[pyclass(module = "log", name = "EventStream")]
+pub struct PyEventStream {
+    reader: EventReader<File>,
+    trust: TrustDB,
+    events: Vec<Event>,
+    access: HashMap<String, SubjAccess>,
+}
+
+impl PyEventStream {
+    pub(crate) fn new(reader: EventReader<File>, trust: TrustDB) -> Self {
+        Self {
+            reader,
+            trust,
+            events: vec![],
+            access: HashMap::new(),
+        }
+    }
+
+    fn analyze_batch(&mut self, batch: Vec<Event>) -> Vec<PyEvent> {
+        for (exe, sa) in subject_access(&batch) {
+            self.access.entry(exe.to_string()).or_default().merge(&sa);
+        }
+        let analyzed: Vec<PyEvent> = batch
+            .iter()
+            .map(|e| {
+                let sa = e
+                    .subj
+                    .exe()
+                    .and_then(|exe| self.access.get(&exe).copied())
+                    .unwrap_or_default();
+                analyze_event(e, &sa, &self.trust)
+            })
+            .flat_map(|a| expand_on_gid(&a))
+            .collect();
+        self.events.extend(batch);
+        analyzed
+    }
+}
+
+#[pymethods]
+impl PyEventStream {
+    /// Number of events read so far
+    fn count(&self) -> usize {
+        self.events.len()
+    }
+
+    /// The EventLog of all events read so far
+    fn log(&self) -> PyEventLog {
+        PyEventLog::new(EventDB::from(self.events.clone()), self.trust.clone())
+    }
+}
+
+#[pyproto]
+impl PyIterProtocol for PyEventStream {
+    fn __iter__(slf: PyRef<Self>) -> PyRef<Self> {
+        slf
+    }
+
+    fn __next__(mut slf: PyRefMut<Self>) -> PyResult<Option<Vec<PyEvent>>> {
+        let py = slf.py();
+        let s = &mut *slf;
+        match py.allow_threads(|| s.reader.next()) {
+            Some(Ok(batch)) => Ok(Some(s.analyze_batch(batch))),
+            Some(Err(e)) => Err(PyRuntimeError::new_err(format!("{:?}", e))),
+            None => Ok(None),
+        }
+    }
+}
+
 #[cfg(test)]
 mod tests {
     use super::*;
@@ -297,12 +442,9 @@ mod tests {
     fn temporal_filtering() {
         let e = events();
         let all = e.len();
-        let mut log = PyEventLog {
-            rs: e,
-            rs_trust: Default::default(),
-            start: Some(0),
-            stop: Some(5),
-        };
+        let mut log = PyEventLog::new(e, Default::default());
+        log.begin(Some(0));
+        log.until(Some(5));
         assert_eq!(all, log.by_subject(TEST_PATH).len());
 
         log.begin(Some(1));
@@ -331,5 +473,6 @@ pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PySubject>()?;
     m.add_class::<PyObject>()?;
     m.add_class::<PyEventLog>()?;
+    m.add_class::<PyEventStream>()?;
     Ok(())
 }
@@ -7,28 +7,101 @@
  */
 
 use crate::system::PySystem;
+use fapolicy_trust::cache::DigestCache;
 use fapolicy_trust::db::{Rec, DB};
+use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
-use std::sync::mpsc;
+use std::sync::atomic::{AtomicBool, AtomicUsize, Ordering};
+use std::sync::mpsc::{Receiver, RecvTimeoutError, Sender};
+use std::sync::{mpsc, Arc, Condvar, Mutex};
 use std::thread;
+use std::thread::JoinHandle;
+use std::time::{Duration, Instant};
 
 use crate::trust::PyTrust;
-use fapolicy_trust::stat::{check, Status};
+use fapolicy_trust::stat::{check_tier, Status, Tier};
 
 enum Update {
-    Items(Vec<Status>),
+    Item(Status),
     Done,
 }
 
-// keeping a max of 100 batches for now
-const FIXED_BATCH_COUNT: usize = 100;
+/// default target for the time between 'update' callbacks
+const DEFAULT_BATCH_LATENCY_MS: u64 = 250;
 
-#[derive(Debug, Default)]
-struct BatchConfig {
+/// shorter latencies would spin waiting for updates
+const MIN_BATCH_LATENCY_MS: u64 = 10;
+
+/// checking is bound by disk io as much as by hashing,
+/// the default thread count oversubscribes the cores by this factor
+const IO_CONCURRENCY_FACTOR: usize = 2;
+
+#[derive(Debug)]
+struct SchedulerConfig {
     thread_cnt: usize,
-    thread_load: usize,
-    batch_cnt: usize,
-    batch_load: usize,
+    batch_latency: Duration,
+}
+
+impl SchedulerConfig {
+    fn new(rec_sz: usize, threads: Option<usize>, batch_latency_ms: Option<u64>) -> Self {
+        let thread_cnt = threads.unwrap_or_else(default_thread_count);
+        SchedulerConfig {
+            // never more threads than there are recs to check
+            thread_cnt: thread_cnt.clamp(1, rec_sz.max(1)),
+            batch_latency: Duration::from_millis(
+                batch_latency_ms
+                    .unwrap_or(DEFAULT_BATCH_LATENCY_MS)
+                    .max(MIN_BATCH_LATENCY_MS),
+            ),
+        }
+    }
+}
+
+fn default_thread_count() -> usize {
+    thread::available_parallelism()
+        .map(|n| n.get())
+        .unwrap_or(1)
+        * IO_CONCURRENCY_FACTOR
+}
+
+/// throughput of a single checking thread
+#[derive(Debug, Default)]
+struct ThreadStats {
+    id: usize,
+    files: usize,
+    bytes: u64,
+    elapsed: Duration,
+}
+
+impl ThreadStats {
+    fn bytes_per_sec(&self) -> f64 {
+        match self.elapsed.as_secs_f64() {
+            s if s > 0.0 => self.bytes as f64 / s,
+            _ => 0.0,
+        }
+    }
+}
+
+/// Largest-first queue of records shared by the checking threads.
+/// Threads claim the next record as they finish the last, so a thread
+/// busy with a large file does not hold back any other queued work.
+struct WorkQueue {
+    recs: Vec<Rec>,
+    next: AtomicUsize,
+}
+
+impl WorkQueue {
+    fn new(mut recs: Vec<Rec>) -> Self {
+        recs.sort_unstable_by(|a, b| b.trusted.size.cmp(&a.trusted.size));
+        WorkQueue {
+            recs,
+            next: AtomicUsize::new(0),
+        }
+    }
+
+    fn pop(&self) -> Option<&Rec> {
+        self.recs.get(self.next.fetch_add(1, Ordering::Relaxed))
+    }
 }
 
 pub fn filter_db<F>(db: &DB, f: F) -> Vec<Rec>
@@ -38,165 +111,416 @@ where
     db.values().into_iter().filter(f).cloned().collect()
 }
 
-#[pyfunction]
-fn check_ancillary_trust(system: &PySystem, update: PyObject, done: PyObject) -> PyResult<usize> {
+/// The records of a check and the progress made through them.
+/// Outlives any single run of the checking threads, which is what
+/// allows a cancelled check to resume from the unchecked remainder.
+struct CheckWork {
+    queue: WorkQueue,
+    tier: Tier,
+    cache: Arc<DigestCache>,
+    checked: AtomicUsize,
+    cancelled: AtomicBool,
+}
+
+impl CheckWork {
+    fn new(recs: Vec<Rec>, tier: Tier, cache: Arc<DigestCache>) -> Self {
+        CheckWork {
+            queue: WorkQueue::new(recs),
+            tier,
+            cache,
+            checked: AtomicUsize::new(0),
+            cancelled: AtomicBool::new(false),
+        }
+    }
+
+    fn total(&self) -> usize {
+        self.queue.recs.len()
+    }
+
+    fn is_cancelled(&self) -> bool {
+        self.cancelled.load(Ordering::Relaxed)
+    }
+
+    /// claim the next record, none once drained or cancelled
+    fn next(&self) -> Option<&Rec> {
+        if self.is_cancelled() {
+            None
+        } else {
+            self.queue.pop()
+        }
+    }
+}
+
+#[derive(Debug)]
+struct RunState {
+    running: bool,
+    complete: bool,
+    started: Instant,
+    checked_at_start: usize,
+}
+
+/// State shared between a [PyTrustCheck] and the threads of its current run
+struct CheckState {
+    work: Arc<CheckWork>,
+    cfg: SchedulerConfig,
+    update: PyObject,
+    done: PyObject,
+    delivered: AtomicUsize,
+    // results checked after a cancel, delivered when resumed
+    pending: Mutex<Vec<Status>>,
+    run: Mutex<RunState>,
+    idle: Condvar,
+}
+
+impl CheckState {
+    /// deliver a batch to the 'update' callback
+    /// the cancel flag is tested while holding the gil, so that once cancel
+    /// returns to python no further updates will be made
+    fn deliver(&self, batch: Vec<Status>) {
+        Python::with_gil(|py| {
+            if self.work.is_cancelled() {
+                if let Ok(mut pending) = self.pending.lock() {
+                    pending.extend(batch);
+                }
+                return;
+            }
+            let cnt = self.delivered.fetch_add(batch.len(), Ordering::Relaxed) + batch.len();
+            let r: Vec<_> = batch.into_iter().map(PyTrust::from).collect();
+            if self.update.call1(py, (r, cnt)).is_err() {
+                log::error!("failed make 'update' callback");
+            }
+        });
+    }
+
+    /// make the 'done' callback unless the run was cancelled
+    fn complete(&self) {
+        let complete = Python::with_gil(|py| {
+            if self.work.is_cancelled() {
+                return false;
+            }
+            if self.done.call0(py).is_err() {
+                log::error!("failed to make 'done' callback");
+            }
+            true
+        });
+        if let Ok(mut run) = self.run.lock() {
+            run.running = false;
+            run.complete = complete;
+        }
+        self.idle.notify_all();
+    }
+
+    fn wait_until_idle(&self) {
+        if let Ok(mut run) = self.run.lock() {
+            while run.running {
+                run = match self.idle.wait(run) {
+                    Ok(r) => r,
+                    Err(_) => return,
+                };
+            }
+        }
+    }
+}
+
+/// Handle to a running trust check
+/// Supports cancelling the check and later resuming it from where it stopped.
+#[pyclass(module = "check", name = "TrustCheck")]
+pub struct PyTrustCheck {
+    rs: Arc<CheckState>,
+}
+
+#[pymethods]
+impl PyTrustCheck {
+    /// Total number of records being checked
+    #[getter]
+    fn get_total(&self) -> usize {
+        self.rs.work.total()
+    }
+
+    /// Stop checking, no callbacks are made after this returns
+    fn cancel(&self) {
+        self.rs.work.cancelled.store(true, Ordering::Relaxed);
+    }
+
+    fn is_cancelled(&self) -> bool {
+        self.rs.work.is_cancelled()
+    }
+
+    /// True once every record has been checked and 'done' was called
+    fn is_complete(&self) -> bool {
+        self.rs.run.lock().map(|r| r.complete).unwrap_or(false)
+    }
+
+    /// Tuple of the number of records checked and the total
+    fn progress(&self) -> (usize, usize) {
+        (
+            self.rs.work.checked.load(Ordering::Relaxed),
+            self.rs.work.total(),
+        )
+    }
+
+    /// Estimated seconds remaining, based on the rate of the current run
+    /// None if not running or no records have been checked yet
+    fn eta(&self) -> Option<f64> {
+        let run = self.rs.run.lock().ok()?;
+        if !run.running || self.rs.work.is_cancelled() {
+            return None;
+        }
+        let checked = self.rs.work.checked.load(Ordering::Relaxed);
+        let rate = (checked - run.checked_at_start) as f64 / run.started.elapsed().as_secs_f64();
+        if rate > 0.0 {
+            Some(self.rs.work.total().saturating_sub(checked) as f64 / rate)
+        } else {
+            None
+        }
+    }
+
+    /// Resume a cancelled check from the unchecked remainder
+    /// Waits for the cancelled run to stop, returns false if there was nothing to resume
+    fn resume(&self, py: Python) -> bool {
+        if !self.rs.work.is_cancelled() {
+            return false;
+        }
+        let state = self.rs.clone();
+        py.allow_threads(|| state.wait_until_idle());
+        if self.is_complete() {
+            return false;
+        }
+        self.rs.work.cancelled.store(false, Ordering::Relaxed);
+        start(self.rs.clone());
+        true
+    }
+}
+
+#[pyfunction(tier = "None", threads = "None", batch_latency_ms = "None")]
+fn check_ancillary_trust(
+    system: &PySystem,
+    update: PyObject,
+    done: PyObject,
+    tier: Option<&str>,
+    threads: Option<usize>,
+    batch_latency_ms: Option<u64>,
+) -> PyResult<PyTrustCheck> {
+    let tier = parse_tier(tier)?;
     let recs = filter_db(&system.rs.trust_db, |r| r.is_ancillary());
-    check_disk_trust(recs, update, done)
+    let cfg = SchedulerConfig::new(recs.len(), threads, batch_latency_ms);
+    check_disk_trust(
+        recs,
+        tier,
+        cfg,
+        system.rs.digest_cache.clone(),
+        update,
+        done,
+    )
 }
 
-#[pyfunction]
-fn check_system_trust(system: &PySystem, update: PyObject, done: PyObject) -> PyResult<usize> {
+#[pyfunction(tier = "None", threads = "None", batch_latency_ms = "None")]
+fn check_system_trust(
+    system: &PySystem,
+    update: PyObject,
+    done: PyObject,
+    tier: Option<&str>,
+    threads: Option<usize>,
+    batch_latency_ms: Option<u64>,
+) -> PyResult<PyTrustCheck> {
+    let tier = parse_tier(tier)?;
     let recs = filter_db(&system.rs.trust_db, |r| r.is_system());
-    check_disk_trust(recs, update, done)
+    let cfg = SchedulerConfig::new(recs.len(), threads, batch_latency_ms);
+    check_disk_trust(
+        recs,
+        tier,
+        cfg,
+        system.rs.digest_cache.clone(),
+        update,
+        done,
+    )
 }
 
-#[pyfunction]
-fn check_all_trust(system: &PySystem, update: PyObject, done: PyObject) -> PyResult<usize> {
+#[pyfunction(tier = "None", threads = "None", batch_latency_ms = "None")]
+fn check_all_trust(
+    system: &PySystem,
+    update: PyObject,
+    done: PyObject,
+    tier: Option<&str>,
+    threads: Option<usize>,
+    batch_latency_ms: Option<u64>,
+) -> PyResult<PyTrustCheck> {
+    let tier = parse_tier(tier)?;
     let recs: Vec<_> = system.rs.trust_db.values().into_iter().cloned().collect();
-    check_disk_trust(recs, update, done)
+    let cfg = SchedulerConfig::new(recs.len(), threads, batch_latency_ms);
+    check_disk_trust(
+        recs,
+        tier,
+        cfg,
+        system.rs.digest_cache.clone(),
+        update,
+        done,
+    )
 }
 
-fn callback_on_done(done: PyObject) {
-    Python::with_gil(|py| {
-        if done.call0(py).is_err() {
-            log::error!("failed to make 'done' callback");
-        }
-    })
+/// parse the optional check tier, defaulting to size-gated hashing
+fn parse_tier(tier: Option<&str>) -> PyResult<Tier> {
+    match tier {
+        Some(t) => t
+            .parse::<Tier>()
+            .map_err(|e| PyValueError::new_err(format!("{}", e))),
+        None => Ok(Tier::default()),
+    }
 }
 
-fn check_disk_trust(recs: Vec<Rec>, update: PyObject, done: PyObject) -> PyResult<usize> {
-    if recs.is_empty() {
-        thread::spawn(move || {
-            callback_on_done(done);
-        });
-        return Ok(0);
-    }
+fn check_disk_trust(
+    recs: Vec<Rec>,
+    tier: Tier,
+    cfg: SchedulerConfig,
+    cache: Arc<DigestCache>,
+    update: PyObject,
+    done: PyObject,
+) -> PyResult<PyTrustCheck> {
+    log::debug!("SchedulerConfig: recs: {}, {:?}", recs.len(), cfg);
+
+    let state = Arc::new(CheckState {
+        work: Arc::new(CheckWork::new(recs, tier, cache)),
+        cfg,
+        update,
+        done,
+        delivered: AtomicUsize::new(0),
+        pending: Mutex::new(vec![]),
+        run: Mutex::new(RunState {
+            running: false,
+            complete: false,
+            started: Instant::now(),
+            checked_at_start: 0,
+        }),
+        idle: Condvar::new(),
+    });
+    start(state.clone());
 
-    // determine batch model based on the total recs to be checked
-    let batch_cfg = calculate_batch_config(recs.len());
-    log::debug!(
-        "BatchConf: recs: {}, tc:{}, tl:{}, bc:{}, bl:{}",
-        recs.len(),
-        batch_cfg.thread_cnt,
-        batch_cfg.thread_load,
-        batch_cfg.batch_cnt,
-        batch_cfg.batch_load
-    );
-
-    // 1. split the total recs into sized batches
-    // 2. split the batches into chunks based on thread load
-    let batches: Vec<_> = recs.chunks(batch_cfg.batch_load).map(Vec::from).collect();
-    let batches: Vec<_> = batches
-        .chunks(batch_cfg.thread_load)
-        .map(Vec::from)
-        .collect();
-
-    if batch_cfg.thread_cnt != batches.len() {
-        log::warn!(
-            "warning: thread_cnt {} does not match batch count {}",
-            batch_cfg.thread_cnt,
-            batches.len()
-        );
+    Ok(PyTrustCheck { rs: state })
+}
+
+/// start a run of the checking threads over the remaining records
+fn start(state: Arc<CheckState>) {
+    if let Ok(mut run) = state.run.lock() {
+        run.running = true;
+        run.started = Instant::now();
+        run.checked_at_start = state.work.checked.load(Ordering::Relaxed);
     }
 
     let (tx, rx) = mpsc::channel();
 
     // the on-data-available callback thread
-    // this aggregates all batch threads back into the single callback
+    // this aggregates all checking threads back into the single callback
+    let s = state.clone();
     thread::spawn(move || {
-        let mut cnt = 0;
-        loop {
-            if let Ok(u) = rx.recv() {
-                match u {
-                    Update::Items(i) => {
-                        cnt += i.len();
-                        let r: Vec<_> = i.into_iter().map(PyTrust::from).collect();
-                        Python::with_gil(|py| {
-                            if update.call1(py, (r, cnt)).is_err() {
-                                log::error!("failed make 'update' callback");
-                            }
-                        });
-                    }
-                    Update::Done => break,
-                };
-            }
+        let pending = s
+            .pending
+            .lock()
+            .map(|mut p| std::mem::take(&mut *p))
+            .unwrap_or_default();
+        if !pending.is_empty() {
+            s.deliver(pending);
         }
-
-        callback_on_done(done);
+        batch_updates(rx, s.cfg.batch_latency, |i| s.deliver(i));
+        s.complete();
     });
 
-    // at this point data is organized into per-thread batches
-    // spawn a thread for each of these and loop over the threads load
-    // keep track of the threads to observe when processing is complete
-    let mut handles = vec![];
-    for thread_load in batches {
-        let ttx = tx.clone();
-        let t = thread::spawn(move || {
-            for batch in thread_load {
-                let updates = batch
-                    .into_iter()
-                    .map(|r| check(&r.trusted).unwrap_or(Status::Missing(r.trusted)))
-                    .collect::<Vec<_>>();
-                if ttx.send(Update::Items(updates)).is_err() {
-                    log::error!("failed to send Items msg");
-                };
-            }
-        });
-        handles.push(t);
-    }
+    let handles = spawn_checks(state.work.clone(), state.cfg.thread_cnt, &tx);
 
     // use the tracked threads to observe when processing is complete
     thread::spawn(move || {
         for handle in handles {
-            if handle.join().is_err() {
-                log::error!("failed to join update handle");
+            match handle.join() {
+                Ok(s) => log::debug!(
+                    "check thread {}: {} files, {} bytes in {:?} ({:.1} MB/s)",
+                    s.id,
+                    s.files,
+                    s.bytes,
+                    s.elapsed,
+                    s.bytes_per_sec() / (1024.0 * 1024.0)
+                ),
+                Err(_) => log::error!("failed to join update handle"),
             };
         }
+        let cache = &state.work.cache;
+        let stats = cache.stats();
+        log::debug!(
+            "digest cache: {} hits, {} misses, {} bytes not read",
+            stats.hits,
+            stats.misses,
+            stats.bytes_saved
+        );
+        if let Err(e) = cache.save() {
+            log::warn!("failed to save digest cache: {}", e);
+        }
         if tx.send(Update::Done).is_err() {
             log::error!("failed to send Done msg");
         };
     });
+}
 
-    Ok(recs.len())
+/// spawn the checking threads, each claiming work until it is drained or cancelled
+fn spawn_checks(
+    work: Arc<CheckWork>,
+    thread_cnt: usize,
+    tx: &Sender<Update>,
+) -> Vec<JoinHandle<ThreadStats>> {
+    (0..thread_cnt)
+        .map(|id| {
+            let work = work.clone();
+            let tx = tx.clone();
+            thread::spawn(move || {
+                let t = Instant::now();
+                let mut stats = ThreadStats {
+                    id,
+                    ..ThreadStats::default()
+                };
+                while let Some(r) = work.next() {
+                    let status = check_tier(&r.trusted, work.tier, Some(&work.cache))
+                        .unwrap_or_else(|_| Status::Missing(r.trusted.clone()));
+                    work.checked.fetch_add(1, Ordering::Relaxed);
+                    stats.files += 1;
+                    stats.bytes += r.trusted.size;
+                    if tx.send(Update::Item(status)).is_err() {
+                        log::error!("failed to send Item msg");
+                        break;
+                    }
+                }
+                stats.elapsed = t.elapsed();
+                stats
+            })
+        })
+        .collect()
 }
 
-fn calculate_batch_config(rec_sz: usize) -> BatchConfig {
-    if rec_sz == 0 {
-        return BatchConfig::default();
+/// collect updates into batches that are flushed on a time interval
+/// rather than on a count, so that small files stream back promptly
+/// and large files do not delay the results that are already available
+fn batch_updates<F>(rx: Receiver<Update>, latency: Duration, mut flush: F)
+where
+    F: FnMut(Vec<Status>),
+{
+    let mut batch = vec![];
+    let mut deadline = Instant::now() + latency;
+    loop {
+        match rx.recv_timeout(deadline.saturating_duration_since(Instant::now())) {
+            Ok(Update::Item(s)) => batch.push(s),
+            Ok(Update::Done) | Err(RecvTimeoutError::Disconnected) => break,
+            Err(RecvTimeoutError::Timeout) => {}
+        }
+        if Instant::now() >= deadline {
+            if !batch.is_empty() {
+                flush(std::mem::take(&mut batch));
+            }
+            deadline = Instant::now() + latency;
+        }
     }
-
-    let (batch_load, batch_cnt) = match (rec_sz / FIXED_BATCH_COUNT, rec_sz % FIXED_BATCH_COUNT) {
-        // less than FIXED_BATCH_COUNT, use a single batch
-        (0, rem) => (rem, 1),
-        // batches are all even
-        (sz, 0) => (sz, FIXED_BATCH_COUNT),
-        // batched out with remainder
-        (sz, _) => (sz + 1, FIXED_BATCH_COUNT),
-    };
-
-    // thread count is adjusted based on batch size
-    // larger batches result in more threads
-    let thread_cnt = match (batch_cnt, batch_load) {
-        // one batch, one thread
-        (1, _) => 1,
-        // small batches get 5 threads
-        (_, s) if s <= 1000 => 5,
-        // large batches get 10 threads
-        _ => 10,
-    };
-
-    // thread load is number of batches per thread
-    let thread_load = batch_cnt / thread_cnt;
-
-    BatchConfig {
-        thread_cnt,
-        thread_load,
-        batch_cnt,
-        batch_load,
+    if !batch.is_empty() {
+        flush(batch);
     }
 }
 
 pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
+    m.add_class::<PyTrustCheck>()?;
     m.add_function(wrap_pyfunction!(check_system_trust, m)?)?;
     m.add_function(wrap_pyfunction!(check_ancillary_trust, m)?)?;
     m.add_function(wrap_pyfunction!(check_all_trust, m)?)?;
@@ -206,174 +530,101 @@ pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
 #[cfg(test)]
 mod tests {
     use super::*;
+    use fapolicy_trust::Trust;
 
-    #[test]
-    fn batch_load_0() {
-        let num = 0;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 0);
-        assert_eq!(cfg.batch_load, 0);
-        assert_eq!(cfg.thread_cnt, 0);
-        assert_eq!(cfg.thread_load, 0);
-    }
-
-    #[test]
-    fn batch_load_1() {
-        let num = 1;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 1);
-        assert_eq!(cfg.batch_load, 1);
-        assert_eq!(cfg.thread_cnt, 1);
-        assert_eq!(cfg.thread_load, 1);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-        assert_eq!(1, cfg.thread_load * cfg.thread_cnt);
+    fn rec(path: &str, size: u64) -> Rec {
+        Rec::without_source(Trust::new(path, size, "00"))
     }
 
     #[test]
-    fn batch_load_9() {
-        let num = 9;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 1);
-        assert_eq!(cfg.batch_load, 9);
-        assert_eq!(cfg.thread_cnt, 1);
-        assert_eq!(cfg.thread_load, 1);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-    }
+    fn scheduler_config() {
+        let cfg = SchedulerConfig::new(1000, None, None);
+        assert!(cfg.thread_cnt >= 1);
+        assert_eq!(
+            cfg.batch_latency,
+            Duration::from_millis(DEFAULT_BATCH_LATENCY_MS)
+        );
 
-    #[test]
-    fn batch_load_42() {
-        let num = 42;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 1);
-        assert_eq!(cfg.batch_load, 42);
-        assert_eq!(cfg.thread_cnt, 1);
-        assert_eq!(cfg.thread_load, 1);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-    }
+        let cfg = SchedulerConfig::new(1000, Some(3), Some(10));
+        assert_eq!(cfg.thread_cnt, 3);
+        assert_eq!(cfg.batch_latency, Duration::from_millis(10));
 
-    #[test]
-    fn batch_load_99() {
-        let num = 99;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 1);
-        assert_eq!(cfg.batch_load, 99);
-        assert_eq!(cfg.thread_cnt, 1);
-        assert_eq!(cfg.thread_load, 1);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-    }
+        // bounded below so that batching never spins
+        let cfg = SchedulerConfig::new(1000, None, Some(0));
+        assert_eq!(
+            cfg.batch_latency,
+            Duration::from_millis(MIN_BATCH_LATENCY_MS)
+        );
 
-    #[test]
-    fn batch_load_501() {
-        let num = 501;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 100);
-        assert_eq!(cfg.batch_load, 6);
-        assert_eq!(cfg.thread_cnt, 5);
-        assert_eq!(cfg.thread_load, 20);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-        assert_eq!(100, cfg.thread_load * cfg.thread_cnt);
+        // bounded by recs and never zero
+        assert_eq!(SchedulerConfig::new(2, Some(8), None).thread_cnt, 2);
+        assert_eq!(SchedulerConfig::new(0, Some(8), None).thread_cnt, 1);
+        assert_eq!(SchedulerConfig::new(10, Some(0), None).thread_cnt, 1);
     }
 
     #[test]
-    fn batch_load_999ish() {
-        let num = 999;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 100);
-        assert_eq!(cfg.batch_load, 10);
-        assert_eq!(cfg.thread_cnt, 5);
-        assert_eq!(cfg.thread_load, 20);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-        assert_eq!(100, cfg.thread_load * cfg.thread_cnt);
-
-        let num = 998;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 100);
-        assert_eq!(cfg.batch_load, 10);
-        assert_eq!(cfg.thread_cnt, 5);
-        assert_eq!(cfg.thread_load, 20);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-        assert_eq!(100, cfg.thread_load * cfg.thread_cnt);
-
-        let num = 1000;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 100);
-        assert_eq!(cfg.batch_load, 10);
-        assert_eq!(cfg.thread_cnt, 5);
-        assert_eq!(cfg.thread_load, 20);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-        assert_eq!(100, cfg.thread_load * cfg.thread_cnt);
+    fn queue_is_largest_first() {
+        let q = WorkQueue::new(vec![rec("/a", 1), rec("/b", 100), rec("/c", 10)]);
+        let order: Vec<_> = std::iter::from_fn(|| q.pop())
+            .map(|r| r.trusted.path.as_str())
+            .collect();
+        assert_eq!(order, vec!["/b", "/c", "/a"]);
+        assert!(q.pop().is_none());
     }
 
     #[test]
-    fn batch_load_19999() {
-        let num = 19999;
-        let cfg = calculate_batch_config(num);
-        assert_eq!(cfg.batch_cnt, 100);
-        assert_eq!(cfg.batch_load, 200);
-        assert_eq!(cfg.thread_cnt, 5);
-        assert_eq!(cfg.thread_load, 20);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-        assert_eq!(100, cfg.thread_load * cfg.thread_cnt);
-    }
+    fn checks_every_rec_once() {
+        let recs: Vec<_> = (0..500).map(|i| rec(&format!("/nope/{}", i), i)).collect();
+        let (tx, rx) = mpsc::channel();
+        let work = Arc::new(CheckWork::new(
+            recs,
+            Tier::Stat,
+            Arc::new(DigestCache::new()),
+        ));
+        let handles = spawn_checks(work.clone(), 4, &tx);
+        drop(tx);
+
+        let mut batches = 0;
+        let mut checked = vec![];
+        batch_updates(rx, Duration::from_millis(1), |b| {
+            batches += 1;
+            checked.extend(b);
+        });
+        let files: usize = handles.into_iter().map(|h| h.join().unwrap().files).sum();
 
-    #[test]
-    fn batch_load_60000() {
-        let num = 60000;
-        let cfg = calculate_batch_config(num);
-
-        // assert the basic configuration
-        assert_eq!(cfg.batch_cnt, 100);
-        assert_eq!(cfg.batch_load, 600);
-        assert_eq!(cfg.thread_cnt, 5);
-        assert_eq!(cfg.thread_load, 20);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-        assert_eq!(100, cfg.thread_load * cfg.thread_cnt);
+        assert!(batches >= 1);
+        assert_eq!(files, 500);
+        assert_eq!(checked.len(), 500);
+        assert_eq!(work.checked.load(Ordering::Relaxed), 500);
+        assert!(checked.iter().all(|s| matches!(s, Status::Missing(_))));
     }
 
     #[test]
-    fn batch_load_112020() {
-        let num = 112020;
-        let cfg = calculate_batch_config(num);
-
-        // assert the basic configuration
-        assert_eq!(cfg.batch_cnt, 100);
-        assert_eq!(cfg.batch_load, 1121);
-        assert_eq!(cfg.thread_cnt, 10);
-        assert_eq!(cfg.thread_load, 10);
-
-        // assert that we are within one batch of the total
-        assert!(num <= cfg.batch_cnt * cfg.batch_load);
-        assert!(num / cfg.batch_cnt <= cfg.batch_load);
-        assert_eq!(100, cfg.thread_load * cfg.thread_cnt);
+    fn cancel_and_resume() {
+        let recs: Vec<_> = (0..100).map(|i| rec(&format!("/nope/{}", i), i)).collect();
+        let work = Arc::new(CheckWork::new(
+            recs,
+            Tier::Stat,
+            Arc::new(DigestCache::new()),
+        ));
+
+        // cancelled before starting, nothing is claimed
+        work.cancelled.store(true, Ordering::Relaxed);
+        let (tx, rx) = mpsc::channel();
+        let handles = spawn_checks(work.clone(), 2, &tx);
+        drop(tx);
+        let files: usize = handles.into_iter().map(|h| h.join().unwrap().files).sum();
+        assert_eq!(files, 0);
+        assert!(rx.try_recv().is_err());
+
+        // resuming picks up the remainder
+        work.cancelled.store(false, Ordering::Relaxed);
+        let (tx, rx) = mpsc::channel();
+        let handles = spawn_checks(work.clone(), 2, &tx);
+        drop(tx);
+        let files: usize = handles.into_iter().map(|h| h.join().unwrap().files).sum();
+        assert_eq!(files, 100);
+        assert_eq!(rx.iter().count(), 100);
+        assert_eq!(work.checked.load(Ordering::Relaxed), work.total());
     }
 }
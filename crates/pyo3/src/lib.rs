@@ -16,6 +16,7 @@ pub mod config;
 pub mod daemon;
 pub mod profiler;
 pub mod rules;
+pub mod search;
 pub mod system;
 pub mod trust;
 
@@ -29,6 +30,7 @@ fn rust(_py: Python, m: &PyModule) -> PyResult<()> {
     daemon::init_module(_py, m)?;
     profiler::init_module(_py, m)?;
     rules::init_module(_py, m)?;
+    search::init_module(_py, m)?;
     system::init_module(_py, m)?;
     trust::init_module(_py, m)?;
     m.add_function(wrap_pyfunction!(init_native_logging, m)?)?;
@@ -12,6 +12,7 @@ use pyo3::{exceptions, PyObjectProtocol};
 use fapolicy_rules::db::Entry::*;
 use fapolicy_rules::db::{Entry, DB};
 use fapolicy_rules::error::Error::{MalformedFileMarker, ZeroRulesDefined};
+use fapolicy_rules::linter::probe;
 use fapolicy_rules::ops::Changeset;
 use fapolicy_rules::parser::parse::StrTrace;
 use fapolicy_rules::parser::rule::parse_with_error_message;
@@ -137,6 +138,12 @@ impl PyChangeset {
         PyChangeset::default()
     }
 
+    /// An empty changeset that reads an edit of the text of this one
+    /// incrementally, reusing what was parsed and linted for this one
+    pub fn successor(&self) -> PyChangeset {
+        self.rs.successor().into()
+    }
+
     pub fn get(&self) -> Vec<PyRule> {
         self.rules()
     }
@@ -172,17 +179,30 @@ fn rule_text_error_check(txt: &str) -> Option<String> {
     }
 }
 
+/// Forget the filesystem probes of rule paths, of every path when none are given
+/// The rules linted next see the current state of those paths.
+#[pyfunction]
+fn invalidate_rule_paths(paths: Option<Vec<String>>) {
+    let probes = probe::shared();
+    match paths {
+        Some(paths) => paths.iter().for_each(|p| probes.invalidate(p)),
+        None => probes.clear(),
+    }
+}
+
 pub(crate) fn to_vec(db: &DB) -> Vec<PyRule> {
     db.rules()
         .iter()
         .map(|e| {
             let (valid, text, info) = if e.valid {
-                if e.msg.is_some() {
-                    let w = e.msg.as_ref().unwrap();
-                    (true, e.text.clone(), vec![("w".to_string(), w.clone())])
-                } else {
-                    (true, e.text.clone(), vec![])
-                }
+                // each line of a warning is a separate finding
+                let warnings = e
+                    .msg
+                    .iter()
+                    .flat_map(|w| w.lines())
+                    .map(|w| ("w".to_string(), w.to_string()))
+                    .collect();
+                (true, e.text.clone(), warnings)
             } else {
                 let err = e.msg.as_deref().unwrap_or("???");
                 (
@@ -238,6 +258,7 @@ pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PyRuleInfo>()?;
     m.add_class::<PyChangeset>()?;
     m.add_function(wrap_pyfunction!(rule_text_error_check, m)?)?;
+    m.add_function(wrap_pyfunction!(invalidate_rule_paths, m)?)?;
     Ok(())
 }
 
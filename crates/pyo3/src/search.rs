@@ -0,0 +1,50 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use pyo3::prelude::*;
+use pyo3::PySequenceProtocol;
+
+use fapolicy_util::search::{PathIndex, Query};
+
+/// An index of the paths shown by a list, for the list search
+///
+/// Supports substring, prefix (`/usr/bin/*`) and glob (`*.so`) patterns, and
+/// `status:` terms when the statuses of the paths are indexed, which are
+/// ignored otherwise
+#[pyclass(module = "search", name = "PathIndex")]
+pub struct PyPathIndex {
+    rs: PathIndex,
+}
+
+#[pymethods]
+impl PyPathIndex {
+    #[new]
+    #[args(status = "None")]
+    fn new(py: Python, paths: Vec<String>, status: Option<Vec<String>>) -> Self {
+        let rs = py.allow_threads(|| PathIndex::new(paths, status));
+        Self { rs }
+    }
+
+    /// Positions of the paths that match the search text, in order
+    fn search(&self, py: Python, text: &str) -> Vec<usize> {
+        let query = Query::parse(text);
+        py.allow_threads(|| self.rs.search(&query))
+    }
+}
+
+#[pyproto]
+impl PySequenceProtocol for PyPathIndex {
+    fn __len__(&self) -> usize {
+        self.rs.len()
+    }
+}
+
+pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
+    m.add_class::<PyPathIndex>()?;
+    Ok(())
+}
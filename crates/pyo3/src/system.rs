@@ -9,16 +9,22 @@
 use pyo3::prelude::*;
 use pyo3::{exceptions, PyResult};
 use similar::{ChangeTag, TextDiff};
+use std::collections::HashMap;
 
 use fapolicy_analyzer::events;
 use fapolicy_analyzer::events::db::DB as EventDB;
-use fapolicy_app::app::State;
+use fapolicy_analyzer::events::event::TimeRange;
+use fapolicy_analyzer::events::follow::Follow;
+use fapolicy_analyzer::events::replay::replay;
+use fapolicy_app::app::{Changes, State};
 use fapolicy_app::cfg;
 use fapolicy_app::sys::deploy_app_state;
+use fapolicy_rules::engine::Verdict;
+use fapolicy_trust::db::DB as TrustDB;
 use fapolicy_trust::stat::Status::*;
 
 use crate::acl::{PyGroup, PyUser};
-use crate::analysis::PyEventLog;
+use crate::analysis::{PyEventLog, PyEventStream};
 use crate::daemon::PyConfigInfo;
 use crate::rules::PyRule;
 use crate::trust;
@@ -26,6 +32,24 @@ use crate::{daemon, rules};
 
 use super::trust::PyTrust;
 
+/// Any of the changesets that can be applied to a System
+#[derive(FromPyObject)]
+enum PyAnyChangeset {
+    Trust(trust::PyChangeset),
+    Rules(rules::PyChangeset),
+    Config(daemon::PyChangeset),
+}
+
+impl From<PyAnyChangeset> for Changes {
+    fn from(py: PyAnyChangeset) -> Self {
+        match py {
+            PyAnyChangeset::Trust(c) => Changes::Trust(c.into()),
+            PyAnyChangeset::Rules(c) => Changes::Rules(c.into()),
+            PyAnyChangeset::Config(c) => Changes::Config(c.into()),
+        }
+    }
+}
+
 #[pyclass(module = "app", name = "System")]
 #[derive(Clone)]
 /// An immutable view of host system state.
@@ -91,9 +115,23 @@ impl PySystem {
     }
 
     /// Apply the changeset to the state of this System, produces a new System
-    fn apply_changeset(&self, change: trust::PyChangeset) -> PySystem {
+    fn apply_changeset(&self, change: trust::PyChangeset) -> PyResult<PySystem> {
         log::debug!("apply_changeset");
-        self.rs.apply_trust_changes(change.into()).into()
+        self.rs
+            .apply_trust_changes(change.into())
+            .map(PySystem::from)
+            .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))
+    }
+
+    /// Apply the changesets, of any kind, to the state of this System in order
+    /// Produces one new System however many changesets are applied
+    fn apply_changesets(&self, py: Python, changes: Vec<PyAnyChangeset>) -> PyResult<PySystem> {
+        log::debug!("apply_changesets");
+        let changes: Vec<Changes> = changes.into_iter().map(Changes::from).collect();
+        let rs = &self.rs;
+        py.allow_threads(|| rs.apply_changes(changes))
+            .map(PySystem::from)
+            .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))
     }
 
     /// Apply the changeset to the state of this System, produces a new System
@@ -140,27 +178,103 @@ impl PySystem {
     }
 
     /// Parse events from debug mode log at the specified path
-    fn load_debuglog(&self, log: &str) -> PyResult<PyEventLog> {
+    /// Optionally bounded to the time range, in epoch seconds
+    #[args(start = "None", stop = "None")]
+    fn load_debuglog(
+        &self,
+        log: &str,
+        start: Option<i64>,
+        stop: Option<i64>,
+    ) -> PyResult<PyEventLog> {
         log::debug!("load_debuglog");
-        let xs = events::read::from_debug(log)
+        let range = TimeRange::new(start, stop);
+        let xs = events::read::from_debug(log, range)
             .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
-        Ok(PyEventLog::new(EventDB::from(xs), self.rs.trust_db.clone()))
+        Ok(PyEventLog::new(EventDB::from(xs), self.rs.trust_db.clone()).with_range(range))
     }
 
     /// Parse events from syslog at the specified path
-    fn load_syslog(&self) -> PyResult<PyEventLog> {
+    /// Optionally bounded to the time range, in epoch seconds
+    #[args(start = "None", stop = "None")]
+    fn load_syslog(&self, start: Option<i64>, stop: Option<i64>) -> PyResult<PyEventLog> {
         log::debug!("load_syslog");
-        let xs = events::read::from_syslog(&self.rs.config.system.syslog_file_path)
+        let range = TimeRange::new(start, stop);
+        let xs = events::read::from_syslog(&self.rs.config.system.syslog_file_path, range)
+            .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
+        Ok(PyEventLog::new(EventDB::from(xs), self.rs.trust_db.clone()).with_range(range))
+    }
+
+    /// Stream events from debug mode log at the specified path
+    #[args(start = "None", stop = "None")]
+    fn stream_debuglog(
+        &self,
+        log: &str,
+        start: Option<i64>,
+        stop: Option<i64>,
+    ) -> PyResult<PyEventStream> {
+        log::debug!("stream_debuglog");
+        let r = events::read::stream_debug(log, TimeRange::new(start, stop))
             .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
-        Ok(PyEventLog::new(EventDB::from(xs), self.rs.trust_db.clone()))
+        Ok(PyEventStream::new(r, self.rs.trust_db.clone()))
+    }
+
+    /// Stream events from syslog
+    #[args(start = "None", stop = "None")]
+    fn stream_syslog(&self, start: Option<i64>, stop: Option<i64>) -> PyResult<PyEventStream> {
+        log::debug!("stream_syslog");
+        let r = events::read::stream_syslog(
+            &self.rs.config.system.syslog_file_path,
+            TimeRange::new(start, stop),
+        )
+        .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
+        Ok(PyEventStream::new(r, self.rs.trust_db.clone()))
     }
 
     /// Parse events from the kernel audit log
-    fn load_auditlog(&self) -> PyResult<PyEventLog> {
+    /// Optionally bounded to the time range, in epoch seconds
+    #[args(start = "None", stop = "None")]
+    fn load_auditlog(&self, start: Option<i64>, stop: Option<i64>) -> PyResult<PyEventLog> {
         log::debug!("load_auditlog");
-        let xs = events::read::from_auditlog()
+        let range = TimeRange::new(start, stop);
+        let xs = events::read::from_auditlog(range)
             .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
-        Ok(PyEventLog::new(EventDB::from(xs), self.rs.trust_db.clone()))
+        Ok(PyEventLog::new(EventDB::from(xs), self.rs.trust_db.clone()).with_range(range))
+    }
+
+    /// Follow the debug mode log at the specified path
+    /// The events logged so far are read now, refreshing the returned
+    /// EventLog reads only the events appended since.
+    #[args(start = "None", stop = "None")]
+    fn follow_debuglog(
+        &self,
+        log: &str,
+        start: Option<i64>,
+        stop: Option<i64>,
+    ) -> PyResult<PyEventLog> {
+        log::debug!("follow_debuglog");
+        let range = TimeRange::new(start, stop);
+        let source = events::read::follow_debug(log, range);
+        follow(Box::new(source), range, self.rs.trust_db.clone())
+    }
+
+    /// Follow syslog, refreshing the returned EventLog reads only the
+    /// events appended since it was last read
+    #[args(start = "None", stop = "None")]
+    fn follow_syslog(&self, start: Option<i64>, stop: Option<i64>) -> PyResult<PyEventLog> {
+        log::debug!("follow_syslog");
+        let range = TimeRange::new(start, stop);
+        let source = events::read::follow_syslog(&self.rs.config.system.syslog_file_path, range);
+        follow(Box::new(source), range, self.rs.trust_db.clone())
+    }
+
+    /// Follow the kernel audit log, refreshing the returned EventLog reads
+    /// only the events logged since it was last read
+    #[args(start = "None", stop = "None")]
+    fn follow_auditlog(&self, start: Option<i64>, stop: Option<i64>) -> PyResult<PyEventLog> {
+        log::debug!("follow_auditlog");
+        let range = TimeRange::new(start, stop);
+        let source = events::read::follow_auditlog(range);
+        follow(Box::new(source), range, self.rs.trust_db.clone())
     }
 
     fn rules(&self) -> Vec<PyRule> {
@@ -183,6 +297,16 @@ impl PySystem {
         daemon::conf_info(&self.rs.daemon_config)
     }
 
+    /// Hit and miss counters of the digest cache used by trust checks
+    fn digest_cache_stats(&self) -> HashMap<&'static str, u64> {
+        let stats = self.rs.digest_cache.stats();
+        HashMap::from([
+            ("hits", stats.hits),
+            ("misses", stats.misses),
+            ("bytes_saved", stats.bytes_saved),
+        ])
+    }
+
     // we rely on the gil to keep this synced up
     fn merge(&mut self, trust: Vec<PyTrust>) {
         log::trace!("merging {} entries", trust.len());
@@ -199,6 +323,16 @@ impl PySystem {
     }
 }
 
+/// Read the events logged so far into an EventLog that follows the source
+fn follow(mut source: Box<dyn Follow>, range: TimeRange, trust: TrustDB) -> PyResult<PyEventLog> {
+    let xs = source
+        .poll()
+        .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
+    Ok(PyEventLog::new(EventDB::from(xs), trust)
+        .with_range(range)
+        .with_source(source))
+}
+
 // todo;; this will become more advanced and based on the config object rather than text
 #[pyfunction]
 fn config_difference(lhs: &PySystem, rhs: &PySystem) -> String {
@@ -241,6 +375,57 @@ fn rules_difference(lhs: &PySystem, rhs: &PySystem) -> String {
     diff_lines.join("")
 }
 
+/// Trust paths that differ from the lhs to the rhs system
+/// Returned as a tuple of the added, removed and modified paths, each sorted
+#[pyfunction]
+fn trust_difference(
+    py: Python,
+    lhs: &PySystem,
+    rhs: &PySystem,
+) -> (Vec<String>, Vec<String>, Vec<String>) {
+    log::debug!("trust_difference");
+    let (ldb, rdb) = (&lhs.rs.trust_db, &rhs.rs.trust_db);
+    let diff = py.allow_threads(|| ldb.difference(rdb));
+    (diff.added, diff.removed, diff.modified)
+}
+
+/// Events of the log that the rules of the lhs and rhs systems decide differently
+/// Only the events within the begin and until bounds of the log are replayed.
+/// Returned in log order as tuples of the event text, then the id and decision of
+/// the deciding rule of the lhs and of the rhs, none when no rule matches
+#[pyfunction]
+fn decision_difference(
+    py: Python,
+    log: &PyEventLog,
+    lhs: &PySystem,
+    rhs: &PySystem,
+) -> Vec<(
+    String,
+    Option<usize>,
+    Option<String>,
+    Option<usize>,
+    Option<String>,
+)> {
+    log::debug!("decision_difference");
+    let (ldb, rdb) = (&lhs.rs.rules_db, &rhs.rs.rules_db);
+    let (edb, range) = (&log.rs, &log.range);
+    let changes = py.allow_threads(|| replay(edb, range, ldb, rdb));
+
+    let events: Vec<_> = log.rs.iter().collect();
+    let verdict = |v: Option<Verdict>| match v {
+        Some(v) => (Some(v.rule_id), Some(v.dec.to_string())),
+        None => (None, None),
+    };
+    changes
+        .into_iter()
+        .map(|c| {
+            let (lid, ldec) = verdict(c.before);
+            let (rid, rdec) = verdict(c.after);
+            (events[c.event].to_string(), lid, ldec, rid, rdec)
+        })
+        .collect()
+}
+
 /// Creates a [PySystem] that has all trust entries checked against disk
 #[pyfunction]
 fn checked_system(py: Python) -> PyResult<PySystem> {
@@ -258,6 +443,8 @@ pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PySystem>()?;
     m.add_function(wrap_pyfunction!(config_difference, m)?)?;
     m.add_function(wrap_pyfunction!(rules_difference, m)?)?;
+    m.add_function(wrap_pyfunction!(trust_difference, m)?)?;
+    m.add_function(wrap_pyfunction!(decision_difference, m)?)?;
     m.add_function(wrap_pyfunction!(checked_system, m)?)?;
     Ok(())
 }
@@ -6,7 +6,7 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use pyo3::exceptions::PyRuntimeError;
+use pyo3::exceptions::{PyRuntimeError, PyValueError};
 use std::collections::HashMap;
 use std::io::Write;
 
@@ -129,15 +129,22 @@ impl PyActual {
         self.rs.size
     }
 
+    /// Will be None if the verdict was reached without hashing
     #[getter]
-    fn get_hash(&self) -> &str {
-        &self.rs.hash
+    fn get_hash(&self) -> Option<&str> {
+        self.rs.hash.as_deref()
     }
 
     #[getter]
     fn get_last_modified(&self) -> u64 {
         self.rs.last_modified
     }
+
+    /// The tier of check that produced the verdict; stat, size, or full
+    #[getter]
+    fn get_tier(&self) -> String {
+        self.rs.tier.to_string()
+    }
 }
 
 /// A mutable collection of changes
@@ -176,6 +183,19 @@ impl PyChangeset {
         self.rs.add(path)
     }
 
+    /// Add trust for each of the paths, the files are hashed when applied
+    pub fn add_trust_many(&mut self, paths: Vec<String>) {
+        self.rs.add_many(&paths)
+    }
+
+    /// Add trust for the files in a directory, returns the number of files added
+    #[args(recursive = "false")]
+    pub fn add_trust_dir(&mut self, path: &str, recursive: bool) -> PyResult<usize> {
+        self.rs
+            .add_dir(path, recursive)
+            .map_err(|e| PyRuntimeError::new_err(format!("{:?}", e)))
+    }
+
     pub fn del_trust(&mut self, path: &str) {
         self.rs.del(path)
     }
@@ -193,6 +213,25 @@ impl PyChangeset {
     }
 }
 
+/// Positions of the trust entries ordered by status, mtime, or path
+/// The list views sort on these rather than on their rendered rows, entries
+/// with an equal status or mtime are ordered by path, missing files first.
+#[pyfunction]
+fn trust_sort_index(trust: Vec<PyRef<PyTrust>>, key: &str) -> PyResult<Vec<usize>> {
+    let mut index: Vec<usize> = (0..trust.len()).collect();
+    let path = |i: usize| trust[i].rs_trust.path.as_str();
+    let mtime = |i: usize| trust[i].rs_actual.as_ref().map(|a| a.last_modified);
+    match key {
+        "status" => index.sort_by(|a, b| {
+            (trust[*a].status.as_str(), path(*a)).cmp(&(trust[*b].status.as_str(), path(*b)))
+        }),
+        "mtime" => index.sort_by(|a, b| (mtime(*a), path(*a)).cmp(&(mtime(*b), path(*b)))),
+        "path" => index.sort_by(|a, b| path(*a).cmp(path(*b))),
+        _ => return Err(PyValueError::new_err(format!("unknown sort key {}", key))),
+    }
+    Ok(index)
+}
+
 /// send signal to fapolicyd FIFO pipe to reload the trust database
 #[pyfunction]
 fn signal_trust_reload() -> PyResult<()> {
@@ -214,5 +253,6 @@ pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PyTrust>()?;
     m.add_class::<PyActual>()?;
     m.add_function(wrap_pyfunction!(signal_trust_reload, m)?)?;
+    m.add_function(wrap_pyfunction!(trust_sort_index, m)?)?;
     Ok(())
 }
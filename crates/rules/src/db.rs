@@ -7,7 +7,7 @@
  */
 
 use std::collections::btree_map::Iter;
-use std::collections::BTreeMap;
+use std::collections::{BTreeMap, HashMap};
 use std::fmt::{Display, Formatter};
 
 use Entry::*;
@@ -109,6 +109,8 @@ type DbEntry = (Origin, Entry);
 pub struct DB {
     model: BTreeMap<usize, DbEntry>,
     rules: BTreeMap<usize, RuleEntry>,
+    /// rule ids by fk
+    rules_rev: HashMap<usize, usize>,
     sets: BTreeMap<usize, SetEntry>,
     comments: BTreeMap<usize, CommentEntry>,
 }
@@ -143,6 +145,8 @@ impl DB {
             .map(|e| (e.id, e))
             .collect();
 
+        let rules_rev = rules.values().map(|e| (e._fk, e.id)).collect();
+
         let sets: BTreeMap<usize, SetEntry> = model
             .iter()
             .enumerate()
@@ -184,6 +188,7 @@ impl DB {
         Self {
             model,
             rules,
+            rules_rev,
             sets,
             comments,
         }
@@ -211,7 +216,7 @@ impl DB {
 
     /// Get a RuleEntry ref by FK
     pub fn rule_rev(&self, fk: usize) -> Option<&RuleEntry> {
-        self.rules.iter().find(|(_, e)| e._fk == fk).map(|(_, e)| e)
+        self.rules_rev.get(&fk).and_then(|id| self.rules.get(id))
     }
 
     /// Get a vec of all RuleEntry refs
@@ -0,0 +1,515 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::{HashMap, HashSet};
+
+use rayon::prelude::*;
+
+use crate::db::{Entry, DB};
+use crate::dir_type::DirType;
+use crate::{Decision, ObjPart, Permission, Rule, Rvalue, SubjPart};
+
+const EXEC_DIRS: &[&str] = &[
+    "/usr/",
+    "/bin/",
+    "/sbin/",
+    "/lib/",
+    "/lib64/",
+    "/usr/libexec/",
+];
+const SYSTEM_DIRS: &[&str] = &[
+    "/usr/",
+    "/bin/",
+    "/sbin/",
+    "/lib/",
+    "/lib64/",
+    "/usr/libexec/",
+    "/etc/",
+];
+
+/// An access to decide, the fields of a fapolicyd event
+/// Fields that are not known are none, and a rule that tests them does not
+/// match the access.
+#[derive(Clone, Debug)]
+pub struct Access<'a> {
+    pub perm: Permission,
+    pub uid: Option<u32>,
+    /// the gid and supplementary groups of the subject
+    pub gid: Vec<u32>,
+    pub pid: Option<u32>,
+    pub exe: &'a str,
+    pub comm: Option<&'a str>,
+    pub pattern: Option<&'a str>,
+    pub subj_trust: Option<bool>,
+    pub path: &'a str,
+    pub device: Option<&'a str>,
+    pub ftype: Option<&'a str>,
+    pub obj_trust: Option<bool>,
+}
+
+impl<'a> Access<'a> {
+    pub fn new(perm: Permission, exe: &'a str, path: &'a str) -> Self {
+        Access {
+            perm,
+            uid: None,
+            gid: vec![],
+            pid: None,
+            exe,
+            comm: None,
+            pattern: None,
+            subj_trust: None,
+            path,
+            device: None,
+            ftype: None,
+            obj_trust: None,
+        }
+    }
+}
+
+/// The rule that decides an access
+#[derive(Clone, Debug, PartialEq)]
+pub struct Verdict {
+    pub rule_id: usize,
+    pub dec: Decision,
+}
+
+/// Rules compiled for deciding accesses
+/// Rules are evaluated the way fapolicyd evaluates them, the first rule to
+/// match an access decides it, and an access that no rule matches is allowed
+/// by the daemon. Each rule is indexed under one of its exe, path, dir, uid or
+/// gid, or with the rules that have none of them, for each permission it
+/// applies to. An access is tested against the rules indexed under its own
+/// fields, in rule order, until the first match.
+///
+/// The `untrusted` keyword of exe, path and dir is decided by the trust of the
+/// subject or object. Sets are resolved for ftype, where sets are parsed.
+pub struct Engine {
+    rules: Vec<Compiled>,
+    open: Index,
+    execute: Index,
+    any: Index,
+}
+
+struct Compiled {
+    verdict: Verdict,
+    tests: Vec<Test>,
+}
+
+enum Test {
+    Comm(String),
+    Uid(u32),
+    Gid(u32),
+    Pid(u32),
+    Exe(String),
+    Pattern(String),
+    SubjTrust(bool),
+    Device(String),
+    Dir(String),
+    Dirs(&'static [&'static str]),
+    FileType(String),
+    FileTypes(HashSet<String>),
+    Path(String),
+    ObjTrust(bool),
+}
+
+/// Positions of the rules by the field they are indexed under, in rule order
+#[derive(Default)]
+struct Index {
+    by_exe: HashMap<String, Vec<usize>>,
+    by_path: HashMap<String, Vec<usize>>,
+    /// dirs by their text up to the last slash
+    by_dir: HashMap<String, Vec<usize>>,
+    by_uid: HashMap<u32, Vec<usize>>,
+    by_gid: HashMap<u32, Vec<usize>>,
+    rest: Vec<usize>,
+}
+
+impl Engine {
+    /// Compile the valid rules of the db
+    pub fn compile(db: &DB) -> Self {
+        let mut sets: HashMap<&str, &[String]> = HashMap::new();
+        let mut rules = vec![];
+        for (fk, (_, e)) in db.iter() {
+            match e {
+                Entry::ValidSet(s) | Entry::SetWithWarning(s, _) => {
+                    sets.insert(&s.name, &s.values);
+                }
+                Entry::ValidRule(r) | Entry::RuleWithWarning(r, _) => {
+                    if let Some(id) = db.rule_rev(*fk).map(|e| e.id) {
+                        rules.push(Compiled::new(id, r, &sets));
+                    }
+                }
+                _ => {}
+            }
+        }
+
+        let mut engine = Engine {
+            rules: vec![],
+            open: Index::default(),
+            execute: Index::default(),
+            any: Index::default(),
+        };
+        for (pos, (r, perm)) in rules.into_iter().enumerate() {
+            match perm {
+                Permission::Open => engine.open.insert(pos, &r),
+                Permission::Execute => engine.execute.insert(pos, &r),
+                Permission::Any => {
+                    engine.open.insert(pos, &r);
+                    engine.execute.insert(pos, &r);
+                    engine.any.insert(pos, &r);
+                }
+            }
+            engine.rules.push(r);
+        }
+        engine
+    }
+
+    /// The number of rules compiled
+    pub fn len(&self) -> usize {
+        self.rules.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.rules.is_empty()
+    }
+
+    /// The rule that decides the access, none when no rule matches
+    pub fn evaluate(&self, a: &Access) -> Option<&Verdict> {
+        let ix = match a.perm {
+            Permission::Open => &self.open,
+            Permission::Execute => &self.execute,
+            Permission::Any => &self.any,
+        };
+
+        // the lists are in rule order, a list is searched only up to the
+        // first match found so far
+        let mut first: Option<usize> = None;
+        let mut search = |positions: &[usize]| {
+            for &pos in positions {
+                if first.map_or(false, |f| pos >= f) {
+                    break;
+                }
+                if self.rules[pos].matches(a) {
+                    first = Some(pos);
+                    break;
+                }
+            }
+        };
+        if let Some(ps) = ix.by_exe.get(a.exe) {
+            search(ps);
+        }
+        if let Some(ps) = ix.by_path.get(a.path) {
+            search(ps);
+        }
+        for (i, _) in a.path.match_indices('/') {
+            if let Some(ps) = ix.by_dir.get(&a.path[..=i]) {
+                search(ps);
+            }
+        }
+        if let Some(ps) = a.uid.and_then(|uid| ix.by_uid.get(&uid)) {
+            search(ps);
+        }
+        for gid in a.gid.iter() {
+            if let Some(ps) = ix.by_gid.get(gid) {
+                search(ps);
+            }
+        }
+        search(&ix.rest);
+
+        first.map(|pos| &self.rules[pos].verdict)
+    }
+
+    /// The rules that decide the accesses, in parallel
+    pub fn evaluate_all(&self, accesses: &[Access]) -> Vec<Option<&Verdict>> {
+        accesses.par_iter().map(|a| self.evaluate(a)).collect()
+    }
+}
+
+impl Compiled {
+    fn new(id: usize, r: &Rule, sets: &HashMap<&str, &[String]>) -> (Self, Permission) {
+        let mut tests = vec![];
+        for p in r.subj.parts.iter() {
+            tests.push(match p {
+                SubjPart::All => continue,
+                SubjPart::Comm(c) => Test::Comm(c.clone()),
+                SubjPart::Uid(id) => Test::Uid(*id),
+                SubjPart::Gid(id) => Test::Gid(*id),
+                SubjPart::Pid(id) => Test::Pid(*id),
+                SubjPart::Exe(p) if p == "untrusted" => Test::SubjTrust(false),
+                SubjPart::Exe(p) => Test::Exe(p.clone()),
+                SubjPart::Pattern(p) => Test::Pattern(p.clone()),
+                SubjPart::Trust(b) => Test::SubjTrust(*b),
+            });
+        }
+        for p in r.obj.parts.iter() {
+            tests.push(match p {
+                ObjPart::All => continue,
+                ObjPart::Device(d) => Test::Device(d.clone()),
+                ObjPart::Dir(DirType::Path(d)) => Test::Dir(d.clone()),
+                ObjPart::Dir(DirType::ExecDirs) => Test::Dirs(EXEC_DIRS),
+                ObjPart::Dir(DirType::SystemDirs) => Test::Dirs(SYSTEM_DIRS),
+                ObjPart::Dir(DirType::Untrusted) => Test::ObjTrust(false),
+                ObjPart::FileType(t) => match file_types(t, sets) {
+                    Some(t) => t,
+                    None => continue,
+                },
+                ObjPart::Path(p) if p == "untrusted" => Test::ObjTrust(false),
+                ObjPart::Path(p) => Test::Path(p.clone()),
+                ObjPart::Trust(b) => Test::ObjTrust(*b),
+            });
+        }
+
+        let verdict = Verdict {
+            rule_id: id,
+            dec: r.dec.clone(),
+        };
+        (Compiled { verdict, tests }, r.perm.clone())
+    }
+
+    fn matches(&self, a: &Access) -> bool {
+        self.tests.iter().all(|t| t.matches(a))
+    }
+}
+
+// the test of an ftype, none when any type matches; a set that is not defined
+// holds no types
+fn file_types(t: &Rvalue, sets: &HashMap<&str, &[String]>) -> Option<Test> {
+    let values: Vec<&str> = match t {
+        Rvalue::Any => return None,
+        Rvalue::Literal(l) if l == "any" => return None,
+        Rvalue::Literal(l) => match l.strip_prefix('%') {
+            Some(name) => sets
+                .get(name)
+                .map(|vs| vs.iter().map(|v| v.as_str()).collect())
+                .unwrap_or_default(),
+            None => l.split(',').collect(),
+        },
+        Rvalue::SetRef(s) => s.values.iter().map(|v| v.as_str()).collect(),
+    };
+    Some(match values.as_slice() {
+        [one] => Test::FileType(one.to_string()),
+        _ => Test::FileTypes(values.iter().map(|v| v.to_string()).collect()),
+    })
+}
+
+impl Test {
+    fn matches(&self, a: &Access) -> bool {
+        match self {
+            Test::Comm(c) => a.comm == Some(c.as_str()),
+            Test::Uid(id) => a.uid == Some(*id),
+            Test::Gid(id) => a.gid.contains(id),
+            Test::Pid(id) => a.pid == Some(*id),
+            Test::Exe(p) => a.exe == p.as_str(),
+            Test::Pattern(p) => a.pattern == Some(p.as_str()),
+            Test::SubjTrust(b) => a.subj_trust == Some(*b),
+            Test::Device(d) => a.device == Some(d.as_str()),
+            Test::Dir(d) => a.path.starts_with(d.as_str()),
+            Test::Dirs(ds) => ds.iter().any(|d| a.path.starts_with(d)),
+            Test::FileType(t) => a.ftype == Some(t.as_str()),
+            Test::FileTypes(ts) => a.ftype.map_or(false, |t| ts.contains(t)),
+            Test::Path(p) => a.path == p.as_str(),
+            Test::ObjTrust(b) => a.obj_trust == Some(*b),
+        }
+    }
+}
+
+impl Index {
+    // index the rule under its most selective field
+    fn insert(&mut self, pos: usize, r: &Compiled) {
+        let key = |pick: fn(&Test) -> bool| r.tests.iter().find(|t| pick(t));
+        if let Some(Test::Exe(p)) = key(|t| matches!(t, Test::Exe(_))) {
+            self.by_exe.entry(p.clone()).or_default().push(pos);
+        } else if let Some(Test::Path(p)) = key(|t| matches!(t, Test::Path(_))) {
+            self.by_path.entry(p.clone()).or_default().push(pos);
+        } else if let Some(Test::Dir(d)) = key(|t| matches!(t, Test::Dir(_))) {
+            // a dir matches by prefix, so it is found through the
+            // directories of the path, up to its last slash
+            let dir = d.rfind('/').map(|i| &d[..=i]).unwrap_or("/");
+            self.by_dir.entry(dir.to_string()).or_default().push(pos);
+        } else if let Some(Test::Dirs(ds)) = key(|t| matches!(t, Test::Dirs(_))) {
+            for d in ds.iter() {
+                self.by_dir.entry(d.to_string()).or_default().push(pos);
+            }
+        } else if let Some(Test::Uid(id)) = key(|t| matches!(t, Test::Uid(_))) {
+            self.by_uid.entry(*id).or_default().push(pos);
+        } else if let Some(Test::Gid(id)) = key(|t| matches!(t, Test::Gid(_))) {
+            self.by_gid.entry(*id).or_default().push(pos);
+        } else {
+            self.rest.push(pos);
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::read::deserialize_rules_db;
+    use std::error::Error;
+
+    const POLICY: &str = r#"
+[00-sets.rules]
+%lang=application/x-bytecode.python,text/x-java
+[10-rules.rules]
+allow perm=any uid=0 : path=/etc/shadow
+deny_audit perm=any pattern=ld_preload : all
+allow perm=execute exe=/usr/bin/bash : ftype=%lang
+deny_audit perm=any all : ftype=%lang
+allow perm=open exe=/usr/bin/bash : dir=/home/ trust=0
+allow perm=any gid=10 : dir=/srv
+allow perm=execute all : trust=1
+allow perm=open all : dir=systemdirs
+allow perm=open all : ftype=text/plain,text/x-shellscript
+deny_audit perm=any all : all
+"#;
+
+    fn engine() -> Result<Engine, Box<dyn Error>> {
+        Ok(Engine::compile(&deserialize_rules_db(POLICY)?))
+    }
+
+    fn rule_id(e: &Engine, a: &Access) -> Option<usize> {
+        e.evaluate(a).map(|v| v.rule_id)
+    }
+
+    #[test]
+    fn first_matching_rule_decides() -> Result<(), Box<dyn Error>> {
+        let e = engine()?;
+        assert_eq!(e.len(), 10);
+
+        let shadow = Access {
+            uid: Some(0),
+            ..Access::new(Permission::Open, "/usr/bin/cat", "/etc/shadow")
+        };
+        assert_eq!(rule_id(&e, &shadow), Some(1));
+        let shadow = Access {
+            uid: Some(1000),
+            ..shadow
+        };
+        // systemdirs includes /etc/
+        assert_eq!(rule_id(&e, &shadow), Some(8));
+        // an unknown uid does not match uid=0
+        let unknown = Access {
+            uid: None,
+            ..shadow.clone()
+        };
+        assert_eq!(rule_id(&e, &unknown), Some(8));
+
+        let preload = Access {
+            pattern: Some("ld_preload"),
+            ..shadow.clone()
+        };
+        assert_eq!(rule_id(&e, &preload), Some(2));
+
+        let home = Access::new(Permission::Open, "/usr/bin/bash", "/home/u/notes");
+        assert_eq!(rule_id(&e, &home), Some(10));
+        let home = Access {
+            obj_trust: Some(false),
+            ..home
+        };
+        assert_eq!(rule_id(&e, &home), Some(5));
+        let v = e.evaluate(&home).unwrap();
+        assert_eq!(v.dec, Decision::Allow);
+        Ok(())
+    }
+
+    #[test]
+    fn permissions_sets_and_groups() -> Result<(), Box<dyn Error>> {
+        let e = engine()?;
+        let script = Access {
+            ftype: Some("text/x-java"),
+            ..Access::new(Permission::Execute, "/usr/bin/bash", "/tmp/a.java")
+        };
+        assert_eq!(rule_id(&e, &script), Some(3));
+        let script = Access {
+            perm: Permission::Open,
+            ..script
+        };
+        assert_eq!(rule_id(&e, &script), Some(4));
+
+        let listed = Access {
+            ftype: Some("text/x-shellscript"),
+            ..Access::new(Permission::Open, "/usr/bin/bash", "/tmp/a.sh")
+        };
+        assert_eq!(rule_id(&e, &listed), Some(9));
+
+        // dir=/srv matches by prefix, without a trailing slash
+        let srv = Access {
+            gid: vec![1, 10],
+            ..Access::new(Permission::Open, "/usr/bin/httpd", "/srvdata/index.html")
+        };
+        assert_eq!(rule_id(&e, &srv), Some(6));
+
+        let trusted = Access {
+            obj_trust: Some(true),
+            ..Access::new(Permission::Execute, "/usr/bin/bash", "/opt/tool")
+        };
+        assert_eq!(rule_id(&e, &trusted), Some(7));
+        Ok(())
+    }
+
+    #[test]
+    fn no_matching_rule() -> Result<(), Box<dyn Error>> {
+        let db = deserialize_rules_db("allow perm=open exe=/usr/bin/bash : all")?;
+        let e = Engine::compile(&db);
+        let a = Access::new(Permission::Open, "/usr/bin/sh", "/etc/passwd");
+        assert!(e.evaluate(&a).is_none());
+        Ok(())
+    }
+
+    #[test]
+    fn indexed_evaluation_matches_linear_scan() -> Result<(), Box<dyn Error>> {
+        let e = engine()?;
+        let linear = |a: &Access| {
+            let ix = match a.perm {
+                Permission::Open => &e.open,
+                Permission::Execute => &e.execute,
+                Permission::Any => &e.any,
+            };
+            let mut all: Vec<usize> = ix.by_exe.values().flatten().copied().collect();
+            all.extend(ix.by_path.values().flatten());
+            all.extend(ix.by_dir.values().flatten());
+            all.extend(ix.by_uid.values().flatten());
+            all.extend(ix.by_gid.values().flatten());
+            all.extend(ix.rest.iter());
+            all.sort_unstable();
+            all.into_iter()
+                .find(|pos| e.rules[*pos].matches(a))
+                .map(|pos| e.rules[pos].verdict.rule_id)
+        };
+
+        let exes = ["/usr/bin/bash", "/usr/bin/cat"];
+        let paths = ["/etc/shadow", "/home/u/x", "/srv/x", "/usr/lib/x", "/tmp/x"];
+        let ftypes = [None, Some("text/plain"), Some("text/x-java")];
+        let trust = [None, Some(true), Some(false)];
+        let mut accesses = vec![];
+        for perm in [Permission::Open, Permission::Execute, Permission::Any] {
+            for exe in exes {
+                for path in paths {
+                    for ftype in ftypes {
+                        for obj_trust in trust {
+                            for uid in [0, 1] {
+                                accesses.push(Access {
+                                    ftype,
+                                    obj_trust,
+                                    uid: Some(uid),
+                                    gid: vec![uid + 9],
+                                    ..Access::new(perm.clone(), exe, path)
+                                });
+                            }
+                        }
+                    }
+                }
+            }
+        }
+
+        let verdicts = e.evaluate_all(&accesses);
+        for (a, v) in accesses.iter().zip(verdicts) {
+            assert_eq!(v.map(|v| v.rule_id), linear(a), "{:?}", a);
+        }
+        Ok(())
+    }
+}
@@ -18,13 +18,14 @@ pub use self::subject::Subject;
 use std::collections::HashMap;
 use std::hash::Hash;
 
+pub mod engine;
 pub mod ops;
 pub mod parser;
 
 mod decision;
 mod dir_type;
 mod file_type;
-mod linter;
+pub mod linter;
 mod object;
 
 pub mod db;
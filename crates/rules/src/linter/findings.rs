@@ -6,11 +6,9 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use crate::db::{Entry, DB};
 use crate::dir_type::DirType;
+use crate::linter::lint::Index;
 use crate::Rule;
-use is_executable::IsExecutable;
-use std::path::PathBuf;
 
 pub(crate) const L001_MESSAGE: &str = "Using any+all+all here will short-circuit all other rules";
 pub(crate) const L002_MESSAGE: &str = "The subject exe not exist at";
@@ -21,9 +19,9 @@ pub(crate) const L005_MESSAGE: &str = "Directory should have trailing slash";
 pub(crate) const L006_MESSAGE: &str = "The subject exe is a directory";
 pub(crate) const L007_MESSAGE: &str = "The subject exe is not executable";
 
-pub fn l001(fk: usize, r: &Rule, db: &DB) -> Option<String> {
-    let id = db.rule_rev(fk).map(|e| e.id).unwrap();
-    if id < db.rules().len() // rules are indexed from 1
+pub fn l001(fk: usize, r: &Rule, ix: &Index) -> Option<String> {
+    let id = ix.db.rule_rev(fk).map(|e| e.id).unwrap();
+    if id < ix.rule_count // rules are indexed from 1
         && r.perm.is_any()
         && r.subj.is_all()
         && r.obj.is_all()
@@ -34,39 +32,18 @@ pub fn l001(fk: usize, r: &Rule, db: &DB) -> Option<String> {
     }
 }
 
-pub fn l002_subject_path_missing(_: usize, r: &Rule, _db: &DB) -> Option<String> {
-    if let Some(path) = r.subj.exe().map(PathBuf::from) {
-        if !path.exists() {
-            Some(format!("{} {}", L002_MESSAGE, path.display()))
-        } else {
-            None
-        }
-    } else {
-        None
+pub fn l002_subject_path_missing(_: usize, r: &Rule, ix: &Index) -> Option<String> {
+    match r.subj.exe() {
+        Some(path) if !ix.probes.get(&path).exists => Some(format!("{} {}", L002_MESSAGE, path)),
+        _ => None,
     }
 }
 
-fn is_missing(p: &str) -> bool {
-    !PathBuf::from(p).exists()
-}
-
-fn is_dir(p: &str) -> bool {
-    PathBuf::from(p).is_dir()
-}
-
-fn is_file(p: &str) -> bool {
-    PathBuf::from(p).is_file()
-}
-
-fn is_executable(p: &str) -> bool {
-    PathBuf::from(p).is_executable()
-}
-
-fn path_does_not_exist_message(t: &str, p: &str) -> String {
+pub(crate) fn path_does_not_exist_message(t: &str, p: &str) -> String {
     format!("{} {} {}", t, L003_MESSAGE_A, p)
 }
 
-fn exe_is_a_directory(p: &str) -> String {
+pub(crate) fn exe_is_a_directory(p: &str) -> String {
     format!("{} at {}", L006_MESSAGE, p)
 }
 
@@ -78,9 +55,12 @@ fn wrong_type_message(t: &str) -> String {
     format!("{} {}", L003_MESSAGE_B, t)
 }
 
-pub fn l003_object_path_missing(_: usize, r: &Rule, _db: &DB) -> Option<String> {
+pub fn l003_object_path_missing(_: usize, r: &Rule, ix: &Index) -> Option<String> {
     use crate::object::Part;
 
+    let is_missing = |p: &str| !ix.probes.get(p).exists;
+    let is_dir = |p: &str| ix.probes.get(p).is_dir;
+    let is_file = |p: &str| ix.probes.get(p).is_file;
     r.obj
         .parts
         .iter()
@@ -99,21 +79,14 @@ pub fn l003_object_path_missing(_: usize, r: &Rule, _db: &DB) -> Option<String>
         .cloned()
 }
 
-pub fn l004_duplicate_rule(fk: usize, r: &Rule, db: &DB) -> Option<String> {
-    db.iter()
-        .filter_map(|(&fk2, (_, e))| match e {
-            Entry::ValidRule(other) if fk != fk2 && other == r => {
-                let dupe = db.rule_rev(fk2).map(|e| e.id).unwrap();
-                Some(format!("{} {}", L004_MESSAGE, dupe))
-            }
-            _ => None,
-        })
-        .collect::<Vec<String>>()
-        .first()
-        .cloned()
+pub fn l004_duplicate_rule(fk: usize, r: &Rule, ix: &Index) -> Option<String> {
+    ix.duplicate(fk, r).map(|fk2| {
+        let dupe = ix.db.rule_rev(fk2).map(|e| e.id).unwrap();
+        format!("{} {}", L004_MESSAGE, dupe)
+    })
 }
 
-pub fn l005_object_dir_missing_trailing_slash(_: usize, r: &Rule, _db: &DB) -> Option<String> {
+pub fn l005_object_dir_missing_trailing_slash(_: usize, r: &Rule, _ix: &Index) -> Option<String> {
     use crate::object::Part;
 
     r.obj
@@ -128,15 +101,15 @@ pub fn l005_object_dir_missing_trailing_slash(_: usize, r: &Rule, _db: &DB) -> O
         .cloned()
 }
 
-pub fn l006_l007_subject_exe(_: usize, r: &Rule, _db: &DB) -> Option<String> {
+pub fn l006_l007_subject_exe(_: usize, r: &Rule, ix: &Index) -> Option<String> {
     use crate::subject::Part;
 
     r.subj
         .parts
         .iter()
         .filter_map(|p| match p {
-            Part::Exe(p) if is_dir(p) => Some(exe_is_a_directory(p)),
-            Part::Exe(p) if !is_executable(p) => Some(exe_is_not_executable(p)),
+            Part::Exe(p) if ix.probes.get(p).is_dir => Some(exe_is_a_directory(p)),
+            Part::Exe(p) if !ix.probes.get(p).is_executable => Some(exe_is_not_executable(p)),
             _ => None,
         })
         .collect::<Vec<String>>()
@@ -148,6 +121,7 @@ pub fn l006_l007_subject_exe(_: usize, r: &Rule, _db: &DB) -> Option<String> {
 mod tests {
     use crate::linter::findings::{
         exe_is_a_directory, exe_is_not_executable, path_does_not_exist_message, L004_MESSAGE,
+        L005_MESSAGE,
     };
     use crate::read::deserialize_rules_db;
     use std::error::Error;
@@ -220,9 +194,13 @@ mod tests {
 
         assert!(r.msg.is_some());
         println!("{}", r.msg.as_ref().unwrap());
+        let findings: Vec<&str> = r.msg.as_ref().unwrap().lines().collect();
         assert_eq!(
-            r.msg.as_ref().unwrap(),
-            &path_does_not_exist_message("dir", "/foo")
+            findings,
+            vec![
+                path_does_not_exist_message("dir", "/foo").as_str(),
+                L005_MESSAGE
+            ]
         );
         Ok(())
     }
@@ -6,45 +6,218 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+use std::collections::hash_map::DefaultHasher;
+use std::collections::HashMap;
+use std::hash::{Hash, Hasher};
+use std::sync::Arc;
+use std::time::Instant;
+
+use rayon::prelude::*;
+
 use crate::db::{Entry, DB};
+use crate::dir_type::DirType;
 use crate::linter::findings::*;
-use crate::Rule;
+use crate::linter::probe::{self, ProbeCache};
+use crate::{ObjPart, Rule, SubjPart};
+
+type LintFn = fn(usize, &Rule, &Index) -> Option<String>;
+
+/// What the findings of a lint depend on
+#[derive(Clone, Copy, PartialEq)]
+enum Scope {
+    /// the rule and the paths it names
+    Rule,
+    /// the rule and its place in the policy
+    Policy,
+}
+
+/// The lints, in the order their findings are listed
+const LINTS: [(LintFn, Scope); 6] = [
+    (l001, Scope::Policy),
+    (l002_subject_path_missing, Scope::Rule),
+    (l003_object_path_missing, Scope::Rule),
+    (l004_duplicate_rule, Scope::Policy),
+    (l005_object_dir_missing_trailing_slash, Scope::Rule),
+    (l006_l007_subject_exe, Scope::Rule),
+];
 
-type LintFn = fn(usize, &Rule, &DB) -> Option<String>;
+/// Findings of the rule scoped lints, by rule text
+/// The findings of a rule are reused while the probes they were made from are
+/// current, so a policy that is linted again as it is edited runs the rule
+/// scoped lints only for the rules that are new to it. Clones share the
+/// findings.
+#[derive(Clone, Debug, Default)]
+pub struct LintCache {
+    findings: Arc<HashMap<String, RuleFindings>>,
+}
 
+#[derive(Clone, Debug)]
+struct RuleFindings {
+    at: Instant,
+    generation: usize,
+    /// one for each rule scoped lint
+    findings: Vec<Option<String>>,
+}
+
+impl LintCache {
+    fn get(&self, text: &str, probes: &ProbeCache) -> Option<&RuleFindings> {
+        self.findings
+            .get(text)
+            .filter(|f| f.generation == probes.generation() && f.at.elapsed() < probes.ttl())
+    }
+}
+
+/// Lint every rule of the db, in parallel
+/// A rule with findings becomes a rule with a warning that holds all of its
+/// findings, one per line. Paths are probed through the shared probe cache.
 pub fn lint_db(db: DB) -> DB {
-    let lints: Vec<LintFn> = vec![
-        l001,
-        l002_subject_path_missing,
-        l003_object_path_missing,
-        l004_duplicate_rule,
-        l005_object_dir_missing_trailing_slash,
-        l006_l007_subject_exe,
-    ];
-
-    db.iter()
+    lint_db_with(db, probe::shared())
+}
+
+/// Lint every rule of the db, probing paths through the cache
+pub fn lint_db_with(db: DB, probes: &ProbeCache) -> DB {
+    lint_db_cached(db, probes, &mut LintCache::default())
+}
+
+/// Lint every rule of the db, reusing the cached findings of the rules
+/// The cache is left holding the findings of the rules of this db.
+pub fn lint_db_cached(db: DB, probes: &ProbeCache, cache: &mut LintCache) -> DB {
+    let prior: &LintCache = cache;
+    // the paths of the rules to lint are probed together rather than rule by rule
+    let paths: Vec<&str> = db
+        .iter()
+        .filter_map(|(fk, (_, e))| match e {
+            Entry::ValidRule(r) if prior.get(rule_text(&db, *fk), probes).is_none() => Some(r),
+            _ => None,
+        })
+        .flat_map(rule_paths)
+        .collect();
+    probes.prefetch(&paths);
+
+    let index = Index::new(&db, probes);
+    let linted: Vec<((String, Entry), Option<(String, RuleFindings)>)> = db
+        .iter()
+        .collect::<Vec<_>>()
+        .into_par_iter()
         .map(|(&fk, (source, def))| match def {
             Entry::ValidRule(r) => {
-                let x: Vec<String> = lints.iter().filter_map(|f| f(fk, r, &db)).collect();
-                if x.is_empty() {
-                    (source.clone(), Entry::ValidRule(r.clone()))
+                let text = rule_text(&db, fk);
+                let cached = prior.get(text, probes).cloned();
+                let rule_findings = cached.unwrap_or_else(|| RuleFindings {
+                    at: Instant::now(),
+                    generation: probes.generation(),
+                    findings: LINTS
+                        .iter()
+                        .filter(|(_, scope)| *scope == Scope::Rule)
+                        .map(|(f, _)| f(fk, r, &index))
+                        .collect(),
+                });
+
+                let mut by_rule = rule_findings.findings.iter();
+                let x: Vec<String> = LINTS
+                    .iter()
+                    .filter_map(|(f, scope)| match scope {
+                        Scope::Rule => by_rule.next().cloned().flatten(),
+                        Scope::Policy => f(fk, r, &index),
+                    })
+                    .collect();
+                let entry = if x.is_empty() {
+                    Entry::ValidRule(r.clone())
                 } else {
-                    (
-                        source.clone(),
-                        Entry::RuleWithWarning(r.clone(), x.first().unwrap().clone()),
-                    )
-                }
+                    Entry::RuleWithWarning(r.clone(), x.join("\n"))
+                };
+                (
+                    (source.clone(), entry),
+                    Some((text.to_string(), rule_findings)),
+                )
             }
-            other => (source.clone(), other.clone()),
+            other => ((source.clone(), other.clone()), None),
+        })
+        .collect();
+
+    let (entries, findings): (Vec<_>, Vec<_>) = linted.into_iter().unzip();
+    cache.findings = Arc::new(findings.into_iter().flatten().collect());
+    entries.into()
+}
+
+// the text of the rule at the fk, which identifies the rule
+fn rule_text(db: &DB, fk: usize) -> &str {
+    db.rule_rev(fk).map(|e| e.text.as_str()).unwrap_or_default()
+}
+
+/// Lookups over a db, built once for each lint of the db
+pub struct Index<'a> {
+    pub db: &'a DB,
+    pub probes: &'a ProbeCache,
+    pub rule_count: usize,
+    /// fks of the valid rules by rule key, in fk order
+    by_key: HashMap<u64, Vec<usize>>,
+}
+
+impl<'a> Index<'a> {
+    fn new(db: &'a DB, probes: &'a ProbeCache) -> Self {
+        let mut by_key: HashMap<u64, Vec<usize>> = HashMap::new();
+        for (fk, (_, e)) in db.iter() {
+            if let Entry::ValidRule(r) = e {
+                by_key.entry(rule_key(r)).or_default().push(*fk);
+            }
+        }
+
+        Index {
+            db,
+            probes,
+            rule_count: db.rules().len(),
+            by_key,
+        }
+    }
+
+    /// fk of the first other valid rule that is equal to the rule
+    pub fn duplicate(&self, fk: usize, r: &Rule) -> Option<usize> {
+        self.by_key.get(&rule_key(r))?.iter().copied().find(|fk2| {
+            *fk2 != fk && matches!(self.db.entry(*fk2), Some(Entry::ValidRule(other)) if other == r)
         })
-        .collect::<Vec<(String, Entry)>>()
-        .into()
+    }
+}
+
+// the paths of the rule that are probed by the lints
+fn rule_paths(r: &Rule) -> impl Iterator<Item = &str> {
+    let subj = r.subj.parts.iter().filter_map(|p| match p {
+        SubjPart::Exe(p) => Some(p.as_str()),
+        _ => None,
+    });
+    let obj = r.obj.parts.iter().filter_map(|p| match p {
+        ObjPart::Device(p) | ObjPart::Path(p) | ObjPart::Dir(DirType::Path(p)) => Some(p.as_str()),
+        _ => None,
+    });
+    subj.chain(obj)
+}
+
+// equal rules have equal keys, the parts are hashed in sorted order of their
+// hashes because rule equality does not depend on the order of the parts
+fn rule_key(r: &Rule) -> u64 {
+    fn hash_of<T: Hash>(t: &T) -> u64 {
+        let mut h = DefaultHasher::new();
+        t.hash(&mut h);
+        h.finish()
+    }
+    let mut subj: Vec<u64> = r.subj.parts.iter().map(hash_of).collect();
+    let mut obj: Vec<u64> = r.obj.parts.iter().map(hash_of).collect();
+    subj.sort_unstable();
+    obj.sort_unstable();
+
+    let mut h = DefaultHasher::new();
+    r.dec.to_string().hash(&mut h);
+    r.perm.to_string().hash(&mut h);
+    subj.hash(&mut h);
+    obj.hash(&mut h);
+    h.finish()
 }
 
 #[cfg(test)]
 mod tests {
-    use crate::linter::findings::L001_MESSAGE;
+    use super::*;
     use crate::read::deserialize_rules_db;
+    use crate::{Object, Permission, Subject};
     use std::error::Error;
 
     #[test]
@@ -85,7 +258,99 @@ mod tests {
         )?;
         let r = db.rule(1).unwrap();
         assert!(r.msg.is_some());
-        assert_eq!(r.msg.as_ref().unwrap(), L001_MESSAGE);
+
+        // all findings are kept, in lint order
+        let findings: Vec<&str> = r.msg.as_ref().unwrap().lines().collect();
+        assert_eq!(findings, vec![L001_MESSAGE, "Duplicate of rule 2"]);
+        Ok(())
+    }
+
+    #[test]
+    fn lint_again_uses_cached_probes() {
+        let rule = |obj: &str| {
+            let r = Rule::allow(
+                Subject::from_exe("/"),
+                Permission::Open,
+                Object::from_path(obj),
+            );
+            ("foo.rules".to_string(), Entry::ValidRule(r))
+        };
+        let db: DB = vec![rule("/etc/passwd"), rule("/nonexistent")].into();
+
+        let probes = ProbeCache::new(probe::DEFAULT_TTL);
+        let linted = lint_db_with(db.clone(), &probes);
+        assert_eq!(probes.probes(), 3);
+        let findings: Vec<&str> = linted
+            .rule(2)
+            .unwrap()
+            .msg
+            .iter()
+            .flat_map(|m| m.lines())
+            .collect();
+        assert_eq!(
+            findings,
+            vec![
+                path_does_not_exist_message("file", "/nonexistent"),
+                exe_is_a_directory("/")
+            ]
+        );
+
+        lint_db_with(db.clone(), &probes);
+        assert_eq!(probes.probes(), 3);
+
+        probes.invalidate("/nonexistent");
+        lint_db_with(db, &probes);
+        assert_eq!(probes.probes(), 4);
+    }
+
+    #[test]
+    fn lint_cache_follows_probe_invalidation() -> Result<(), Box<dyn Error>> {
+        let file = tempfile::NamedTempFile::new()?;
+        let path = file.path().display().to_string();
+        let db: DB = vec![(
+            "foo.rules".to_string(),
+            Entry::ValidRule(Rule::allow(
+                Subject::all(),
+                Permission::Open,
+                Object::from_path(&path),
+            )),
+        )]
+        .into();
+
+        let probes = ProbeCache::new(probe::DEFAULT_TTL);
+        let mut cache = LintCache::default();
+        let msg = |db: DB| db.rule(1).unwrap().msg.clone();
+        assert_eq!(msg(lint_db_cached(db.clone(), &probes, &mut cache)), None);
+
+        // the findings of the rule are reused until its path is invalidated
+        file.close()?;
+        assert_eq!(msg(lint_db_cached(db.clone(), &probes, &mut cache)), None);
+        probes.invalidate(&path);
+        assert_eq!(
+            msg(lint_db_cached(db, &probes, &mut cache)),
+            Some(path_does_not_exist_message("file", &path))
+        );
+        Ok(())
+    }
+
+    #[test]
+    fn lint_duplicates_indexed() -> Result<(), Box<dyn Error>> {
+        let db = deserialize_rules_db(
+            r#"
+        [foo.bar]
+        deny perm=open uid=1 gid=2 : dir=/tmp/ trust=1
+        allow perm=open uid=1 gid=2 : dir=/tmp/ trust=1
+        deny perm=open gid=2 uid=1 : trust=1 dir=/tmp/
+        deny perm=open uid=1 : dir=/tmp/ trust=1
+        deny perm=open gid=2 uid=1 : trust=1 dir=/tmp/
+        "#,
+        )?;
+        let msg = |id| db.rule(id).unwrap().msg.clone();
+        assert_eq!(msg(1).as_deref(), Some("Duplicate of rule 3"));
+        assert_eq!(msg(2), None);
+        assert_eq!(msg(3).as_deref(), Some("Duplicate of rule 1"));
+        assert_eq!(msg(4), None);
+        assert_eq!(msg(5).as_deref(), Some("Duplicate of rule 1"));
         Ok(())
     }
 }
@@ -8,3 +8,4 @@
 
 mod findings;
 pub mod lint;
+pub mod probe;
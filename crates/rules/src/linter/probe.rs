@@ -0,0 +1,223 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::HashMap;
+use std::fs;
+use std::path::Path;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::RwLock;
+use std::time::{Duration, Instant};
+
+use is_executable::IsExecutable;
+use once_cell::sync::Lazy;
+use rayon::prelude::*;
+
+/// How long a probe of a path is used before the path is probed again
+pub const DEFAULT_TTL: Duration = Duration::from_secs(30);
+
+static SHARED: Lazy<ProbeCache> = Lazy::new(|| ProbeCache::new(DEFAULT_TTL));
+
+/// The probe cache shared by every lint pass
+pub fn shared() -> &'static ProbeCache {
+    &SHARED
+}
+
+/// What a path is on the filesystem, links are followed
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub struct Probe {
+    pub exists: bool,
+    pub is_dir: bool,
+    pub is_file: bool,
+    pub is_executable: bool,
+}
+
+impl Probe {
+    fn of(path: &str) -> Self {
+        match fs::metadata(path) {
+            Ok(m) => Probe {
+                exists: true,
+                is_dir: m.is_dir(),
+                is_file: m.is_file(),
+                is_executable: m.is_file() && Path::new(path).is_executable(),
+            },
+            Err(_) => Probe::default(),
+        }
+    }
+}
+
+/// A cache of filesystem probes for the paths of rules
+/// A probe is used until it is older than the ttl or the path is invalidated,
+/// so a policy that is linted again probes only the paths that are new to it.
+pub struct ProbeCache {
+    ttl: Duration,
+    entries: RwLock<HashMap<String, (Instant, Probe)>>,
+    probes: AtomicUsize,
+    generation: AtomicUsize,
+}
+
+impl ProbeCache {
+    pub fn new(ttl: Duration) -> Self {
+        ProbeCache {
+            ttl,
+            entries: RwLock::default(),
+            probes: AtomicUsize::new(0),
+            generation: AtomicUsize::new(0),
+        }
+    }
+
+    /// The probe of the path, the path is probed when there is no fresh probe
+    pub fn get(&self, path: &str) -> Probe {
+        if let Some(p) = self.fresh(path) {
+            return p;
+        }
+        let p = self.probe(path);
+        if let Ok(mut entries) = self.entries.write() {
+            entries.insert(path.to_string(), (Instant::now(), p));
+        }
+        p
+    }
+
+    /// Probe the paths without a fresh probe, in parallel
+    /// Probes that have expired are dropped from the cache.
+    pub fn prefetch(&self, paths: &[&str]) {
+        let mut missing: Vec<&str> = paths
+            .iter()
+            .copied()
+            .filter(|p| self.fresh(p).is_none())
+            .collect();
+        missing.sort_unstable();
+        missing.dedup();
+
+        let probed: Vec<(&str, Probe)> = missing
+            .into_par_iter()
+            .map(|p| (p, self.probe(p)))
+            .collect();
+
+        if let Ok(mut entries) = self.entries.write() {
+            let ttl = self.ttl;
+            entries.retain(|_, (t, _)| t.elapsed() < ttl);
+            let now = Instant::now();
+            for (path, p) in probed {
+                entries.insert(path.to_string(), (now, p));
+            }
+        }
+    }
+
+    /// Drop the probe of a path, it is probed again when next used
+    pub fn invalidate(&self, path: &str) {
+        if let Ok(mut entries) = self.entries.write() {
+            entries.remove(path);
+        }
+        self.generation.fetch_add(1, Ordering::Relaxed);
+    }
+
+    /// Drop every probe
+    pub fn clear(&self) {
+        if let Ok(mut entries) = self.entries.write() {
+            entries.clear();
+        }
+        self.generation.fetch_add(1, Ordering::Relaxed);
+    }
+
+    /// How long a probe is used
+    pub fn ttl(&self) -> Duration {
+        self.ttl
+    }
+
+    /// A count of the invalidations, anything derived from the probes is
+    /// current only while the generation is unchanged and within the ttl
+    pub fn generation(&self) -> usize {
+        self.generation.load(Ordering::Relaxed)
+    }
+
+    /// The number of times the filesystem has been probed
+    pub fn probes(&self) -> usize {
+        self.probes.load(Ordering::Relaxed)
+    }
+
+    fn fresh(&self, path: &str) -> Option<Probe> {
+        let entries = self.entries.read().ok()?;
+        match entries.get(path) {
+            Some((t, p)) if t.elapsed() < self.ttl => Some(*p),
+            _ => None,
+        }
+    }
+
+    fn probe(&self, path: &str) -> Probe {
+        self.probes.fetch_add(1, Ordering::Relaxed);
+        Probe::of(path)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::os::unix::fs::PermissionsExt;
+
+    use tempfile::TempDir;
+
+    use super::*;
+
+    #[test]
+    fn probes_kinds() {
+        let dir = TempDir::new().unwrap();
+        let file = dir.path().join("file");
+        fs::write(&file, "x").unwrap();
+        let exe = dir.path().join("exe");
+        fs::write(&exe, "x").unwrap();
+        fs::set_permissions(&exe, fs::Permissions::from_mode(0o755)).unwrap();
+
+        let cache = ProbeCache::new(DEFAULT_TTL);
+        let d = cache.get(&dir.path().display().to_string());
+        assert!(d.exists && d.is_dir && !d.is_file && !d.is_executable);
+        let f = cache.get(&file.display().to_string());
+        assert!(f.exists && f.is_file && !f.is_executable);
+        let x = cache.get(&exe.display().to_string());
+        assert!(x.exists && x.is_file && x.is_executable);
+        assert_eq!(cache.get("/nonexistent/path"), Probe::default());
+    }
+
+    #[test]
+    fn cached_until_invalidated() {
+        let dir = TempDir::new().unwrap();
+        let path = dir.path().join("file");
+        let path_str = path.display().to_string();
+
+        let cache = ProbeCache::new(DEFAULT_TTL);
+        assert!(!cache.get(&path_str).exists);
+        fs::write(&path, "x").unwrap();
+        assert!(!cache.get(&path_str).exists);
+        assert_eq!(cache.probes(), 1);
+
+        cache.invalidate(&path_str);
+        assert!(cache.get(&path_str).exists);
+        assert_eq!(cache.probes(), 2);
+    }
+
+    #[test]
+    fn expired_probes_are_repeated() {
+        let cache = ProbeCache::new(Duration::from_secs(0));
+        cache.get("/");
+        cache.get("/");
+        assert_eq!(cache.probes(), 2);
+    }
+
+    #[test]
+    fn prefetch_probes_each_path_once() {
+        let cache = ProbeCache::new(DEFAULT_TTL);
+        cache.prefetch(&["/", "/usr", "/", "/nonexistent"]);
+        assert_eq!(cache.probes(), 3);
+
+        cache.prefetch(&["/", "/usr", "/tmp"]);
+        assert!(cache.get("/usr").is_dir);
+        assert_eq!(cache.probes(), 4);
+
+        cache.clear();
+        cache.get("/usr");
+        assert_eq!(cache.probes(), 5);
+    }
+}
@@ -10,13 +10,14 @@ use crate::db::{RuleEntry, DB};
 
 use crate::error::Error;
 use crate::error::Error::ZeroRulesDefined;
-use crate::read::deserialize_rules_db;
+use crate::read::IncrementalReader;
 
 // Mutable
 #[derive(Default, Clone, Debug)]
 pub struct Changeset {
     db: DB,
     src: Option<String>,
+    reader: IncrementalReader,
 }
 
 impl Changeset {
@@ -28,8 +29,17 @@ impl Changeset {
         self.src.as_ref()
     }
 
+    /// An empty changeset for an edit of the text of this one
+    /// The text of the edit is read incrementally from the text of this one.
+    pub fn successor(&self) -> Changeset {
+        Changeset {
+            reader: self.reader.clone(),
+            ..Changeset::default()
+        }
+    }
+
     pub fn set(&mut self, text: &str) -> Result<&DB, Error> {
-        match deserialize_rules_db(text) {
+        match self.reader.read(text) {
             Ok(r) if r.is_empty_rules() => Err(ZeroRulesDefined),
             Ok(r) => {
                 self.db = r;
@@ -65,4 +75,21 @@ mod tests {
 
         Ok(())
     }
+
+    #[test]
+    fn successor_reads_edit() -> Result<(), Box<dyn Error>> {
+        let mut cs = Changeset::default();
+        cs.set("[foo.rules]\nallow perm=open all : all")?;
+
+        let mut next = cs.successor();
+        assert!(next.src().is_none());
+        next.set("[foo.rules]\nallow perm=open all : all\nallow perm=open all : all")?;
+        assert_eq!(next.get().rules().len(), 2);
+        assert_eq!(
+            next.rule(1).unwrap().msg.as_deref(),
+            Some("Duplicate of rule 2")
+        );
+        assert_eq!(cs.get().rules().len(), 1);
+        Ok(())
+    }
 }
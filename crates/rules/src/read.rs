@@ -6,17 +6,21 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+use std::collections::HashMap;
 use std::path::PathBuf;
+use std::sync::Arc;
 
 use nom::branch::alt;
 use nom::character::complete::multispace0;
 use nom::combinator::{eof, map, recognize};
 use nom::error::{ErrorKind, ParseError};
 use nom::sequence::tuple;
+use rayon::prelude::*;
 
 use crate::db::{Entry, DB};
 use crate::error::Error;
-use crate::linter::lint::lint_db;
+use crate::linter::lint::{lint_db, lint_db_cached, LintCache};
+use crate::linter::probe;
 use crate::load::RuleFrom::{Disk, Mem};
 use crate::load::RuleSource;
 use crate::parser::parse::{StrTrace, TraceResult};
@@ -89,31 +93,78 @@ fn read_rules_db(xs: Vec<RuleSource>) -> Result<DB, Error> {
     let lookup: Vec<(String, Entry)> = xs
         .iter()
         .map(relativized_path)
-        .map(|(source, l)| (source, parser(l)))
-        .flat_map(|(source, r)| match r {
-            Ok((t, rule)) if t.current.is_empty() => Some((source, rule)),
-            Ok((_, _)) => None,
-            Err(nom::Err::Error(LineError::CannotParse(i, why))) => {
-                Some((source, Malformed(i.to_string(), why)))
-            }
-            Err(nom::Err::Error(LineError::CannotParseSet(i, why))) => {
-                Some((source, MalformedSet(i.to_string(), why)))
-            }
-            Err(_) => None,
-        })
-        .filter_map(|(source, line)| match line {
-            RuleDef(r) => Some((source, Entry::ValidRule(r))),
-            SetDef(s) => Some((source, Entry::ValidSet(s))),
-            Malformed(text, error) => Some((source, Entry::Invalid { text, error })),
-            MalformedSet(text, error) => Some((source, Entry::InvalidSet { text, error })),
-            Comment(text) => Some((source, Entry::Comment(text))),
-            _ => None,
-        })
+        .filter_map(|(source, l)| parse_line(l).map(|e| (source, e)))
         .collect();
 
     Ok(lint_db(DB::from_sources(lookup)))
 }
 
+// the entry of a line, none for a blank line
+fn parse_line(l: &str) -> Option<Entry> {
+    let line = match parser(l) {
+        Ok((t, line)) if t.current.is_empty() => line,
+        Ok((_, _)) => return None,
+        Err(nom::Err::Error(LineError::CannotParse(i, why))) => Malformed(i.to_string(), why),
+        Err(nom::Err::Error(LineError::CannotParseSet(i, why))) => MalformedSet(i.to_string(), why),
+        Err(_) => return None,
+    };
+    match line {
+        RuleDef(r) => Some(Entry::ValidRule(r)),
+        SetDef(s) => Some(Entry::ValidSet(s)),
+        Malformed(text, error) => Some(Entry::Invalid { text, error }),
+        MalformedSet(text, error) => Some(Entry::InvalidSet { text, error }),
+        Comment(text) => Some(Entry::Comment(text)),
+        Blank => None,
+    }
+}
+
+/// Reads rules text again as it is edited
+/// The lines of the text are matched by their text to the lines of the last
+/// text read, only the lines that are new to the text are parsed and only the
+/// rules that are new to it are linted by the rule scoped lints. The lints
+/// that depend on the place of a rule in the policy are run for every rule.
+/// Clones share what was read.
+#[derive(Clone, Debug, Default)]
+pub struct IncrementalReader {
+    lines: Arc<HashMap<String, Option<Entry>>>,
+    lints: LintCache,
+}
+
+impl IncrementalReader {
+    pub fn read(&mut self, text: &str) -> Result<DB, Error> {
+        let xs = load::rules_from(Mem(text.to_string()))?;
+
+        let mut lines: HashMap<String, Option<Entry>> = HashMap::with_capacity(xs.len());
+        let mut changed: Vec<&str> = vec![];
+        for (_, l) in xs.iter() {
+            match self.lines.get(l) {
+                Some(e) if !lines.contains_key(l) => {
+                    lines.insert(l.clone(), e.clone());
+                }
+                Some(_) => {}
+                None => changed.push(l),
+            }
+        }
+        changed.sort_unstable();
+        changed.dedup();
+        let parsed: Vec<(&str, Option<Entry>)> = changed
+            .into_par_iter()
+            .map(|l| (l, parse_line(l)))
+            .collect();
+        lines.extend(parsed.into_iter().map(|(l, e)| (l.to_string(), e)));
+
+        let lookup: Vec<(String, Entry)> = xs
+            .iter()
+            .map(relativized_path)
+            .filter_map(|(source, l)| lines[l.as_str()].clone().map(|e| (source, e)))
+            .collect();
+        let db = lint_db_cached(DB::from_sources(lookup), probe::shared(), &mut self.lints);
+
+        self.lines = Arc::new(lines);
+        Ok(db)
+    }
+}
+
 fn relativized_path(i: &(PathBuf, String)) -> (String, &String) {
     (
         // render and split off the filename from full path
@@ -129,9 +180,43 @@ fn relativized_path(i: &(PathBuf, String)) -> (String, &String) {
 
 #[cfg(test)]
 mod tests {
-    use crate::read::relativized_path;
+    use crate::db::DB;
+    use crate::read::{deserialize_rules_db, relativized_path, IncrementalReader};
+    use std::error::Error;
     use std::path::PathBuf;
 
+    fn summary(db: &DB) -> Vec<(usize, String, String, bool, Option<String>)> {
+        db.rules()
+            .iter()
+            .map(|e| {
+                let (text, origin, msg) = (e.text.clone(), e.origin.clone(), e.msg.clone());
+                (e.id, text, origin, e.valid, msg)
+            })
+            .collect()
+    }
+
+    #[test]
+    fn incremental_read_matches_full_read() -> Result<(), Box<dyn Error>> {
+        let edits = [
+            "[a.rules]\nallow perm=open all : all\ndeny perm=any all : all",
+            // a duplicate of an unchanged rule
+            "[a.rules]\nallow perm=open all : all\ndeny perm=any all : all\nallow perm=open all : all",
+            // an invalid line and a rule moved to another file
+            "[a.rules]\nallow perm=open all : all\nbad rule\n[b.rules]\ndeny perm=any all : all",
+            // the duplicate removed, and a set
+            "[a.rules]\n%lang=ruby,python\nbad rule\n[b.rules]\ndeny perm=any all : all",
+        ];
+
+        let mut reader = IncrementalReader::default();
+        for text in edits.iter() {
+            let full = deserialize_rules_db(text)?;
+            let incremental = reader.read(text)?;
+            assert_eq!(summary(&incremental), summary(&full));
+            assert_eq!(incremental.len(), full.len());
+        }
+        Ok(())
+    }
+
     #[test]
     fn test_relativize_path() {
         // absolute path
@@ -0,0 +1,65 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use fapolicy_rules::engine::{Access, Engine};
+use fapolicy_rules::read::deserialize_rules_db;
+use fapolicy_rules::Permission;
+use std::error::Error;
+use std::time::Instant;
+
+// a generated policy of n rules for n applications, each allowed to open the
+// trusted files of its own directory, followed by the system directories
+fn synthetic_policy(n: usize) -> String {
+    let mut txt = String::from("[00-generated.rules]\n");
+    for i in 0..n {
+        txt.push_str(&format!(
+            "allow perm=open exe=/usr/bin/app{} : dir=/opt/app{}/ trust=1\n",
+            i, i
+        ));
+    }
+    txt.push_str("allow perm=open all : dir=systemdirs\n");
+    txt.push_str("deny_audit perm=any all : all\n");
+    txt
+}
+
+// cargo test --release -p fapolicy-rules -- --ignored --nocapture
+#[test]
+#[ignore]
+fn bench_evaluate_synthetic_policy() -> Result<(), Box<dyn Error>> {
+    let count = 1_000_000;
+    for n in [1_000, 10_000] {
+        let engine = Engine::compile(&deserialize_rules_db(&synthetic_policy(n))?);
+        let exes: Vec<String> = (0..n * 2).map(|i| format!("/usr/bin/app{}", i)).collect();
+        let paths: Vec<String> = (0..n * 2)
+            .map(|i| format!("/opt/app{}/lib/x.so", i))
+            .collect();
+        let accesses: Vec<Access> = (0..count)
+            .map(|i| Access {
+                obj_trust: Some(i % 3 != 0),
+                ..Access::new(
+                    Permission::Open,
+                    &exes[i % exes.len()],
+                    &paths[(i * 7) % paths.len()],
+                )
+            })
+            .collect();
+
+        let t = Instant::now();
+        let decided = engine.evaluate_all(&accesses);
+        let elapsed = t.elapsed();
+        assert!(decided.iter().all(Option::is_some));
+        println!(
+            "{:>6} rules: {} accesses in {:>8.1} ms, {:.1}M/s",
+            n,
+            count,
+            elapsed.as_secs_f64() * 1000.0,
+            count as f64 / elapsed.as_secs_f64() / 1e6
+        );
+    }
+    Ok(())
+}
@@ -0,0 +1,85 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use fapolicy_rules::read::{deserialize_rules_db, IncrementalReader};
+use std::error::Error;
+use std::time::Instant;
+
+// a generated policy of n rules over ten rules files, every tenth rule repeats
+// an earlier one
+fn synthetic_policy(n: usize) -> String {
+    let mut txt = String::new();
+    for i in 0..n {
+        if i % (n / 10).max(1) == 0 {
+            txt.push_str(&format!("[{:02}-generated.rules]\n", i / (n / 10).max(1)));
+        }
+        let id = if i % 10 == 9 { i - 5 } else { i };
+        txt.push_str(&format!(
+            "allow perm=open uid={} gid={} : dir=/usr/ trust=1\n",
+            id,
+            id % 97
+        ));
+    }
+    txt
+}
+
+#[test]
+fn lint_finds_generated_duplicates() -> Result<(), Box<dyn Error>> {
+    let db = deserialize_rules_db(&synthetic_policy(100))?;
+    let dupes = db
+        .rules()
+        .iter()
+        .filter(|r| matches!(&r.msg, Some(m) if m.starts_with("Duplicate of rule")))
+        .count();
+    // each repeat and the rule it repeats
+    assert_eq!(dupes, 20);
+    Ok(())
+}
+
+// cargo test --release -p fapolicy-rules -- --ignored --nocapture
+#[test]
+#[ignore]
+fn bench_lint_synthetic_policy() -> Result<(), Box<dyn Error>> {
+    for n in [1_000, 10_000] {
+        let txt = synthetic_policy(n);
+        let t = Instant::now();
+        let db = deserialize_rules_db(&txt)?;
+        let elapsed = t.elapsed();
+        assert_eq!(db.rules().len(), n);
+        println!(
+            "{:>6} rules: read and linted in {:>8.1} ms",
+            n,
+            elapsed.as_secs_f64() * 1000.0
+        );
+    }
+    Ok(())
+}
+
+// cargo test --release -p fapolicy-rules -- --ignored --nocapture
+#[test]
+#[ignore]
+fn bench_reread_edited_policy() -> Result<(), Box<dyn Error>> {
+    for n in [1_000, 10_000] {
+        let txt = synthetic_policy(n);
+        let mut reader = IncrementalReader::default();
+        reader.read(&txt)?;
+
+        // a rule edited in the middle of the policy
+        let edited = txt.replacen("uid=500 ", "uid=50000 ", 1);
+        let t = Instant::now();
+        let db = reader.read(&edited)?;
+        let elapsed = t.elapsed();
+        assert_eq!(db.rules().len(), n);
+        println!(
+            "{:>6} rules: edit read and linted in {:>8.1} ms",
+            n,
+            elapsed.as_secs_f64() * 1000.0
+        );
+    }
+    Ok(())
+}
@@ -13,28 +13,31 @@
 // You should have received a copy of the GNU General Public License
 // along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+use std::cmp::Ordering;
 use std::fs::File;
 use std::io;
-use std::io::{BufReader, Write};
+use std::io::Write;
 use std::path::{Path, PathBuf};
 use std::process::{Command, Output};
-use std::time::SystemTime;
+use std::time::{Duration, Instant, SystemTime};
 
 use clap::Parser;
-use lmdb::{Cursor, DatabaseFlags, Environment, Transaction, WriteFlags};
+use lmdb::{Cursor, Database, DatabaseFlags, Environment, Transaction, WriteFlags};
 use rayon::prelude::*;
 use thiserror::Error;
 
 use fapolicy_app::cfg;
 use fapolicy_daemon::fapolicyd::TRUST_LMDB_NAME;
+use fapolicy_trust::cache::DigestCache;
 use fapolicy_trust::load::keep_entry;
-use fapolicy_trust::read::rpm_trust;
+use fapolicy_trust::read::rpm_trust_with;
 use fapolicy_trust::stat::Status::{Discrepancy, Missing, Trusted};
+use fapolicy_trust::stat::Tier;
 use fapolicy_trust::{check, load, parse, read, Trust};
-use fapolicy_util::sha::sha256_digest;
+use fapolicy_util::sha::sha256_file;
 
 use crate::Error::{DirTrustError, DpkgCommandFail, DpkgNotFound};
-use crate::Subcommand::{Add, Check, Clear, Count, Del, Dump, Init, Load, Search};
+use crate::Subcommand::{Add, Bench, Check, Clear, Count, Del, Dump, Init, Load, Search};
 
 /// An Error that can occur in this app
 #[derive(Error, Debug)]
@@ -105,6 +108,8 @@ enum Subcommand {
     Count(CountOpts),
     /// Load file trust entries
     Load(LoadOpts),
+    /// Measure throughput against a database of synthesized entries
+    Bench(BenchOpts),
 }
 
 #[derive(Parser)]
@@ -131,6 +136,14 @@ struct InitOpts {
     /// use par_iter
     #[clap(long)]
     par: bool,
+
+    /// number of concurrent rpm queries, defaults to the number of cores
+    #[clap(long)]
+    shards: Option<usize>,
+
+    /// number of records committed per transaction
+    #[clap(long, default_value = "65536")]
+    chunk: usize,
 }
 
 #[derive(Parser)]
@@ -164,20 +177,48 @@ struct CheckDbOpts {
     /// use par_iter
     #[clap(long)]
     par: bool,
+
+    /// ignore the digest cache and rehash every file
+    #[clap(long)]
+    paranoid: bool,
+
+    /// depth of the check; stat, size, or full
+    #[clap(long, default_value = "size")]
+    tier: Tier,
 }
 
 #[derive(Parser)]
 struct LoadOpts {
     /// File trust source
     path: String,
+
+    /// number of records committed per transaction
+    #[clap(long, default_value = "65536")]
+    chunk: usize,
+}
+
+#[derive(Parser)]
+struct BenchOpts {
+    /// number of records to synthesize
+    #[clap(short, long, default_value = "100000")]
+    count: usize,
+
+    /// number of records committed per transaction
+    #[clap(long, default_value = "65536")]
+    chunk: usize,
 }
 
 #[derive(Parser)]
 struct CountOpts {}
 
 fn main() -> Result<(), Error> {
-    let sys_conf = cfg::All::load()?;
     let all_opts: Opts = Opts::parse();
+    // the bench works in a database of its own
+    if let Bench(opts) = &all_opts.cmd {
+        return bench(opts, all_opts.verbose);
+    }
+
+    let sys_conf = cfg::All::load()?;
     let trust_db_path = match all_opts.dbdir {
         Some(ref p) => Path::new(p),
         None => Path::new(&sys_conf.system.trust_lmdb_path),
@@ -193,24 +234,192 @@ fn main() -> Result<(), Error> {
         println!("opening trust db at {}", trust_db_path.to_string_lossy());
     }
 
-    let env = Environment::new()
-        .set_max_dbs(1)
-        .set_map_size(104857600)
-        .open(trust_db_path)?;
+    let env = open_env(trust_db_path, DEFAULT_MAP_SIZE)?;
 
     match all_opts.cmd {
         Clear(opts) => clear(opts, &sys_conf, &env),
-        Init(opts) => init(opts, all_opts.verbose, &sys_conf, &env),
+        Init(opts) => init(opts, all_opts.verbose, &sys_conf, env, trust_db_path),
         Add(opts) => add(opts, &sys_conf, &env),
         Del(opts) => del(opts, &sys_conf, &env),
         Dump(opts) => dump(opts, &sys_conf),
         Search(opts) => find(opts, &sys_conf, &env),
         Check(opts) => check(opts, &sys_conf),
         Count(opts) => count(opts, &sys_conf, &env),
-        Load(opts) => load(opts, all_opts.verbose, &sys_conf, &env),
+        Load(opts) => load(opts, all_opts.verbose, &sys_conf, env, trust_db_path),
+        Bench(_) => unreachable!(),
     }
 }
 
+/// initial size of the lmdb map, it is grown as needed while writing
+const DEFAULT_MAP_SIZE: usize = 104857600;
+
+fn open_env(path: &Path, map_size: usize) -> Result<Environment, Error> {
+    Ok(Environment::new()
+        .set_max_dbs(1)
+        .set_map_size(map_size)
+        .open(path)?)
+}
+
+/// The last record appended to a db that was empty when writing began
+#[derive(Clone, Default)]
+struct Tail {
+    key: Vec<u8>,
+    val: Vec<u8>,
+}
+
+impl Tail {
+    // records sorting after the tail can be appended without a search
+    fn flags(&self, key: &[u8], val: &[u8]) -> WriteFlags {
+        match key.cmp(&self.key) {
+            Ordering::Greater => WriteFlags::APPEND,
+            Ordering::Equal if val > self.val.as_slice() => WriteFlags::APPEND_DUP,
+            _ => WriteFlags::empty(),
+        }
+    }
+}
+
+/// Totals of a bulk write
+#[derive(Default)]
+struct WriteStats {
+    written: usize,
+    skipped: usize,
+    chunks: usize,
+    elapsed: Duration,
+}
+
+/// Writes trust records sorted by path, committing a chunk at a time
+/// When the map fills the env is reopened with twice the map size and the
+/// chunk being written is retried, the chunks already committed are kept.
+struct BulkWriter<'a> {
+    path: &'a Path,
+    env: Option<Environment>,
+    map_size: usize,
+    chunk: usize,
+}
+
+impl<'a> BulkWriter<'a> {
+    fn new(path: &'a Path, env: Environment, chunk: usize) -> Self {
+        BulkWriter {
+            path,
+            env: Some(env),
+            map_size: DEFAULT_MAP_SIZE,
+            chunk: chunk.max(1),
+        }
+    }
+
+    fn env(&self) -> &Environment {
+        self.env.as_ref().expect("env is open")
+    }
+
+    fn into_env(mut self) -> Environment {
+        self.env.take().expect("env is open")
+    }
+
+    // an env must be closed before the same db is opened again in this process
+    fn grow(&mut self) -> Result<(), Error> {
+        self.env = None;
+        self.map_size *= 2;
+        self.env = Some(open_env(self.path, self.map_size)?);
+        Ok(())
+    }
+
+    fn write(
+        &mut self,
+        source: u8,
+        mut records: Vec<Trust>,
+        verbose: bool,
+    ) -> Result<WriteStats, Error> {
+        let t = Instant::now();
+        records.par_sort_by(|a, b| a.path.cmp(&b.path));
+
+        let mut db = self.env().open_db(Some(TRUST_LMDB_NAME))?;
+        let mut tail = if self.is_empty(db)? {
+            Some(Tail::default())
+        } else {
+            None
+        };
+
+        let mut stats = WriteStats::default();
+        for chunk in records.chunks(self.chunk) {
+            loop {
+                let mut next = tail.clone();
+                match self.write_chunk(db, source, chunk, &mut next, verbose) {
+                    Ok(written) => {
+                        stats.written += written;
+                        stats.skipped += chunk.len() - written;
+                        stats.chunks += 1;
+                        tail = next;
+                        break;
+                    }
+                    Err(Error::LmdbError(lmdb::Error::MapFull)) => {
+                        self.grow()?;
+                        db = self.env().open_db(Some(TRUST_LMDB_NAME))?;
+                        if verbose {
+                            println!("grew map to {} bytes", self.map_size);
+                        }
+                    }
+                    Err(e) => return Err(e),
+                }
+            }
+        }
+        stats.elapsed = t.elapsed();
+        Ok(stats)
+    }
+
+    // write the chunk in a transaction of its own, a full map aborts the chunk
+    fn write_chunk(
+        &self,
+        db: Database,
+        source: u8,
+        chunk: &[Trust],
+        tail: &mut Option<Tail>,
+        verbose: bool,
+    ) -> Result<usize, Error> {
+        let mut tx = self.env().begin_rw_txn()?;
+        let mut val = Vec::with_capacity(96);
+        let mut written = 0;
+        for trust in chunk {
+            val.clear();
+            write!(val, "{} {} {}", source, trust.size, trust.hash)?;
+            let key = trust.path.as_bytes();
+            let flags = match tail {
+                Some(tail) => tail.flags(key, &val),
+                None => WriteFlags::empty(),
+            };
+            match tx.put(db, &trust.path, &val, flags) {
+                Ok(_) => {
+                    written += 1;
+                    // only appended records move the tail
+                    if let (Some(tail), false) = (tail.as_mut(), flags.is_empty()) {
+                        tail.key.clear();
+                        tail.key.extend_from_slice(key);
+                        tail.val.clone_from(&val);
+                    }
+                }
+                Err(lmdb::Error::MapFull) => return Err(lmdb::Error::MapFull.into()),
+                Err(e) => {
+                    if verbose {
+                        println!("skipped {} {:?}", trust.path, e);
+                    }
+                }
+            }
+        }
+        tx.commit()?;
+        Ok(written)
+    }
+
+    fn is_empty(&self, db: Database) -> Result<bool, Error> {
+        let tx = self.env().begin_ro_txn()?;
+        let mut c = tx.open_ro_cursor(db)?;
+        let empty = c.iter().next().is_none();
+        Ok(empty)
+    }
+}
+
+fn records_per_sec(n: usize, elapsed: Duration) -> f64 {
+    n as f64 / elapsed.as_secs_f64().max(f64::EPSILON)
+}
+
 fn clear(_: ClearOpts, _: &cfg::All, env: &Environment) -> Result<(), Error> {
     if let Ok(db) = env.open_db(Some(TRUST_LMDB_NAME)) {
         let mut tx = env.begin_rw_txn()?;
@@ -221,63 +430,65 @@ fn clear(_: ClearOpts, _: &cfg::All, env: &Environment) -> Result<(), Error> {
     Ok(())
 }
 
-fn init(opts: InitOpts, verbose: bool, cfg: &cfg::All, env: &Environment) -> Result<(), Error> {
+fn init(
+    opts: InitOpts,
+    verbose: bool,
+    cfg: &cfg::All,
+    env: Environment,
+    path: &Path,
+) -> Result<(), Error> {
     if opts.force {
-        clear(ClearOpts {}, cfg, env)?;
+        clear(ClearOpts {}, cfg, &env)?;
     }
 
-    let db = env.create_db(Some(TRUST_LMDB_NAME), DatabaseFlags::DUP_SORT)?;
+    env.create_db(Some(TRUST_LMDB_NAME), DatabaseFlags::DUP_SORT)?;
 
     if opts.empty {
         return Ok(());
     }
 
-    let t = SystemTime::now();
-    let sys = if opts.dpkg {
+    let mut records = if opts.dpkg {
         dpkg_trust()?
     } else {
-        rpm_trust(&PathBuf::from(&cfg.system.system_trust_path))?
+        let shards = opts.shards.unwrap_or_else(rayon::current_num_threads);
+        let mut all = vec![];
+        rpm_trust_with(
+            &PathBuf::from(&cfg.system.system_trust_path),
+            shards,
+            |batch| all.extend(batch),
+        )?;
+        all
     };
-
-    let sys = if let Some(c) = opts.count {
-        let mut m = sys;
-        m.truncate(c);
-        m
-    } else {
-        sys
-    };
-
-    let mut tx = env.begin_rw_txn()?;
-    let mut skipped = 0;
-    for trust in &sys {
-        let v = format!("{} {} {}", 1, trust.size, trust.hash);
-        match tx.put(db, &trust.path, &v, WriteFlags::APPEND_DUP) {
-            Ok(_) => {}
-            Err(e) => {
-                skipped += 1;
-                if verbose {
-                    println!("skipped {} {:?}", trust.path, e);
-                }
-            }
-        }
+    // the records are limited by path so the count selects the same entries every time
+    if let Some(count) = opts.count {
+        records.par_sort_by(|a, b| a.path.cmp(&b.path));
+        records.truncate(count);
     }
-    tx.commit()?;
 
-    let duration = t.elapsed().expect("timer failure");
+    let mut writer = BulkWriter::new(path, env, opts.chunk);
+    let stats = writer.write(1, records, verbose)?;
 
     if verbose {
         println!(
-            "initialized db with {} entries in {} seconds ({} skipped)",
-            sys.len() - skipped,
-            duration.as_secs(),
-            skipped
+            "initialized db with {} entries in {:.2} seconds, {:.0} records/sec ({} skipped, {} chunks)",
+            stats.written,
+            stats.elapsed.as_secs_f64(),
+            records_per_sec(stats.written, stats.elapsed),
+            stats.skipped,
+            stats.chunks
         );
     }
 
     Ok(())
 }
 
-fn load(opts: LoadOpts, verbose: bool, _: &cfg::All, env: &Environment) -> Result<(), Error> {
+fn load(
+    opts: LoadOpts,
+    verbose: bool,
+    _: &cfg::All,
+    env: Environment,
+    path: &Path,
+) -> Result<(), Error> {
     let source = match PathBuf::from(&opts.path) {
         source if source.is_dir() => read::from_dir(&source)?,
         source => read::from_file(&source)?,
@@ -288,22 +499,99 @@ fn load(opts: LoadOpts, verbose: bool, _: &cfg::All, env: &Environment) -> Resul
         .map(|(o, r)| parse::trust_record(r).map(|t| (o.display().to_string(), t)))
         .collect();
 
-    //need to parse the source entries out into Trust structs
-
-    let db = env.open_db(Some(TRUST_LMDB_NAME))?;
-    let mut tx = env.begin_rw_txn()?;
+    let mut records = vec![];
     for (o, t) in source? {
-        let v = format!("{} {} {}", 2, t.size, t.hash);
-        tx.put(db, &t.path, &v, WriteFlags::APPEND_DUP)?;
         if verbose {
             println!("{} {}", o, t);
         }
+        records.push(t);
+    }
+
+    let mut writer = BulkWriter::new(path, env, opts.chunk);
+    let stats = writer.write(2, records, verbose)?;
+
+    if verbose {
+        println!(
+            "loaded {} entries in {:.2} seconds, {:.0} records/sec ({} skipped)",
+            stats.written,
+            stats.elapsed.as_secs_f64(),
+            records_per_sec(stats.written, stats.elapsed),
+            stats.skipped
+        );
     }
-    tx.commit()?;
 
     Ok(())
 }
 
+fn bench(opts: &BenchOpts, verbose: bool) -> Result<(), Error> {
+    let dir = tempfile::tempdir()?;
+    let records = synthetic_trust(opts.count);
+    let keys: Vec<String> = records.iter().map(|t| t.path.clone()).collect();
+
+    let env = open_env(dir.path(), DEFAULT_MAP_SIZE)?;
+    env.create_db(Some(TRUST_LMDB_NAME), DatabaseFlags::DUP_SORT)?;
+    let mut writer = BulkWriter::new(dir.path(), env, opts.chunk);
+    let stats = writer.write(1, records, verbose)?;
+    report("init", stats.written, stats.elapsed);
+
+    let env = writer.into_env();
+    let db = env.open_db(Some(TRUST_LMDB_NAME))?;
+    {
+        let t = Instant::now();
+        let tx = env.begin_ro_txn()?;
+        let mut c = tx.open_ro_cursor(db)?;
+        let cnt = c.iter().count();
+        report("count", cnt, t.elapsed());
+
+        let t = Instant::now();
+        let found = keys.iter().filter(|k| tx.get(db, k).is_ok()).count();
+        report("search", found, t.elapsed());
+    }
+    drop(env);
+
+    let t = Instant::now();
+    let trust = load::from_lmdb(dir.path())?;
+    let mut out = io::sink();
+    for (_, v) in trust.iter() {
+        writeln!(out, "{}", v.trusted)?;
+    }
+    report("dump", trust.len(), t.elapsed());
+
+    Ok(())
+}
+
+fn report(name: &str, n: usize, elapsed: Duration) {
+    println!(
+        "{:<8}{:>10} records in {:>8.3} seconds, {:>12.0} records/sec",
+        name,
+        n,
+        elapsed.as_secs_f64(),
+        records_per_sec(n, elapsed)
+    );
+}
+
+// distinct records in no particular order, each path is a bijective mix of its index
+fn synthetic_trust(count: usize) -> Vec<Trust> {
+    (0..count as u64)
+        .into_par_iter()
+        .map(|i| {
+            let h = mix(i);
+            Trust {
+                path: format!("/usr/lib/bench/{:02x}/{:016x}", h >> 56, h),
+                size: i,
+                hash: format!("{:016x}", h).repeat(4),
+            }
+        })
+        .collect()
+}
+
+// splitmix64 finalizer
+fn mix(mut x: u64) -> u64 {
+    x = (x ^ (x >> 30)).wrapping_mul(0xbf58476d1ce4e5b9);
+    x = (x ^ (x >> 27)).wrapping_mul(0x94d049bb133111eb);
+    x ^ (x >> 31)
+}
+
 fn add(opts: AddRecOpts, _: &cfg::All, env: &Environment) -> Result<(), Error> {
     let trust = new_trust_record(&opts.path)?;
     let db = env.open_db(Some(TRUST_LMDB_NAME))?;
@@ -358,16 +646,22 @@ fn dump(opts: DumpDbOpts, cfg: &cfg::All) -> Result<(), Error> {
     Ok(())
 }
 
-fn check(_: CheckDbOpts, cfg: &cfg::All) -> Result<(), Error> {
+fn check(opts: CheckDbOpts, cfg: &cfg::All) -> Result<(), Error> {
     let db = load::trust_db(
         &PathBuf::from(&cfg.system.trust_lmdb_path),
         &PathBuf::from(&cfg.system.trust_dir_path),
         Some(&PathBuf::from(&cfg.system.trust_file_path)),
     )?;
 
+    let cache = DigestCache::from_data_dir(
+        cfg.data_dir(),
+        opts.paranoid || cfg.application.paranoid_digest,
+    );
+
     let t = SystemTime::now();
-    let db = check::disk_sync(&db)?;
+    let db = check::disk_sync_cached(&db, opts.tier, &cache)?;
     let duration = t.elapsed().expect("timer failure");
+    cache.save()?;
 
     for (_, v) in db.iter() {
         match &v.status {
@@ -385,6 +679,12 @@ fn check(_: CheckDbOpts, cfg: &cfg::All) -> Result<(), Error> {
         duration.as_secs()
     );
 
+    let stats = cache.stats();
+    println!(
+        "digest cache {} hits, {} misses, {} bytes not read",
+        stats.hits, stats.misses, stats.bytes_saved
+    );
+
     Ok(())
 }
 
@@ -404,7 +704,7 @@ fn new_trust_record(path: &str) -> Result<Trust, Error> {
     }
 
     let f = File::open(path)?;
-    let sha = sha256_digest(BufReader::new(&f))?;
+    let sha = sha256_file(&f)?;
 
     Ok(Trust {
         path: path.to_string(),
@@ -0,0 +1,370 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2023
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::HashMap;
+use std::fs;
+use std::fs::{File, Metadata};
+use std::io::{BufRead, BufReader, BufWriter, ErrorKind, Write};
+use std::os::unix::fs::MetadataExt;
+use std::path::{Path, PathBuf};
+use std::process;
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{Mutex, RwLock};
+
+use crate::error::Error;
+
+/// Name of the digest cache file within the application data dir
+pub const DIGEST_CACHE_FILE_NAME: &str = "digest.cache";
+
+// distinguishes the temporary files of saves made by this process
+static SAVE_SEQ: AtomicU64 = AtomicU64::new(0);
+
+/// The stat tuple that a cached digest is valid for.
+/// Any change to one of these values invalidates the cached digest.
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub struct StatKey {
+    pub dev: u64,
+    pub ino: u64,
+    pub size: u64,
+    pub mtime: i64,
+    pub ctime: i64,
+}
+
+impl From<&Metadata> for StatKey {
+    fn from(meta: &Metadata) -> Self {
+        StatKey {
+            dev: meta.dev(),
+            ino: meta.ino(),
+            size: meta.size(),
+            mtime: meta.mtime() * 1_000_000_000 + meta.mtime_nsec(),
+            ctime: meta.ctime() * 1_000_000_000 + meta.ctime_nsec(),
+        }
+    }
+}
+
+#[derive(Clone, Debug)]
+struct Entry {
+    key: StatKey,
+    hash: String,
+}
+
+/// Snapshot of the cache counters
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub struct Stats {
+    /// lookups answered from the cache
+    pub hits: u64,
+    /// lookups that required hashing the file
+    pub misses: u64,
+    /// bytes that did not need to be read due to hits
+    pub bytes_saved: u64,
+}
+
+/// Persistent digest cache
+/// Maps a file path to the sha256 digest computed for it, keyed by the stat tuple
+/// (dev, inode, size, mtime, ctime) observed when the digest was generated.
+/// The cache is safe to share across the threads performing trust checks.
+#[derive(Debug, Default)]
+pub struct DigestCache {
+    path: Option<PathBuf>,
+    paranoid: bool,
+    entries: RwLock<HashMap<String, Entry>>,
+    dirty: AtomicBool,
+    hits: AtomicU64,
+    misses: AtomicU64,
+    bytes_saved: AtomicU64,
+    /// held while saving, a save writes every change made before it began
+    saving: Mutex<()>,
+}
+
+impl DigestCache {
+    /// Create an empty in-memory cache
+    pub fn new() -> Self {
+        DigestCache::default()
+    }
+
+    /// Load the cache persisted at the path, a missing file results in an empty cache.
+    /// The cache will be saved back to the same path.
+    pub fn load(path: &Path) -> Result<Self, Error> {
+        let mut entries = HashMap::new();
+        match File::open(path) {
+            Ok(f) => {
+                for line in BufReader::new(f).lines() {
+                    let line = line?;
+                    match parse_entry(&line) {
+                        Some((p, e)) => {
+                            entries.insert(p, e);
+                        }
+                        None => log::warn!("skipping malformed digest cache entry: {}", line),
+                    }
+                }
+            }
+            Err(e) if e.kind() == ErrorKind::NotFound => {}
+            Err(e) => return Err(e.into()),
+        };
+
+        Ok(DigestCache {
+            path: Some(path.to_path_buf()),
+            entries: RwLock::new(entries),
+            ..DigestCache::default()
+        })
+    }
+
+    /// Load the cache from the application data dir
+    /// Failures are logged and result in an empty cache that will still be saved.
+    pub fn from_data_dir(data_dir: &str, paranoid: bool) -> Self {
+        let path = PathBuf::from(data_dir).join(DIGEST_CACHE_FILE_NAME);
+        let cache = match DigestCache::load(&path) {
+            Ok(c) => c,
+            Err(e) => {
+                log::warn!("failed to load digest cache {}: {}", path.display(), e);
+                DigestCache {
+                    path: Some(path),
+                    ..DigestCache::default()
+                }
+            }
+        };
+        cache.with_paranoid(paranoid)
+    }
+
+    /// In paranoid mode every lookup misses, forcing a full rehash
+    /// The newly computed digests are still recorded in the cache.
+    pub fn with_paranoid(self, paranoid: bool) -> Self {
+        DigestCache { paranoid, ..self }
+    }
+
+    pub fn is_paranoid(&self) -> bool {
+        self.paranoid
+    }
+
+    /// Number of entries in the cache
+    pub fn len(&self) -> usize {
+        self.entries.read().map(|e| e.len()).unwrap_or(0)
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+
+    /// Lookup the digest of a path, only valid if the stat tuple is unchanged
+    pub fn get(&self, path: &str, meta: &Metadata) -> Option<String> {
+        let key = StatKey::from(meta);
+        let hit = if self.paranoid {
+            None
+        } else {
+            self.entries
+                .read()
+                .ok()
+                .and_then(|e| e.get(path).filter(|e| e.key == key).map(|e| e.hash.clone()))
+        };
+
+        match hit {
+            Some(_) => {
+                self.hits.fetch_add(1, Ordering::Relaxed);
+                self.bytes_saved.fetch_add(key.size, Ordering::Relaxed);
+            }
+            None => {
+                self.misses.fetch_add(1, Ordering::Relaxed);
+            }
+        };
+        hit
+    }
+
+    /// Record the digest of a path with the stat tuple it was computed under
+    pub fn put(&self, path: &str, meta: &Metadata, hash: &str) {
+        if let Ok(mut e) = self.entries.write() {
+            e.insert(
+                path.to_string(),
+                Entry {
+                    key: StatKey::from(meta),
+                    hash: hash.to_string(),
+                },
+            );
+            self.dirty.store(true, Ordering::Relaxed);
+        }
+    }
+
+    /// Drop a path from the cache
+    pub fn invalidate(&self, path: &str) {
+        if let Ok(mut e) = self.entries.write() {
+            if e.remove(path).is_some() {
+                self.dirty.store(true, Ordering::Relaxed);
+            }
+        }
+    }
+
+    /// Current value of the hit/miss counters
+    pub fn stats(&self) -> Stats {
+        Stats {
+            hits: self.hits.load(Ordering::Relaxed),
+            misses: self.misses.load(Ordering::Relaxed),
+            bytes_saved: self.bytes_saved.load(Ordering::Relaxed),
+        }
+    }
+
+    /// Persist the cache if it has been modified since loading
+    /// The file is written to a temporary file of its own in the same dir and
+    /// renamed into place. Saves of the cache are serialized, and saves from
+    /// other caches or processes never share the temporary file.
+    pub fn save(&self) -> Result<(), Error> {
+        let _saving = self
+            .saving
+            .lock()
+            .map_err(|_| Error::MetaError("digest cache lock poisoned".into()))?;
+        let path = match &self.path {
+            Some(p) if self.dirty.swap(false, Ordering::Relaxed) => p,
+            _ => return Ok(()),
+        };
+        let tmp = path.with_extension(format!(
+            "{}.{}.tmp",
+            process::id(),
+            SAVE_SEQ.fetch_add(1, Ordering::Relaxed)
+        ));
+        let saved = self.write(path, &tmp);
+        if saved.is_err() {
+            let _ = fs::remove_file(&tmp);
+            self.dirty.store(true, Ordering::Relaxed);
+        }
+        saved
+    }
+
+    fn write(&self, path: &Path, tmp: &Path) -> Result<(), Error> {
+        if let Some(parent) = path.parent() {
+            fs::create_dir_all(parent)?;
+        }
+        {
+            let mut w = BufWriter::new(File::create(tmp)?);
+            let entries = self
+                .entries
+                .read()
+                .map_err(|_| Error::MetaError("digest cache lock poisoned".into()))?;
+            for (p, e) in entries.iter() {
+                writeln!(
+                    w,
+                    "{} {} {} {} {} {} {}",
+                    e.key.dev, e.key.ino, e.key.size, e.key.mtime, e.key.ctime, e.hash, p
+                )?;
+            }
+            w.flush()?;
+        }
+        fs::rename(tmp, path)?;
+        Ok(())
+    }
+}
+
+fn parse_entry(line: &str) -> Option<(String, Entry)> {
+    let mut parts = line.splitn(7, ' ');
+    let key = StatKey {
+        dev: parts.next()?.parse().ok()?,
+        ino: parts.next()?.parse().ok()?,
+        size: parts.next()?.parse().ok()?,
+        mtime: parts.next()?.parse().ok()?,
+        ctime: parts.next()?.parse().ok()?,
+    };
+    let hash = parts.next()?.to_string();
+    let path = parts.next()?.to_string();
+    Some((path, Entry { key, hash }))
+}
+
+#[cfg(test)]
+mod tests {
+    use std::io::Write;
+
+    use tempfile::{tempdir, NamedTempFile};
+
+    use super::*;
+
+    #[test]
+    fn hit_and_miss() {
+        let mut f = NamedTempFile::new().unwrap();
+        f.write_all(b"foo").unwrap();
+        let p = f.path().display().to_string();
+        let meta = f.as_file().metadata().unwrap();
+
+        let cache = DigestCache::new();
+        assert!(cache.get(&p, &meta).is_none());
+        cache.put(&p, &meta, "abc");
+        assert_eq!(cache.get(&p, &meta), Some("abc".to_string()));
+
+        let stats = cache.stats();
+        assert_eq!(stats.hits, 1);
+        assert_eq!(stats.misses, 1);
+        assert_eq!(stats.bytes_saved, 3);
+    }
+
+    #[test]
+    fn modified_file_misses() {
+        let mut f = NamedTempFile::new().unwrap();
+        f.write_all(b"foo").unwrap();
+        let p = f.path().display().to_string();
+
+        let cache = DigestCache::new();
+        cache.put(&p, &f.as_file().metadata().unwrap(), "abc");
+
+        f.write_all(b"bar").unwrap();
+        assert!(cache.get(&p, &f.as_file().metadata().unwrap()).is_none());
+    }
+
+    #[test]
+    fn paranoid_always_misses() {
+        let f = NamedTempFile::new().unwrap();
+        let p = f.path().display().to_string();
+        let meta = f.as_file().metadata().unwrap();
+
+        let cache = DigestCache::new().with_paranoid(true);
+        cache.put(&p, &meta, "abc");
+        assert!(cache.get(&p, &meta).is_none());
+        assert_eq!(cache.stats().misses, 1);
+    }
+
+    #[test]
+    fn save_and_load() {
+        let dir = tempdir().unwrap();
+        let cache_path = dir.path().join(DIGEST_CACHE_FILE_NAME);
+        let f = NamedTempFile::new().unwrap();
+        let meta = f.as_file().metadata().unwrap();
+
+        let cache = DigestCache::load(&cache_path).unwrap();
+        assert!(cache.is_empty());
+        cache.put("/path with/spaces", &meta, "abc");
+        cache.save().unwrap();
+
+        let cache = DigestCache::load(&cache_path).unwrap();
+        assert_eq!(cache.len(), 1);
+        assert_eq!(
+            cache.get("/path with/spaces", &meta),
+            Some("abc".to_string())
+        );
+    }
+
+    #[test]
+    fn concurrent_saves() {
+        let dir = tempdir().unwrap();
+        let cache_path = dir.path().join(DIGEST_CACHE_FILE_NAME);
+        let f = NamedTempFile::new().unwrap();
+        let meta = f.as_file().metadata().unwrap();
+
+        let cache = DigestCache::load(&cache_path).unwrap();
+        std::thread::scope(|s| {
+            for t in 0..8 {
+                let cache = &cache;
+                let meta = &meta;
+                s.spawn(move || {
+                    for i in 0..50 {
+                        cache.put(&format!("/{}/{}", t, i), meta, "abc");
+                        cache.save().unwrap();
+                    }
+                });
+            }
+        });
+
+        // the last save holds every entry and no temporary file is left
+        let cache = DigestCache::load(&cache_path).unwrap();
+        assert_eq!(cache.len(), 400);
+        assert_eq!(fs::read_dir(dir.path()).unwrap().count(), 1);
+    }
+}
@@ -6,10 +6,12 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+use crate::cache::DigestCache;
 use crate::db::{Rec, DB};
 use crate::error::Error;
+use crate::error::Error::MalformattedTrustEntry;
 use crate::parse;
-use rayon::iter::IntoParallelRefIterator;
+use crate::stat::Tier;
 use std::collections::HashMap;
 
 use rayon::prelude::*;
@@ -17,34 +19,66 @@ use rayon::prelude::*;
 // 1. checking disk for actual status
 pub fn disk_sync(db: &DB) -> Result<DB, Error> {
     let lookup: HashMap<String, Rec> = db
-        .lookup
-        .par_iter()
+        .iter()
+        .collect::<Vec<_>>()
+        .into_par_iter()
         .flat_map(|(p, r)| Rec::status_check(r.clone()).map(|r| (p.clone(), r)))
         .collect();
 
     Ok(DB::from(lookup))
 }
 
-pub(crate) struct TrustPair {
-    pub k: String,
-    pub v: String,
+// 1a. checking disk for actual status to the depth of the tier, reusing digests from the cache
+pub fn disk_sync_cached(db: &DB, tier: Tier, cache: &DigestCache) -> Result<DB, Error> {
+    let lookup: HashMap<String, Rec> = db
+        .iter()
+        .collect::<Vec<_>>()
+        .into_par_iter()
+        .flat_map(|(p, r)| Rec::status_check_cached(r.clone(), tier, cache).map(|r| (p.clone(), r)))
+        .collect();
+
+    let stats = cache.stats();
+    log::debug!(
+        "digest cache: {} hits, {} misses, {} bytes not read",
+        stats.hits,
+        stats.misses,
+        stats.bytes_saved
+    );
+
+    Ok(DB::from(lookup))
 }
 
-impl TrustPair {
-    pub(crate) fn new(b: (&[u8], &[u8])) -> TrustPair {
-        TrustPair {
-            k: String::from_utf8(Vec::from(b.0)).unwrap(),
-            v: String::from_utf8(Vec::from(b.1)).unwrap(),
-        }
-    }
+/// An lmdb trust entry borrowed from the mapped pages of a read transaction
+/// The entry is only decoded on request, its type can be read without decoding.
+pub(crate) struct TrustPair<'a> {
+    pub k: &'a [u8],
+    pub v: &'a [u8],
 }
 
-impl From<TrustPair> for (String, Rec) {
-    fn from(kv: TrustPair) -> Self {
-        let (tt, v) = kv.v.split_once(' ').unwrap();
-        let (t, s) = parse::strtyped_trust_record(format!("{} {}", kv.k, v).as_str(), tt)
-            .expect("failed to parse_strtyped_trust_record");
-        (t.path.clone(), Rec::from_source(t, s))
+impl<'a> TrustPair<'a> {
+    pub(crate) fn new(b: (&'a [u8], &'a [u8])) -> TrustPair<'a> {
+        TrustPair { k: b.0, v: b.1 }
+    }
+
+    /// Is this entry from system trust
+    pub(crate) fn is_system(&self) -> bool {
+        self.v.starts_with(b"1 ")
+    }
+
+    /// Decode the entry into a path and record
+    pub(crate) fn decode(&self) -> Result<(String, Rec), Error> {
+        let (k, v) = match (std::str::from_utf8(self.k), std::str::from_utf8(self.v)) {
+            (Ok(k), Ok(v)) => (k, v),
+            _ => {
+                return Err(MalformattedTrustEntry(format!(
+                    "{} {}",
+                    String::from_utf8_lossy(self.k),
+                    String::from_utf8_lossy(self.v)
+                )))
+            }
+        };
+        let (t, s) = parse::typed_trust_value(k, v)?;
+        Ok((t.path.clone(), Rec::from_source(t, s)))
     }
 }
 
@@ -59,7 +93,8 @@ mod tests {
             "/home/user/my-ls".as_bytes(),
             "1 157984 61a9960bf7d255a85811f4afcac51067b8f2e4c75e21cf4f2af95319d4ed1b87".as_bytes(),
         ));
-        let (_, r) = tp.into();
+        assert!(tp.is_system());
+        let (_, r) = tp.decode().unwrap();
 
         assert_eq!(r.trusted.path, "/home/user/my-ls");
         assert_eq!(r.trusted.size, 157984);
@@ -68,4 +103,17 @@ mod tests {
             "61a9960bf7d255a85811f4afcac51067b8f2e4c75e21cf4f2af95319d4ed1b87"
         );
     }
+
+    #[test]
+    fn parse_trust_pair_types() {
+        let tp = TrustPair::new((b"/my ls", b"2 1 00"));
+        assert!(!tp.is_system());
+        let (p, r) = tp.decode().unwrap();
+        assert_eq!(p, "/my ls");
+        assert!(r.is_ancillary());
+
+        assert!(TrustPair::new((b"/foo", b"3 1 00")).decode().is_err());
+        assert!(TrustPair::new((b"/foo", b"1 1")).decode().is_err());
+        assert!(TrustPair::new((b"/foo", b"1 x 00")).decode().is_err());
+    }
 }
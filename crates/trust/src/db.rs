@@ -6,13 +6,16 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use std::collections::hash_map::Iter;
 use std::collections::HashMap;
 use std::str::FromStr;
+use std::sync::Arc;
 
+use rayon::prelude::*;
+
+use crate::cache::DigestCache;
 use crate::error::Error;
 use crate::source::TrustSource;
-use crate::stat::{check, Actual, Status};
+use crate::stat::{check, check_tier, Actual, Status, Tier};
 use crate::{parse, Trust};
 
 #[derive(Clone, Debug)]
@@ -25,12 +28,42 @@ pub enum DbEntry {
 
 /// Trust Database
 /// A container for tracking trust entries and their metadata
-/// Backed by a HashMap lookup table
+/// Backed by a HashMap lookup table that is shared between clones, with a
+/// layer holding the records changed since the table was shared. A cloned
+/// and modified DB only allocates for the records that were changed.
 #[derive(Clone, Debug)]
 pub struct DB {
-    pub(crate) lookup: HashMap<String, Rec>,
+    lookup: Arc<HashMap<String, Rec>>,
+    /// changed records, None where a record was removed
+    delta: HashMap<String, Option<Rec>>,
+    len: usize,
+}
+
+/// Paths of the records that differ between two trust databases, each sorted
+#[derive(Clone, Debug, Default, PartialEq, Eq)]
+pub struct Difference {
+    pub added: Vec<String>,
+    pub removed: Vec<String>,
+    /// paths whose trust or source changed
+    pub modified: Vec<String>,
+}
+
+impl Difference {
+    pub fn is_empty(&self) -> bool {
+        self.added.is_empty() && self.removed.is_empty() && self.modified.is_empty()
+    }
 }
 
+// the kind of difference at a path
+enum Change {
+    Added,
+    Removed,
+    Modified,
+}
+
+/// number of changes that are always held apart from the lookup table
+const DELTA_MIN: usize = 1024;
+
 impl Default for DB {
     fn default() -> Self {
         DB::new()
@@ -39,73 +72,169 @@ impl Default for DB {
 
 impl From<HashMap<String, Rec>> for DB {
     fn from(lookup: HashMap<String, Rec>) -> Self {
-        Self { lookup }
+        Self {
+            len: lookup.len(),
+            lookup: Arc::new(lookup),
+            delta: HashMap::default(),
+        }
     }
 }
 
 impl DB {
     /// Create a new empty database
     pub fn new() -> Self {
-        DB {
-            lookup: HashMap::default(),
-        }
+        DB::from(HashMap::default())
     }
 
     /// Get a record iterator to the underlying lookup table
-    pub fn iter(&self) -> Iter<'_, String, Rec> {
-        self.lookup.iter()
+    pub fn iter(&self) -> impl Iterator<Item = (&String, &Rec)> {
+        let changed = self
+            .delta
+            .iter()
+            .filter_map(|(k, r)| r.as_ref().map(|r| (k, r)));
+        let unchanged = self
+            .lookup
+            .iter()
+            .filter(move |(k, _)| self.delta.is_empty() || !self.delta.contains_key(*k));
+        changed.chain(unchanged)
     }
 
     /// Get a Vec of record references
     pub fn values(&self) -> Vec<&Rec> {
-        self.lookup.values().collect()
+        self.iter().map(|(_, r)| r).collect()
     }
 
     /// Get the number of records in the lookup table
     pub fn len(&self) -> usize {
-        self.lookup.len()
+        self.len
     }
 
     /// Test if the lookup table is empty
     pub fn is_empty(&self) -> bool {
-        self.lookup.is_empty()
+        self.len == 0
     }
 
     /// Get a record from the lookup table using the path to the trusted file
     pub fn get(&self, k: &str) -> Option<&Rec> {
-        self.lookup.get(k)
+        match self.delta.get(k) {
+            Some(r) => r.as_ref(),
+            None => self.lookup.get(k),
+        }
     }
 
     /// Put a record into the lookup table using the path of the trusted file
     /// This method takes only a record to ensure the key to value mapping is enforced.
     pub fn put(&mut self, v: Rec) -> Option<Rec> {
-        self.lookup.insert(v.trusted.path.clone(), v)
+        let k = v.trusted.path.clone();
+        let prev = self.take(&k, Some(v));
+        if prev.is_none() {
+            self.len += 1;
+        }
+        prev
+    }
+
+    /// Remove a record from the lookup table using the path to the trusted file
+    pub fn remove(&mut self, k: &str) -> Option<Rec> {
+        if self.get(k).is_none() {
+            return None;
+        }
+        self.len -= 1;
+        self.take(k, None)
     }
 
     /// Get a record from the lookup table using the path to the trusted file
     pub fn get_mut(&mut self, k: &str) -> Option<&mut Rec> {
-        self.lookup.get_mut(k)
+        if !self.delta.contains_key(k) {
+            let r = self.lookup.get(k)?.clone();
+            self.settle();
+            self.delta.insert(k.to_string(), Some(r));
+        }
+        self.delta.get_mut(k).and_then(|r| r.as_mut())
     }
 
     pub fn filter<F>(&mut self, f: F) -> Vec<Rec>
     where
         F: Fn(&Rec) -> bool,
     {
-        // https://github.com/rust-lang/rust/issues/59618
-        //self.lookup.drain_filter(f).collect()
-        let mut ks = vec![];
-        let mut rem = vec![];
-        for (k, rec) in self.lookup.iter() {
-            if !f(rec) {
-                ks.push(k.clone())
+        let ks: Vec<String> = self
+            .iter()
+            .filter(|(_, rec)| !f(rec))
+            .map(|(k, _)| k.clone())
+            .collect();
+        ks.iter().filter_map(|k| self.remove(k)).collect()
+    }
+
+    /// The records added, removed and modified going from this db to the other
+    /// Databases that share a lookup table can only differ where either has
+    /// changes, so only those paths are compared. Otherwise every path of both
+    /// is compared, in parallel.
+    pub fn difference(&self, other: &DB) -> Difference {
+        let paths: Vec<&String> = if Arc::ptr_eq(&self.lookup, &other.lookup) {
+            let mut ks: Vec<&String> = self.delta.keys().chain(other.delta.keys()).collect();
+            ks.sort_unstable();
+            ks.dedup();
+            ks
+        } else {
+            let mut ks: Vec<&String> = self.iter().map(|(k, _)| k).collect();
+            let added: Vec<&String> = other
+                .iter()
+                .map(|(k, _)| k)
+                .collect::<Vec<_>>()
+                .into_par_iter()
+                .filter(|k| self.get(k).is_none())
+                .collect();
+            ks.extend(added);
+            ks
+        };
+
+        let changes: Vec<(Change, &String)> = paths
+            .into_par_iter()
+            .filter_map(|k| match (self.get(k), other.get(k)) {
+                (None, Some(_)) => Some((Change::Added, k)),
+                (Some(_), None) => Some((Change::Removed, k)),
+                (Some(a), Some(b)) if a.trusted != b.trusted || a.source != b.source => {
+                    Some((Change::Modified, k))
+                }
+                _ => None,
+            })
+            .collect();
+
+        let mut diff = Difference::default();
+        for (kind, k) in changes {
+            match kind {
+                Change::Added => diff.added.push(k.clone()),
+                Change::Removed => diff.removed.push(k.clone()),
+                Change::Modified => diff.modified.push(k.clone()),
             }
         }
-        for k in ks {
-            if let Some(r) = self.lookup.remove(&k) {
-                rem.push(r);
-            }
+        diff.added.par_sort_unstable();
+        diff.removed.par_sort_unstable();
+        diff.modified.par_sort_unstable();
+        diff
+    }
+
+    // record a change, returning the record it replaced
+    fn take(&mut self, k: &str, v: Option<Rec>) -> Option<Rec> {
+        self.settle();
+        match self.delta.insert(k.to_string(), v) {
+            Some(prev) => prev,
+            None => self.lookup.get(k).cloned(),
+        }
+    }
+
+    // fold the changes into the lookup table once they are a sizable part of it,
+    // this copies the table only when it is still shared with another DB
+    fn settle(&mut self) {
+        if self.delta.len() < DELTA_MIN || self.delta.len() * 4 < self.lookup.len() {
+            return;
+        }
+        let lookup = Arc::make_mut(&mut self.lookup);
+        for (k, r) in self.delta.drain() {
+            match r {
+                Some(r) => lookup.insert(k, r),
+                None => lookup.remove(&k),
+            };
         }
-        rem
     }
 }
 
@@ -160,6 +289,15 @@ impl Rec {
             ..rec
         })
     }
+
+    /// Check a Rec into a Rec with updated status to the depth of the tier, using the digest cache
+    pub fn status_check_cached(rec: Rec, tier: Tier, cache: &DigestCache) -> Result<Rec, Error> {
+        let status = check_tier(&rec.trusted, tier, Some(cache))?;
+        Ok(Rec {
+            status: Some(status),
+            ..rec
+        })
+    }
 }
 
 impl FromStr for Rec {
@@ -219,6 +357,70 @@ mod tests {
         assert!(!db.is_empty());
     }
 
+    #[test]
+    fn db_remove() {
+        let t1: Trust = Trust::new("/foo", 1, "0x00");
+        let mut db = DB::new();
+        db.put(Rec::without_source(t1.clone()));
+        assert!(db.remove("/bar").is_none());
+        assert!(matches!(db.remove(&t1.path), Some(n) if n.trusted == t1));
+        assert!(db.get(&t1.path).is_none());
+        assert!(db.is_empty());
+        assert_eq!(db.iter().count(), 0);
+    }
+
+    #[test]
+    fn db_clone_shares_lookup() {
+        let base: HashMap<String, Rec> = (0..10_000)
+            .map(|i| Rec::without_source(Trust::new(&format!("/{}", i), i, "00")))
+            .map(|r| (r.trusted.path.clone(), r))
+            .collect();
+        let db0 = DB::from(base);
+
+        // successive generations each change one record
+        let mut gens = vec![db0.clone()];
+        for i in 0..100 {
+            let mut next = gens.last().unwrap().clone();
+            next.put(Rec::without_source(Trust::new(
+                &format!("/new/{}", i),
+                1,
+                "01",
+            )));
+            next.remove(&format!("/{}", i));
+            next.get_mut(&format!("/{}", i + 100)).unwrap().msg = Some("changed".into());
+            gens.push(next);
+        }
+        let last = gens.last().unwrap();
+
+        // the lookup table was never copied, the generations hold only their changes
+        assert!(gens.iter().all(|g| Arc::ptr_eq(&g.lookup, &db0.lookup)));
+        assert_eq!(last.delta.len(), 300);
+        assert_eq!(last.len(), 10_000);
+        assert_eq!(last.iter().count(), 10_000);
+        assert!(last.get("/0").is_none());
+        assert!(last.get("/new/99").is_some());
+        assert_eq!(last.get("/199").unwrap().msg.as_deref(), Some("changed"));
+        assert!(db0.get("/0").is_some());
+        assert!(db0.get("/199").unwrap().msg.is_none());
+    }
+
+    #[test]
+    fn db_settles_large_delta() {
+        let mut db = DB::new();
+        for i in 0..(DELTA_MIN * 2) {
+            db.put(Rec::without_source(Trust::new(&format!("/{}", i), 1, "00")));
+        }
+        let copy = db.clone();
+        assert_eq!(Arc::strong_count(&db.lookup), 2);
+        for i in 0..(DELTA_MIN * 2) {
+            db.remove(&format!("/{}", i));
+        }
+        assert!(db.is_empty());
+        assert_eq!(db.iter().count(), 0);
+        assert_eq!(copy.len(), DELTA_MIN * 2);
+        assert_eq!(copy.iter().count(), DELTA_MIN * 2);
+    }
+
     #[test]
     fn rec_create() {
         let t: Trust = Trust::new("/foo", 1, "0x00");
@@ -250,4 +452,41 @@ mod tests {
         assert!(Rec::from_source(t.clone(), Ancillary).is_ancillary());
         assert!(Rec::from_source(t, System).is_system());
     }
+
+    #[test]
+    fn db_difference() {
+        let mut lhs = DB::new();
+        lhs.put(Rec::without_source(Trust::new("/foo", 1, "0x00")));
+        lhs.put(Rec::without_source(Trust::new("/bar", 2, "0x01")));
+        lhs.put(Rec::from_source(Trust::new("/baz", 3, "0x02"), Ancillary));
+        assert!(lhs.difference(&lhs.clone()).is_empty());
+
+        let mut rhs = lhs.clone();
+        rhs.remove("/foo");
+        rhs.put(Rec::without_source(Trust::new("/bar", 2, "0x03")));
+        rhs.put(Rec::from_source(
+            Trust::new("/baz", 3, "0x02"),
+            DFile("00.trust".into()),
+        ));
+        rhs.put(Rec::without_source(Trust::new("/new", 4, "0x04")));
+
+        let expected = Difference {
+            added: vec!["/new".into()],
+            removed: vec!["/foo".into()],
+            modified: vec!["/bar".into(), "/baz".into()],
+        };
+        assert_eq!(lhs.difference(&rhs), expected);
+
+        // tables that are not shared are compared in full
+        let unshared = DB::from(
+            rhs.iter()
+                .map(|(k, r)| (k.clone(), r.clone()))
+                .collect::<HashMap<_, _>>(),
+        );
+        assert_eq!(lhs.difference(&unshared), expected);
+
+        let reversed = unshared.difference(&lhs);
+        assert_eq!(reversed.added, expected.removed);
+        assert_eq!(reversed.removed, expected.added);
+    }
 }
@@ -26,6 +26,9 @@ pub enum Error {
     #[error("Unsupported Trust type: {0}")]
     UnsupportedTrustType(String),
 
+    #[error("Unsupported check tier: {0}")]
+    UnsupportedCheckTier(String),
+
     #[error("Malformed Trust entry: {0}")]
     MalformattedTrustEntry(String),
 
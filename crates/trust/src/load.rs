@@ -13,6 +13,7 @@ use std::collections::HashMap;
 use std::path::Path;
 
 use lmdb::{Cursor, Environment, Transaction};
+use rayon::prelude::*;
 
 use crate::check::TrustPair;
 use crate::error::Error::{LmdbFailure, LmdbNotFound, LmdbPermissionDenied};
@@ -29,14 +30,18 @@ pub fn trust_db(lmdb: &Path, trust_d: &Path, trust_file: Option<&Path>) -> Resul
 }
 
 pub(crate) fn system_from_lmdb(lmdb: &Path) -> Result<DB, Error> {
-    let mut db = from_lmdb(lmdb)?;
-    db.filter(|e| e.is_system());
-    Ok(db)
+    read_lmdb(lmdb, |e| e.is_system())
 }
 
 /// load the fapolicyd backend lmdb database
 /// parse the results into trust entries
 pub fn from_lmdb(lmdb: &Path) -> Result<DB, Error> {
+    read_lmdb(lmdb, |_| true)
+}
+
+// entries are borrowed from the mapped pages and filtered before anything is
+// allocated for them, the selected entries are decoded in parallel
+fn read_lmdb(lmdb: &Path, select: fn(&TrustPair) -> bool) -> Result<DB, Error> {
     let env = Environment::new().set_max_dbs(1).open(lmdb);
     let env = match env {
         Ok(e) => e,
@@ -50,7 +55,11 @@ pub fn from_lmdb(lmdb: &Path) -> Result<DB, Error> {
     let lmdb = env.open_db(Some("trust.db"))?;
     let tx = env.begin_ro_txn()?;
     let mut c = tx.open_ro_cursor(lmdb)?;
-    let lookup: HashMap<String, Rec> = c.iter().map(|kv| TrustPair::new(kv).into()).collect();
+    let entries: Vec<TrustPair> = c.iter().map(TrustPair::new).filter(select).collect();
+    let lookup = entries
+        .par_iter()
+        .map(|e| e.decode())
+        .collect::<Result<HashMap<String, Rec>, Error>>()?;
 
     Ok(DB::from(lookup))
 }
@@ -7,15 +7,16 @@
  */
 
 use std::collections::HashMap;
-use std::fs::File;
-use std::io::BufReader;
+use std::fs;
+use std::path::Path;
 
-use fapolicy_util::sha::sha256_digest;
+use rayon::prelude::*;
 
 use crate::db::{Rec, DB};
 use crate::error::Error;
 use crate::ops::TrustOp::{Add, Del, Ins};
 use crate::source::TrustSource;
+use crate::stat::{measure, Status};
 use crate::Trust;
 
 #[derive(Clone, Debug)]
@@ -26,26 +27,27 @@ enum TrustOp {
 }
 
 impl TrustOp {
-    fn run(&self, trust: &mut HashMap<String, Rec>) -> Result<(), Error> {
+    fn path(&self) -> &str {
+        match self {
+            Add(path) | Del(path) | Ins(path, _, _) => path,
+        }
+    }
+
+    // the record an op puts in the db, None for a delete
+    fn record(&self) -> Result<Option<Rec>, Error> {
         match self {
             Add(path) => {
-                let t = new_trust_record(path)?;
-                let r = Rec::from_source(t, TrustSource::Ancillary);
-                let r = Rec::status_check(r)?;
-                trust.insert(r.trusted.path.clone(), r);
-                Ok(())
+                let (t, act) = measure(path)?;
+                let mut r = Rec::from_source(t.clone(), TrustSource::Ancillary);
+                r.status = Some(Status::Trusted(t, act));
+                Ok(Some(r))
             }
             Ins(path, size, hash) => {
                 let t = Trust::new(path, *size, hash);
                 let r = Rec::from_source(t, TrustSource::Ancillary);
-                let r = Rec::status_check(r)?;
-                trust.insert(r.trusted.path.clone(), r);
-                Ok(())
-            }
-            Del(path) => {
-                trust.remove(path);
-                Ok(())
+                Ok(Some(Rec::status_check(r)?))
             }
+            Del(_) => Ok(None),
         }
     }
 }
@@ -73,21 +75,78 @@ impl Changeset {
         Changeset { changes: vec![] }
     }
 
-    pub fn apply(&self, mut trust: DB) -> DB {
-        for change in self.changes.iter() {
-            change.run(&mut trust.lookup).unwrap()
+    /// Apply the changes to the trust
+    /// Only the last change to a path takes effect, so each file is read once.
+    /// The files of the changes are hashed in parallel.
+    pub fn apply(&self, trust: DB) -> DB {
+        self.try_apply(trust).unwrap()
+    }
+
+    /// Apply the changes to the trust, failing when a file cannot be hashed
+    pub fn try_apply(&self, mut trust: DB) -> Result<DB, Error> {
+        let records: Vec<(&str, Option<Rec>)> = self
+            .coalesced()
+            .into_par_iter()
+            .map(|op| op.record().map(|r| (op.path(), r)))
+            .collect::<Result<_, _>>()?;
+
+        for (path, r) in records {
+            match r {
+                Some(r) => {
+                    trust.put(r);
+                }
+                None => {
+                    trust.remove(path);
+                }
+            }
         }
-        trust
+        Ok(trust)
+    }
+
+    // the last change to each path, in the order the paths were first changed
+    fn coalesced(&self) -> Vec<&TrustOp> {
+        let mut slots: HashMap<&str, usize> = HashMap::new();
+        let mut ops: Vec<&TrustOp> = vec![];
+        for op in self.changes.iter() {
+            match slots.get(op.path()) {
+                Some(i) => ops[*i] = op,
+                None => {
+                    slots.insert(op.path(), ops.len());
+                    ops.push(op);
+                }
+            }
+        }
+        ops
     }
 
     pub fn add(&mut self, path: &str) {
         self.changes.push(Add(path.to_string()))
     }
 
+    pub fn add_many<S: AsRef<str>>(&mut self, paths: &[S]) {
+        self.changes
+            .extend(paths.iter().map(|p| Add(p.as_ref().to_string())))
+    }
+
+    /// Add the files in a directory, and in its subdirectories when recursive
+    /// Returns the number of files added
+    pub fn add_dir(&mut self, dir: &str, recursive: bool) -> Result<usize, Error> {
+        let mut files = vec![];
+        list_files(Path::new(dir), recursive, &mut files)?;
+        files.sort();
+        self.add_many(&files);
+        Ok(files.len())
+    }
+
     pub fn del(&mut self, path: &str) {
         self.changes.push(Del(path.to_string()))
     }
 
+    /// Append the changes of another changeset, which then follow these changes
+    pub fn append(&mut self, other: Changeset) {
+        self.changes.extend(other.changes)
+    }
+
     pub fn len(&self) -> usize {
         self.changes.len()
     }
@@ -101,15 +160,21 @@ pub fn get_path_action_map(cs: &Changeset) -> HashMap<String, String> {
     cs.changes.iter().map(to_pair).collect()
 }
 
-fn new_trust_record(path: &str) -> Result<Trust, fapolicy_util::sha::Error> {
-    let f = File::open(path)?;
-    let sha = sha256_digest(BufReader::new(&f))?;
-
-    Ok(Trust {
-        path: path.to_string(),
-        size: f.metadata().unwrap().len(),
-        hash: sha,
-    })
+// the regular files in the directory, links to files are listed but links to
+// directories are not descended so that a link cycle cannot recurse forever
+fn list_files(dir: &Path, recursive: bool, files: &mut Vec<String>) -> Result<(), Error> {
+    for entry in fs::read_dir(dir)? {
+        let entry = entry?;
+        let path = entry.path();
+        if entry.file_type()?.is_dir() {
+            if recursive {
+                list_files(&path, recursive, files)?;
+            }
+        } else if fs::metadata(&path).map_or(false, |m| m.is_file()) {
+            files.push(path.display().to_string());
+        }
+    }
+    Ok(())
 }
 
 trait InsChange {
@@ -127,6 +192,8 @@ impl InsChange for Changeset {
 mod tests {
     use std::collections::HashMap;
 
+    use tempfile::TempDir;
+
     use super::*;
 
     fn make_trust(path: &str, size: u64, hash: &str) -> Trust {
@@ -225,4 +292,95 @@ mod tests {
         let actual = store.get(&expected.path).unwrap();
         assert_eq!(actual.trusted, expected);
     }
+
+    fn write_file(dir: &Path, name: &str, content: &str) -> String {
+        let path = dir.join(name);
+        fs::write(&path, content).unwrap();
+        path.display().to_string()
+    }
+
+    #[test]
+    fn changeset_add_hashes_once_trusted() {
+        let dir = TempDir::new().unwrap();
+        let path = write_file(dir.path(), "foo", "foo");
+
+        let mut xs = Changeset::new();
+        xs.add(&path);
+        let store = xs.apply(DB::default());
+
+        let rec = store.get(&path).unwrap();
+        assert_eq!(rec.trusted.size, 3);
+        assert_eq!(
+            rec.trusted.hash,
+            "2c26b46b68ffc68ff99b453c1d30413413422d706483bfa0f98a5e886266e7ae"
+        );
+        assert!(matches!(rec.status, Some(Status::Trusted(_, _))));
+    }
+
+    #[test]
+    fn changeset_last_writer_wins() {
+        let dir = TempDir::new().unwrap();
+        let a = write_file(dir.path(), "a", "a");
+        let b = write_file(dir.path(), "b", "b");
+
+        let mut xs = Changeset::new();
+        xs.add(&a);
+        xs.del(&a);
+        xs.del(&b);
+        xs.add(&b);
+        xs.ins(&a, 1, "12345");
+        xs.del(&a);
+        assert_eq!(xs.len(), 6);
+        assert_eq!(xs.coalesced().len(), 2);
+
+        let store = xs.apply(DB::default());
+        assert_eq!(store.len(), 1);
+        assert!(store.get(&b).is_some());
+    }
+
+    #[test]
+    fn changeset_add_missing_file_fails() {
+        let mut xs = Changeset::new();
+        xs.add("/nonexistent/file");
+        assert!(xs.try_apply(DB::default()).is_err());
+    }
+
+    #[test]
+    fn changeset_add_many_and_dir() {
+        let dir = TempDir::new().unwrap();
+        let a = write_file(dir.path(), "a", "a");
+        let b = write_file(dir.path(), "b", "b");
+        fs::create_dir(dir.path().join("sub")).unwrap();
+        let c = write_file(&dir.path().join("sub"), "c", "c");
+
+        let mut xs = Changeset::new();
+        xs.add_many(&[&a, &b]);
+        assert_eq!(xs.len(), 2);
+
+        let mut xs = Changeset::new();
+        let dir_path = dir.path().display().to_string();
+        assert_eq!(xs.add_dir(&dir_path, false).unwrap(), 2);
+        assert_eq!(xs.add_dir(&dir_path, true).unwrap(), 3);
+
+        let store = xs.apply(DB::default());
+        assert_eq!(store.len(), 3);
+        assert!(store.get(&c).is_some());
+        assert!(xs.add_dir("/nonexistent/dir", true).is_err());
+    }
+
+    #[test]
+    fn changeset_append() {
+        let mut xs = Changeset::new();
+        xs.ins("/foo/bar", 1000, "12345");
+        let mut ys = Changeset::new();
+        ys.del("/foo/bar");
+        ys.ins("/foo/fad", 1000, "12345");
+
+        xs.append(ys);
+        assert_eq!(xs.len(), 3);
+
+        let store = xs.apply(DB::default());
+        assert_eq!(store.len(), 1);
+        assert!(store.get("/foo/fad").is_some());
+    }
 }
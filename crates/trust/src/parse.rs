@@ -13,8 +13,7 @@ use crate::source::TrustSource;
 use crate::source::TrustSource::{Ancillary, System};
 use crate::Trust;
 use nom::bytes::complete::tag;
-use nom::character::complete::{alphanumeric1, digit1, line_ending, space1};
-use nom::combinator::iterator;
+use nom::character::complete::{alphanumeric1, digit1, space1};
 use nom::sequence::{delimited, terminated};
 use nom::{InputIter, Parser};
 
@@ -34,11 +33,25 @@ pub fn trust_record(s: &str) -> Result<Trust, Error> {
     }
 }
 
-pub(crate) fn strtyped_trust_record(s: &str, t: &str) -> Result<(Trust, TrustSource), Error> {
-    match t {
-        "1" => trust_record(s).map(|t| (t, System)),
-        "2" => trust_record(s).map(|t| (t, Ancillary)),
-        v => Err(UnsupportedTrustType(v.to_string())),
+/// Parse a trust record from an lmdb entry
+/// The path is the key, the value is formatted as three space separated values
+/// TYPE SIZE HASH
+pub(crate) fn typed_trust_value(path: &str, v: &str) -> Result<(Trust, TrustSource), Error> {
+    match v.splitn(3, ' ').collect::<Vec<&str>>().as_slice() {
+        [t, sz, sha] => {
+            let source = match *t {
+                "1" => System,
+                "2" => Ancillary,
+                v => return Err(UnsupportedTrustType(v.to_string())),
+            };
+            let t = Trust {
+                path: path.to_string(),
+                size: sz.trim().parse()?,
+                hash: sha.trim().to_string(),
+            };
+            Ok((t, source))
+        }
+        _ => Err(MalformattedTrustEntry(format!("{} {}", path, v))),
     }
 }
 
@@ -49,20 +62,17 @@ struct RpmDbEntry {
     pub hash: Option<String>,
 }
 
-pub(crate) fn rpm_db_entry(s: &str) -> Vec<Trust> {
-    iterator(s, terminated(contains_no_files.or(parse_line), line_ending))
-        .collect::<Vec<Option<RpmDbEntry>>>()
-        .iter()
-        .flatten()
-        .filter(|e| keep_entry(&e.path))
-        .flat_map(|e| {
-            e.hash.as_ref().map(|hash| Trust {
-                path: e.path.clone(),
-                size: e.size,
-                hash: hash.clone(),
-            })
-        })
-        .collect()
+/// Parse a line of rpm dump output into trust
+/// None when the line is not trusted, as filtered by the fapolicyd rpm backend
+pub(crate) fn rpm_dump_line(s: &str) -> Option<Trust> {
+    match contains_no_files.or(parse_line).parse(s) {
+        Ok((_, Some(e))) if keep_entry(&e.path) => e.hash.map(|hash| Trust {
+            path: e.path,
+            size: e.size,
+            hash,
+        }),
+        _ => None,
+    }
 }
 
 fn contains_no_files(s: &str) -> nom::IResult<&str, Option<RpmDbEntry>> {
@@ -145,6 +155,10 @@ fn parse_line(i: &str) -> nom::IResult<&str, Option<RpmDbEntry>> {
 mod tests {
     use super::*;
 
+    fn rpm_db_entry(s: &str) -> Vec<Trust> {
+        s.lines().filter_map(rpm_dump_line).collect()
+    }
+
     #[test]
     fn with_contains_no_files_lines() {
         let full = format!(
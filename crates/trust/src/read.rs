@@ -9,7 +9,10 @@
 use std::fs::File;
 use std::io::{BufRead, BufReader};
 use std::path::{Path, PathBuf};
-use std::process::Command;
+use std::process::{Command, Stdio};
+use std::sync::mpsc;
+use std::sync::mpsc::SyncSender;
+use std::thread;
 use std::{fs, io};
 
 use fapolicy_util::rpm::ensure_rpm_exists;
@@ -72,21 +75,114 @@ pub(crate) fn file_trust(d: &Path, o: Option<&Path>) -> Result<Vec<(TrustSource,
         .collect())
 }
 
+/// number of lines of rpm output parsed as a batch
+const RPM_BATCH_LINES: usize = 4096;
+
 /// directly load the rpm database
 /// used to analyze the fapolicyd trust db for out of sync issues
+/// the trust is ordered by path
 pub fn rpm_trust(rpmdb: &Path) -> Result<Vec<Trust>, Error> {
+    let mut all = vec![];
+    rpm_trust_with(rpmdb, rayon::current_num_threads(), |batch| {
+        all.extend(batch)
+    })?;
+    all.sort_by(|a: &Trust, b: &Trust| a.path.cmp(&b.path));
+    Ok(all)
+}
+
+/// Stream trust from the rpm database to the consumer as it is parsed
+/// The installed packages are split into shards that are dumped by concurrent
+/// rpm processes, the output of each is parsed in batches while it is produced.
+/// Batches arrive in no particular order.
+pub fn rpm_trust_with<F>(rpmdb: &Path, shards: usize, mut consume: F) -> Result<(), Error>
+where
+    F: FnMut(Vec<Trust>),
+{
     ensure_rpm_exists()?;
 
-    let args = vec!["-qa", "--dump", "--dbpath", rpmdb.to_str().unwrap()];
+    let pkgs = rpm_packages(rpmdb)?;
+    if pkgs.is_empty() {
+        return Ok(());
+    }
+    let shard_size = (pkgs.len() + shards.max(1) - 1) / shards.max(1);
+
+    let (tx, rx) = mpsc::sync_channel(shards.max(1) * 2);
+    let workers: Vec<_> = pkgs
+        .chunks(shard_size)
+        .map(|pkgs| {
+            let mut args = vec!["-q", "--dump", "--dbpath", rpmdb.to_str().unwrap()];
+            args.extend(pkgs.iter().map(|p| p.as_str()));
+            let args: Vec<String> = args.into_iter().map(String::from).collect();
+            let tx = tx.clone();
+            thread::spawn(move || dump_shard(args, tx))
+        })
+        .collect();
+    drop(tx);
+
+    for batch in rx {
+        consume(batch);
+    }
+    for w in workers {
+        w.join().map_err(|_| ReadRpmDumpFailed)??;
+    }
+    Ok(())
+}
+
+// the installed packages by name, version and release
+fn rpm_packages(rpmdb: &Path) -> Result<Vec<String>, Error> {
+    let args = vec![
+        "-qa",
+        "--dbpath",
+        rpmdb.to_str().unwrap(),
+        "--qf",
+        "%{NAME}-%{VERSION}-%{RELEASE}\\n",
+    ];
     let res = Command::new("rpm")
         .args(args)
         .output()
         .map_err(RpmDumpFailed)?;
 
-    match String::from_utf8(res.stdout) {
-        Ok(data) => Ok(parse::rpm_db_entry(&data)),
-        Err(_) => Err(ReadRpmDumpFailed.into()),
+    let mut pkgs: Vec<String> = String::from_utf8(res.stdout)
+        .map_err(|_| ReadRpmDumpFailed)?
+        .lines()
+        .map(String::from)
+        .collect();
+    // packages installed for more than one arch are dumped together
+    pkgs.sort_unstable();
+    pkgs.dedup();
+    Ok(pkgs)
+}
+
+// dump a shard of packages, sending the trust parsed from each batch of lines
+fn dump_shard(args: Vec<String>, tx: SyncSender<Vec<Trust>>) -> Result<(), Error> {
+    let mut child = Command::new("rpm")
+        .args(args)
+        .stdout(Stdio::piped())
+        .spawn()
+        .map_err(RpmDumpFailed)?;
+    let stdout = child.stdout.take().ok_or(ReadRpmDumpFailed)?;
+
+    let mut lines = BufReader::new(stdout).lines();
+    loop {
+        let batch: Vec<String> = lines
+            .by_ref()
+            .take(RPM_BATCH_LINES)
+            .collect::<Result<_, _>>()
+            .map_err(|_| ReadRpmDumpFailed)?;
+        if batch.is_empty() {
+            break;
+        }
+        let trust: Vec<Trust> = batch
+            .iter()
+            .filter_map(|l| parse::rpm_dump_line(l))
+            .collect();
+        // the consumer has gone away, nothing more to do
+        if !trust.is_empty() && tx.send(trust).is_err() {
+            break;
+        }
     }
+    child.wait().map_err(RpmDumpFailed)?;
+    Ok(())
 }
 
 pub fn read_sorted_d_files(from: &Path) -> Result<Vec<PathBuf>, io::Error> {
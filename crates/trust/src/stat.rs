@@ -6,14 +6,17 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use std::fs::File;
-use std::io::{BufReader, ErrorKind};
+use std::fmt::{Display, Formatter};
+use std::fs::{File, Metadata};
+use std::io::ErrorKind;
+use std::str::FromStr;
 use std::time::UNIX_EPOCH;
 
-use fapolicy_util::sha::sha256_digest;
+use fapolicy_util::sha::sha256_file;
 
+use crate::cache::DigestCache;
 use crate::error::Error;
-use crate::error::Error::{FileIoError, MetaError};
+use crate::error::Error::{FileIoError, MetaError, UnsupportedCheckTier};
 use crate::Trust;
 
 /// Actual delivers metadata about the current file that exists on the filesystem.
@@ -21,8 +24,11 @@ use crate::Trust;
 #[derive(PartialEq, Eq, Clone, Debug)]
 pub struct Actual {
     pub size: u64,
-    pub hash: String,
+    /// Hash of the file, None when the verdict did not require hashing
+    pub hash: Option<String>,
     pub last_modified: u64,
+    /// The tier of check that produced the verdict
+    pub tier: Tier,
 }
 
 /// Trust status tag
@@ -36,11 +42,63 @@ pub enum Status {
     Missing(Trust),
 }
 
+/// Depth of a trust check, ordered from cheapest to most expensive
+#[derive(PartialEq, Eq, PartialOrd, Ord, Clone, Copy, Debug)]
+pub enum Tier {
+    /// File metadata only, existence and size are compared
+    Stat,
+    /// The file is hashed only when its size matches the trust
+    SizeGated,
+    /// The file is always hashed
+    Full,
+}
+
+impl Default for Tier {
+    fn default() -> Self {
+        Tier::SizeGated
+    }
+}
+
+impl Display for Tier {
+    fn fmt(&self, f: &mut Formatter<'_>) -> std::fmt::Result {
+        match self {
+            Tier::Stat => write!(f, "stat"),
+            Tier::SizeGated => write!(f, "size"),
+            Tier::Full => write!(f, "full"),
+        }
+    }
+}
+
+impl FromStr for Tier {
+    type Err = Error;
+
+    fn from_str(s: &str) -> Result<Self, Self::Err> {
+        match s {
+            "stat" => Ok(Tier::Stat),
+            "size" => Ok(Tier::SizeGated),
+            "full" => Ok(Tier::Full),
+            _ => Err(UnsupportedCheckTier(s.to_string())),
+        }
+    }
+}
+
 /// check status of trust against the filesystem
 pub fn check(t: &Trust) -> Result<Status, Error> {
+    check_tier(t, Tier::default(), None)
+}
+
+/// check status of trust against the filesystem
+/// the digest cache is consulted before hashing the file
+pub fn check_cached(t: &Trust, cache: &DigestCache) -> Result<Status, Error> {
+    check_tier(t, Tier::default(), Some(cache))
+}
+
+/// check status of trust against the filesystem to the depth of the tier
+/// when hashing is required the optional digest cache is consulted first
+pub fn check_tier(t: &Trust, tier: Tier, cache: Option<&DigestCache>) -> Result<Status, Error> {
     match File::open(&t.path) {
-        Ok(f) => match collect_actual(&f) {
-            Ok(act) if act.hash == t.hash && act.size == t.size => {
+        Ok(f) => match collect_actual(t, &f, tier, cache) {
+            Ok(act) if act.size == t.size && act.hash.as_ref().map_or(true, |h| *h == t.hash) => {
                 Ok(Status::Trusted(t.clone(), act))
             }
             Ok(act) => Ok(Status::Discrepancy(t.clone(), act)),
@@ -51,17 +109,159 @@ pub fn check(t: &Trust) -> Result<Status, Error> {
     }
 }
 
-fn collect_actual(file: &File) -> Result<Actual, Error> {
+fn collect_actual(
+    t: &Trust,
+    file: &File,
+    tier: Tier,
+    cache: Option<&DigestCache>,
+) -> Result<Actual, Error> {
     let meta = file.metadata()?;
-    let sha = sha256_digest(BufReader::new(file))?;
+    let (hash, tier) = match tier {
+        Tier::Stat => (None, Tier::Stat),
+        Tier::SizeGated if meta.len() != t.size => (None, Tier::Stat),
+        tier => (Some(digest(&t.path, file, &meta, cache)?), tier),
+    };
+
     Ok(Actual {
         size: meta.len(),
-        hash: sha,
-        last_modified: meta
-            .modified()
-            .map_err(|e| MetaError(format!("{}", e)))?
-            .duration_since(UNIX_EPOCH)
-            .map_err(|_| MetaError("failed to convert to epoch seconds".into()))?
-            .as_secs(),
+        hash,
+        last_modified: last_modified(&meta)?,
+        tier,
     })
 }
+
+/// trust a file as it is on the filesystem
+/// the file is hashed once, the trust and its actual state are both taken from
+/// that one read so the trust needs no further check against the file
+pub fn measure(path: &str) -> Result<(Trust, Actual), Error> {
+    let file = File::open(path)?;
+    let meta = file.metadata()?;
+    let hash = sha256_file(&file)?;
+    let t = Trust::new(path, meta.len(), &hash);
+    let act = Actual {
+        size: meta.len(),
+        hash: Some(hash),
+        last_modified: last_modified(&meta)?,
+        tier: Tier::Full,
+    };
+    Ok((t, act))
+}
+
+fn last_modified(meta: &Metadata) -> Result<u64, Error> {
+    Ok(meta
+        .modified()
+        .map_err(|e| MetaError(format!("{}", e)))?
+        .duration_since(UNIX_EPOCH)
+        .map_err(|_| MetaError("failed to convert to epoch seconds".into()))?
+        .as_secs())
+}
+
+fn digest(
+    path: &str,
+    file: &File,
+    meta: &Metadata,
+    cache: Option<&DigestCache>,
+) -> Result<String, Error> {
+    match cache.and_then(|c| c.get(path, meta)) {
+        Some(sha) => Ok(sha),
+        None => {
+            let sha = sha256_file(file)?;
+            if let Some(c) = cache {
+                c.put(path, meta, &sha);
+            }
+            Ok(sha)
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::io::Write;
+
+    use tempfile::NamedTempFile;
+
+    use super::*;
+
+    const FOO_SHA: &str = "2c26b46b68ffc68ff99b453c1d30413413422d706483bfa0f98a5e886266e7ae";
+
+    fn foo_file() -> (NamedTempFile, String) {
+        let mut f = NamedTempFile::new().unwrap();
+        f.write_all(b"foo").unwrap();
+        let path = f.path().display().to_string();
+        (f, path)
+    }
+
+    #[test]
+    fn tiers_trusted() {
+        let (_f, path) = foo_file();
+        let t = Trust::new(&path, 3, FOO_SHA);
+
+        for tier in [Tier::Stat, Tier::SizeGated, Tier::Full] {
+            match check_tier(&t, tier, None).unwrap() {
+                Status::Trusted(_, act) => {
+                    assert_eq!(act.tier, tier);
+                    assert_eq!(act.hash.is_some(), tier != Tier::Stat);
+                }
+                s => panic!("unexpected status {:?}", s),
+            }
+        }
+    }
+
+    #[test]
+    fn size_mismatch_skips_hash() {
+        let (_f, path) = foo_file();
+        let t = Trust::new(&path, 4, FOO_SHA);
+
+        match check_tier(&t, Tier::SizeGated, None).unwrap() {
+            Status::Discrepancy(_, act) => {
+                assert_eq!(act.tier, Tier::Stat);
+                assert!(act.hash.is_none());
+            }
+            s => panic!("unexpected status {:?}", s),
+        }
+
+        match check_tier(&t, Tier::Full, None).unwrap() {
+            Status::Discrepancy(_, act) => assert_eq!(act.hash.unwrap(), FOO_SHA),
+            s => panic!("unexpected status {:?}", s),
+        }
+    }
+
+    #[test]
+    fn hash_mismatch() {
+        let (_f, path) = foo_file();
+        let t = Trust::new(&path, 3, "00");
+
+        assert!(matches!(
+            check_tier(&t, Tier::Stat, None).unwrap(),
+            Status::Trusted(..)
+        ));
+        assert!(matches!(
+            check_tier(&t, Tier::SizeGated, None).unwrap(),
+            Status::Discrepancy(..)
+        ));
+    }
+
+    #[test]
+    fn missing() {
+        let t = Trust::new("/does/not/exist", 3, FOO_SHA);
+        assert!(matches!(check(&t).unwrap(), Status::Missing(_)));
+    }
+
+    #[test]
+    fn tier_from_str() {
+        for tier in [Tier::Stat, Tier::SizeGated, Tier::Full] {
+            assert_eq!(tier.to_string().parse::<Tier>().unwrap(), tier);
+        }
+        assert!("foo".parse::<Tier>().is_err());
+    }
+
+    #[test]
+    fn measure_trusts_file_as_is() {
+        let (_f, path) = foo_file();
+        let (t, act) = measure(&path).unwrap();
+        assert_eq!(t, Trust::new(&path, 3, FOO_SHA));
+        assert_eq!(act.hash.as_deref(), Some(FOO_SHA));
+        assert_eq!(act.tier, Tier::Full);
+        assert!(measure("/nonexistent/file").is_err());
+    }
+}
@@ -8,23 +8,45 @@
 
 use crate::db::{Rec, DB};
 use crate::source::TrustSource;
-use std::collections::hash_map::Entry;
-use std::collections::HashMap;
+use std::collections::BTreeMap;
 use std::fs::File;
-use std::io::Write;
-use std::path::Path;
+use std::io::{ErrorKind, Read, Write};
+use std::path::{Path, PathBuf};
 use std::{fs, io};
 
+/// Counts of the files and bytes touched by a trust write
+#[derive(Clone, Debug, Default, PartialEq, Eq)]
+pub struct WriteStats {
+    /// files that were written because their content changed
+    pub written: usize,
+    /// files whose content was already current
+    pub unchanged: usize,
+    /// trust.d files that no longer have any trust
+    pub removed: usize,
+    pub bytes: u64,
+}
+
+/// Write the trust db to the trust.d dir and optionally the trust file
 pub fn db(db: &DB, trust_d: &Path, trust_file: Option<&Path>) -> Result<(), io::Error> {
-    dir(db, trust_d)?;
+    sync(db, trust_d, trust_file).map(|_| ())
+}
+
+/// Bring the trust.d dir and optionally the trust file up to date with the db
+/// Only the files whose content differs from the db are written, each to a
+/// temporary file that is renamed over the old one, so a failed write leaves
+/// the previous trust in place. The temporary files are synced together before
+/// any rename and each directory is synced once after its renames.
+pub fn sync(db: &DB, trust_d: &Path, trust_file: Option<&Path>) -> Result<WriteStats, io::Error> {
+    let mut stats = WriteStats::default();
+    dir(db, trust_d, &mut stats)?;
     if let Some(trust_f) = trust_file {
-        file(db, trust_f)?;
+        file(db, trust_f, &mut stats)?;
     }
-    Ok(())
+    Ok(stats)
 }
 
-fn dir(db: &DB, dir: &Path) -> Result<(), io::Error> {
-    let mut files = HashMap::<&str, Vec<String>>::new();
+fn dir(db: &DB, dir: &Path, stats: &mut WriteStats) -> Result<(), io::Error> {
+    let mut files = BTreeMap::<&str, Vec<String>>::new();
     for (
         _,
         Rec {
@@ -35,23 +57,18 @@ fn dir(db: &DB, dir: &Path) -> Result<(), io::Error> {
     ) in db.iter()
     {
         if let Some(TrustSource::DFile(o)) = o {
-            match files.entry(o) {
-                Entry::Vacant(e) => {
-                    e.insert(vec![t.to_string()]);
-                }
-                Entry::Occupied(mut e) => {
-                    e.get_mut().push(t.to_string());
-                }
-            }
+            files.entry(o).or_default().push(t.to_string());
         }
     }
 
-    // clear existing trust.d files
+    // remove the trust.d files that are no longer sourced
     if dir.exists() {
         for e in fs::read_dir(dir)? {
             let f = e?.path();
-            if f.display().to_string().ends_with(".trust") {
-                fs::remove_file(f)?;
+            let name = f.file_name().and_then(|n| n.to_str()).unwrap_or_default();
+            if name.ends_with(".trust") && !files.contains_key(name) {
+                fs::remove_file(&f)?;
+                stats.removed += 1;
             }
         }
     }
@@ -67,27 +84,89 @@ fn dir(db: &DB, dir: &Path) -> Result<(), io::Error> {
         fs::create_dir_all(dir)?;
     }
 
-    // write trust.d files
-    for (k, v) in files {
-        let mut f = File::create(dir.join(k))?;
-        for l in v {
-            f.write_all(format!("{}\n", l).as_bytes())?;
+    let targets: Vec<(PathBuf, Vec<u8>)> = files
+        .into_iter()
+        .map(|(k, v)| (dir.join(k), content(v)))
+        .collect();
+    replace_changed(dir, targets, stats)
+}
+
+fn file(db: &DB, to: &Path, stats: &mut WriteStats) -> Result<(), io::Error> {
+    let lines = db
+        .iter()
+        .filter(|(_, rec)| matches!(rec.source, None | Some(TrustSource::Ancillary)))
+        .map(|(_, rec)| rec.trusted.to_string())
+        .collect();
+    let parent = match to.parent() {
+        Some(p) if !p.as_os_str().is_empty() => p,
+        _ => Path::new("."),
+    };
+    replace_changed(parent, vec![(to.to_path_buf(), content(lines))], stats)
+}
+
+// trust lines sorted so that the same trust always has the same content
+fn content(mut lines: Vec<String>) -> Vec<u8> {
+    lines.sort_unstable();
+    let mut buf = Vec::with_capacity(lines.iter().map(|l| l.len() + 1).sum());
+    for l in lines {
+        buf.extend_from_slice(l.as_bytes());
+        buf.push(b'\n');
+    }
+    buf
+}
+
+// write the targets in the dir that differ from what is on disk
+fn replace_changed(
+    dir: &Path,
+    targets: Vec<(PathBuf, Vec<u8>)>,
+    stats: &mut WriteStats,
+) -> Result<(), io::Error> {
+    let mut staged = vec![];
+    for (path, bytes) in targets {
+        if is_current(&path, &bytes)? {
+            stats.unchanged += 1;
+            continue;
         }
+        let tmp = tmp_path(&path);
+        let mut f = File::create(&tmp)?;
+        f.write_all(&bytes)?;
+        stats.written += 1;
+        stats.bytes += bytes.len() as u64;
+        staged.push((f, tmp, path));
+    }
+    if staged.is_empty() {
+        return Ok(());
     }
 
-    Ok(())
+    for (f, _, _) in staged.iter() {
+        f.sync_all()?;
+    }
+    for (_, tmp, path) in staged.iter() {
+        fs::rename(tmp, path)?;
+    }
+    File::open(dir)?.sync_all()
 }
 
-fn file(db: &DB, to: &Path) -> Result<(), io::Error> {
-    // write file trust db
-    let mut tf = File::create(to)?;
-    for (_, rec) in db.iter() {
-        match rec.source {
-            None | Some(TrustSource::Ancillary) => {
-                tf.write_all(format!("{}\n", rec.trusted).as_bytes())?;
-            }
-            _ => {}
-        }
+// the file exists with exactly the bytes, the size is compared before reading
+fn is_current(path: &Path, bytes: &[u8]) -> Result<bool, io::Error> {
+    let mut f = match File::open(path) {
+        Ok(f) => f,
+        Err(e) if e.kind() == ErrorKind::NotFound => return Ok(false),
+        Err(e) => return Err(e),
+    };
+    if f.metadata()?.len() != bytes.len() as u64 {
+        return Ok(false);
     }
-    Ok(())
+    let mut existing = Vec::with_capacity(bytes.len());
+    f.read_to_end(&mut existing)?;
+    Ok(existing == bytes)
+}
+
+// a hidden sibling that does not end in .trust, so it is never read as trust
+fn tmp_path(path: &Path) -> PathBuf {
+    let name = path
+        .file_name()
+        .map(|n| n.to_string_lossy().to_string())
+        .unwrap_or_default();
+    path.with_file_name(format!(".{}.tmp", name))
 }
@@ -158,6 +158,56 @@ fn test_dir_and_file_overwrite_2() -> Result<(), Box<dyn Error>> {
     Ok(())
 }
 
+#[test]
+fn sync_writes_only_changed_files() -> Result<(), Box<dyn Error>> {
+    let mut db = DB::new();
+    for (path, frag) in [
+        ("/foo", "00.trust"),
+        ("/bar", "01.trust"),
+        ("/baz", "02.trust"),
+    ] {
+        let mut rec: Rec = format!("{} 0 00000000", path).parse()?;
+        rec.source = Some(DFile(frag.to_string()));
+        db.put(rec);
+    }
+    db.put("/anc 0 00000000".parse()?);
+
+    let etc_fapolicyd = tempfile::tempdir()?.into_path();
+    let trust_d = tempfile::tempdir_in(&etc_fapolicyd)?.into_path();
+    let trust_f = etc_fapolicyd.join("fapolicyd.trust");
+
+    let stats = write::sync(&db, &trust_d, Some(&trust_f))?;
+    assert_eq!(stats.written, 4);
+    assert_eq!(stats.bytes, 4 * "/foo 0 00000000\n".len() as u64);
+
+    // writing the same trust again touches nothing
+    let stats = write::sync(&db, &trust_d, Some(&trust_f))?;
+    assert_eq!(stats.written, 0);
+    assert_eq!(stats.unchanged, 4);
+    assert_eq!(stats.bytes, 0);
+
+    // one changed entry rewrites one file
+    let mut rec: Rec = "/bar 1 11111111".parse()?;
+    rec.source = Some(DFile("01.trust".to_string()));
+    db.put(rec);
+    let stats = write::sync(&db, &trust_d, Some(&trust_f))?;
+    assert_eq!(stats.written, 1);
+    assert_eq!(stats.unchanged, 3);
+    assert_eq!(
+        "/bar 1 11111111",
+        read_string(&trust_d.join("01.trust"))?.trim()
+    );
+
+    // a fragment without trust is removed
+    db.remove("/baz");
+    let stats = write::sync(&db, &trust_d, Some(&trust_f))?;
+    assert_eq!(stats.removed, 1);
+    assert_eq!(stats.written, 0);
+    assert_eq!(fs::read_dir(&trust_d)?.count(), 2);
+
+    Ok(())
+}
+
 fn read_string(from: &Path) -> Result<String, io::Error> {
     let mut reader = File::open(from).map(BufReader::new)?;
     let mut actual = String::new();
@@ -7,4 +7,5 @@
  */
 
 pub mod rpm;
+pub mod search;
 pub mod sha;
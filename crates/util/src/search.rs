@@ -0,0 +1,302 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::HashMap;
+
+const STATUS_TERM: &str = "status:";
+
+/// What a search matches in a path
+#[derive(Clone, Debug, PartialEq)]
+pub enum Pattern {
+    /// every path
+    Any,
+    /// paths that contain the text
+    Contains(String),
+    /// paths that start with the text
+    Prefix(String),
+    /// paths that match a glob, where `*` matches any run and `?` any one byte
+    Glob(String),
+}
+
+/// A search for paths by pattern and status
+#[derive(Clone, Debug, PartialEq)]
+pub struct Query {
+    pub pattern: Pattern,
+    /// statuses to keep, any status when empty
+    pub status: Vec<String>,
+}
+
+impl Query {
+    /// Parse the text of a search
+    /// Terms of the form `status:TD` select by status, the rest of the text is
+    /// the path pattern. A pattern with a `*` or `?` is a glob over the whole
+    /// path, and a glob whose only wildcard is a trailing `*` is a prefix. Any
+    /// other pattern is matched as a substring.
+    pub fn parse(text: &str) -> Self {
+        let mut status = vec![];
+        let mut terms = vec![];
+        for term in text.split_whitespace() {
+            match term.get(..STATUS_TERM.len()) {
+                Some(t) if t.eq_ignore_ascii_case(STATUS_TERM) => status.extend(
+                    term[STATUS_TERM.len()..]
+                        .chars()
+                        .map(|c| c.to_ascii_uppercase().to_string()),
+                ),
+                _ => terms.push(term),
+            }
+        }
+
+        let text = terms.join(" ");
+        let wildcard = |c: char| c == '*' || c == '?';
+        let pattern = match text.find(wildcard) {
+            _ if text.is_empty() => Pattern::Any,
+            None => Pattern::Contains(text),
+            Some(i) if i == text.len() - 1 && text.ends_with('*') => {
+                Pattern::Prefix(text[..i].to_string())
+            }
+            Some(_) => Pattern::Glob(text),
+        };
+        Query { pattern, status }
+    }
+}
+
+/// An index of paths for substring, prefix and glob searches
+/// Substrings are found through the positions of each three byte sequence of
+/// the paths, prefixes through the paths in sorted order. Searches return the
+/// positions of the matching paths, in order.
+pub struct PathIndex {
+    paths: Vec<String>,
+    status: Option<Vec<String>>,
+    sorted: Vec<u32>,
+    grams: HashMap<[u8; 3], Vec<u32>>,
+}
+
+impl PathIndex {
+    /// Index the paths, with the status of each path when there are statuses
+    pub fn new(paths: Vec<String>, status: Option<Vec<String>>) -> Self {
+        let mut grams: HashMap<[u8; 3], Vec<u32>> = HashMap::new();
+        for (id, p) in paths.iter().enumerate() {
+            let id = id as u32;
+            for g in p.as_bytes().windows(3) {
+                let ids = grams.entry([g[0], g[1], g[2]]).or_default();
+                // a sequence repeated in a path is listed once for it
+                if ids.last() != Some(&id) {
+                    ids.push(id);
+                }
+            }
+        }
+
+        let mut sorted: Vec<u32> = (0..paths.len() as u32).collect();
+        sorted.sort_by(|a, b| paths[*a as usize].cmp(&paths[*b as usize]));
+
+        let status = status.map(|s| s.iter().map(|s| s.to_ascii_uppercase()).collect());
+
+        PathIndex {
+            paths,
+            status,
+            sorted,
+            grams,
+        }
+    }
+
+    pub fn len(&self) -> usize {
+        self.paths.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.paths.is_empty()
+    }
+
+    /// Positions of the paths that match the query, in order
+    /// The statuses of the query are ignored when the index has no statuses.
+    pub fn search(&self, query: &Query) -> Vec<usize> {
+        let mut ids: Vec<usize> = match &query.pattern {
+            Pattern::Any => (0..self.paths.len()).collect(),
+            Pattern::Contains(text) => self
+                .candidates(text)
+                .filter(|id| self.paths[*id].contains(text.as_str()))
+                .collect(),
+            Pattern::Prefix(text) => {
+                let mut ids = self.prefixed(text);
+                ids.sort_unstable();
+                ids
+            }
+            Pattern::Glob(glob) => self.globbed(glob),
+        };
+        match &self.status {
+            Some(status) if !query.status.is_empty() => ids.retain(|id| {
+                status
+                    .get(*id)
+                    .map(|s| query.status.contains(s))
+                    .unwrap_or(false)
+            }),
+            _ => {}
+        }
+        ids
+    }
+
+    // paths that may contain the text, all of them when the text is too short to
+    // look up; the shortest list of a sequence of the text is the smallest superset
+    fn candidates<'a>(&'a self, text: &str) -> Box<dyn Iterator<Item = usize> + 'a> {
+        if text.len() < 3 {
+            return Box::new(0..self.paths.len());
+        }
+        let mut shortest: &[u32] = &[];
+        for g in text.as_bytes().windows(3) {
+            match self.grams.get(&[g[0], g[1], g[2]]) {
+                Some(ids) if shortest.is_empty() || ids.len() < shortest.len() => shortest = ids,
+                Some(_) => {}
+                None => return Box::new(std::iter::empty()),
+            }
+        }
+        Box::new(shortest.iter().map(|id| *id as usize))
+    }
+
+    fn prefixed(&self, text: &str) -> Vec<usize> {
+        let start = self
+            .sorted
+            .partition_point(|id| self.paths[*id as usize].as_str() < text);
+        self.sorted[start..]
+            .iter()
+            .map(|id| *id as usize)
+            .take_while(|id| self.paths[*id].starts_with(text))
+            .collect()
+    }
+
+    fn globbed(&self, glob: &str) -> Vec<usize> {
+        let literals = glob.split(|c: char| c == '*' || c == '?');
+        let mut ids: Vec<usize> = match glob.find(|c: char| c == '*' || c == '?') {
+            // a glob that starts with text can only match paths with that prefix
+            Some(i) if i > 0 => self.prefixed(&glob[..i]),
+            _ => match literals.max_by_key(|l| l.len()) {
+                Some(longest) => self.candidates(longest).collect(),
+                None => (0..self.paths.len()).collect(),
+            },
+        };
+        ids.retain(|id| glob_match(glob.as_bytes(), self.paths[*id].as_bytes()));
+        ids.sort_unstable();
+        ids
+    }
+}
+
+// match a glob of `*` and `?` wildcards against the whole text, backtracking to
+// the last star when a literal does not match
+fn glob_match(glob: &[u8], text: &[u8]) -> bool {
+    let (mut g, mut t) = (0, 0);
+    let mut star: Option<(usize, usize)> = None;
+    while t < text.len() {
+        match glob.get(g) {
+            Some(b'*') => {
+                star = Some((g, t));
+                g += 1;
+            }
+            Some(c) if *c == b'?' || *c == text[t] => {
+                g += 1;
+                t += 1;
+            }
+            _ => match star {
+                Some((sg, st)) => {
+                    g = sg + 1;
+                    t = st + 1;
+                    star = Some((sg, st + 1));
+                }
+                None => return false,
+            },
+        }
+    }
+    glob[g..].iter().all(|c| *c == b'*')
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn index() -> PathIndex {
+        PathIndex::new(
+            vec![
+                "/usr/bin/ls".to_string(),
+                "/usr/lib/libc.so".to_string(),
+                "/usr/bin/cat".to_string(),
+                "/opt/app/bin/run".to_string(),
+            ],
+            Some(vec!["T".into(), "d".into(), "U".into(), "T".into()]),
+        )
+    }
+
+    fn search(text: &str) -> Vec<usize> {
+        index().search(&Query::parse(text))
+    }
+
+    #[test]
+    fn parse_query() {
+        assert_eq!(Query::parse("").pattern, Pattern::Any);
+        assert_eq!(Query::parse("bin").pattern, Pattern::Contains("bin".into()));
+        assert_eq!(
+            Query::parse("/usr/*").pattern,
+            Pattern::Prefix("/usr/".into())
+        );
+        assert_eq!(Query::parse("*.so").pattern, Pattern::Glob("*.so".into()));
+        assert_eq!(
+            Query::parse("/u*/ls").pattern,
+            Pattern::Glob("/u*/ls".into())
+        );
+
+        let q = Query::parse("Status:td lib");
+        assert_eq!(q.pattern, Pattern::Contains("lib".into()));
+        assert_eq!(q.status, vec!["T".to_string(), "D".to_string()]);
+    }
+
+    #[test]
+    fn contains() {
+        assert_eq!(search("bin"), vec![0, 2, 3]);
+        assert_eq!(search("/bin/"), vec![0, 2, 3]);
+        assert_eq!(search("libc"), vec![1]);
+        assert_eq!(search("s"), vec![0, 1, 2]);
+        assert!(search("nothing").is_empty());
+    }
+
+    #[test]
+    fn prefix() {
+        assert_eq!(search("/usr/bin/*"), vec![0, 2]);
+        assert_eq!(search("/usr/*"), vec![0, 1, 2]);
+        assert!(search("/var/*").is_empty());
+    }
+
+    #[test]
+    fn glob() {
+        assert_eq!(search("*.so"), vec![1]);
+        assert_eq!(search("/usr/*/c?t"), vec![2]);
+        assert_eq!(search("*bin*"), vec![0, 2, 3]);
+        assert_eq!(search("*/l?"), vec![0]);
+        assert_eq!(search("/usr/bin/l?"), vec![0]);
+        assert!(search("/usr/bin/l??").is_empty());
+    }
+
+    #[test]
+    fn status() {
+        assert_eq!(search("status:t"), vec![0, 3]);
+        assert_eq!(search("status:D lib"), vec![1]);
+        assert_eq!(search("status:u lib"), Vec::<usize>::new());
+    }
+
+    #[test]
+    fn status_without_statuses() {
+        let index = PathIndex::new(vec!["/usr/bin/ls".into(), "/usr/lib/libc.so".into()], None);
+        assert_eq!(index.search(&Query::parse("status:t")), vec![0, 1]);
+        assert_eq!(index.search(&Query::parse("status:t lib")), vec![1]);
+    }
+
+    #[test]
+    fn glob_matching() {
+        assert!(glob_match(b"*", b""));
+        assert!(glob_match(b"a*b*c", b"aXbYbZc"));
+        assert!(!glob_match(b"a*b", b"aXbY"));
+        assert!(glob_match(b"??", b"ab"));
+        assert!(!glob_match(b"?", b""));
+    }
+}
@@ -6,14 +6,25 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+use std::cell::RefCell;
+use std::fs::File;
 use std::io;
 use std::io::Read;
+use std::os::unix::io::AsRawFd;
 
 use thiserror::Error;
 
 use data_encoding::HEXLOWER;
 use ring::digest::{Context, SHA256};
 
+/// size of the read buffer used for hashing
+pub const BUFFER_SIZE: usize = 128 * 1024;
+
+thread_local! {
+    // hashing runs on worker threads, each keeps a buffer for reuse across files
+    static BUFFER: RefCell<Vec<u8>> = RefCell::new(vec![0; BUFFER_SIZE]);
+}
+
 #[derive(Error, Debug)]
 pub enum Error {
     #[error("error generating hash, {0}")]
@@ -23,17 +34,34 @@ pub enum Error {
 /// generate a sha256 hash as a string
 pub fn sha256_digest<R: Read>(mut reader: R) -> Result<String, Error> {
     let mut context = Context::new(&SHA256);
-    let mut buffer = [0; 1024];
-
-    loop {
-        let count = reader.read(&mut buffer)?;
-        if count == 0 {
-            break;
+    BUFFER.with(|b| {
+        let mut buffer = b.borrow_mut();
+        loop {
+            let count = match reader.read(&mut buffer) {
+                Ok(0) => break,
+                Ok(count) => count,
+                Err(e) if e.kind() == io::ErrorKind::Interrupted => continue,
+                Err(e) => return Err(e),
+            };
+            context.update(&buffer[..count]);
         }
-        context.update(&buffer[..count]);
-    }
+        Ok(())
+    })?;
 
     Ok(HEXLOWER.encode(context.finish().as_ref()))
 }
 
+/// generate a sha256 hash of a file as a string
+/// the file is read sequentially through a large buffer
+pub fn sha256_file(file: &File) -> Result<String, Error> {
+    // files spanning multiple reads benefit from aggressive readahead
+    // the advice is only a hint, failure does not affect the result
+    if file.metadata()?.len() > BUFFER_SIZE as u64 {
+        unsafe {
+            libc::posix_fadvise(file.as_raw_fd(), 0, 0, libc::POSIX_FADV_SEQUENTIAL);
+        }
+    }
+    sha256_digest(file)
+}
+
 // tested with integration tests
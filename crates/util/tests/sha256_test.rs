@@ -6,9 +6,10 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use fapolicy_util::sha::sha256_digest;
+use fapolicy_util::sha::{sha256_digest, sha256_file, BUFFER_SIZE};
 use std::fs::File;
-use std::io::BufReader;
+use std::io::{BufReader, Write};
+use std::time::Instant;
 
 #[test]
 fn test_hashme() {
@@ -17,3 +18,68 @@ fn test_hashme() {
     let actual = sha256_digest(BufReader::new(&f)).expect("failed to hash file");
     assert_eq!(actual, expected);
 }
+
+#[test]
+fn test_hashme_file() {
+    let expected = "047bc85db1001a7c98c13f594178d339efc60e3b099af5d27a65498ddc808f55";
+    let f = File::open("tests/data/hashme.txt").expect("failed to open file");
+    let actual = sha256_file(&f).expect("failed to hash file");
+    assert_eq!(actual, expected);
+}
+
+fn make_file(len: usize) -> tempfile::NamedTempFile {
+    let mut f = tempfile::NamedTempFile::new().expect("failed to create file");
+    let chunk: Vec<u8> = (0..BUFFER_SIZE).map(|i| (i % 251) as u8).collect();
+    let mut remaining = len;
+    while remaining > 0 {
+        let n = remaining.min(chunk.len());
+        f.write_all(&chunk[..n]).expect("failed to write file");
+        remaining -= n;
+    }
+    f.flush().expect("failed to flush file");
+    f
+}
+
+#[test]
+fn test_digest_and_file_agree() {
+    for len in [0, 1, BUFFER_SIZE - 1, BUFFER_SIZE + 1, 4 * BUFFER_SIZE + 1] {
+        let f = make_file(len);
+        let expected =
+            sha256_digest(BufReader::new(File::open(f.path()).unwrap())).expect("failed to hash");
+        let actual = sha256_file(&File::open(f.path()).unwrap()).expect("failed to hash");
+        assert_eq!(actual, expected, "hash mismatch at len {}", len);
+    }
+}
+
+// cargo test --release -p fapolicy-util -- --ignored --nocapture
+#[test]
+#[ignore]
+fn bench_sha256_file() {
+    for (name, len, iterations) in [
+        ("small", 4 * 1024, 2000),
+        ("medium", 1024 * 1024, 100),
+        ("huge", 512 * 1024 * 1024, 2),
+    ] {
+        let f = make_file(len);
+
+        let t = Instant::now();
+        for _ in 0..iterations {
+            sha256_digest(BufReader::new(File::open(f.path()).unwrap())).unwrap();
+        }
+        let reader = t.elapsed();
+
+        let t = Instant::now();
+        for _ in 0..iterations {
+            sha256_file(&File::open(f.path()).unwrap()).unwrap();
+        }
+        let engine = t.elapsed();
+
+        let mb = (len * iterations) as f64 / (1024.0 * 1024.0);
+        println!(
+            "{:>6}: BufReader {:>8.1} MB/s, sha256_file {:>8.1} MB/s",
+            name,
+            mb / reader.as_secs_f64(),
+            mb / engine.as_secs_f64()
+        );
+    }
+}
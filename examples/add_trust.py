@@ -17,7 +17,6 @@ from fapolicy_analyzer import *
 
 import argparse
 import os
-import pathlib
 
 import sys
 
@@ -33,8 +32,7 @@ def main(*argv):
     s = System()
     xs = Changeset()
     if os.path.isdir(args.path):
-        for p in pathlib.Path(args.path).iterdir():
-            xs.add_trust(str(p))
+        xs.add_trust_dir(args.path)
     else:
         xs.add_trust(args.path)
     s.apply_changeset(xs).deploy()
@@ -37,12 +37,12 @@ def check_both(s1, store, done):
     def st_update(updates, count):
         s1.merge(updates)
         store.dispatch(system_received(s1))
-        print(f"system progress {int(count / st * 100)}%", end='\r')
+        print(f"system progress {int(count / st.total * 100)}%", end='\r')
 
     def at_update(updates, count):
         s1.merge(updates)
         store.dispatch(system_received(s1))
-        print(f"ancillary progress {int(count / at * 100)}%", end='\r')
+        print(f"ancillary progress {int(count / at.total * 100)}%", end='\r')
 
     def st_done():
         print(f"system done!")
@@ -61,7 +61,7 @@ def check_both(s1, store, done):
     at = check_ancillary_trust(s1, at_update, at_done)
     st = check_system_trust(s1, st_update, st_done)
 
-    return st + at
+    return st.total + at.total
 
 
 def main(*argv):
@@ -88,16 +88,16 @@ def main(*argv):
 
     # check to ensure that merging trust does not change the original size of the trust db
     if args.trust_type == "file":
-        check_fn = check_ancillary_trust
+        check_fn = lambda s, a, c: check_ancillary_trust(s, a, c).total
         original_trust_size = len(s1.ancillary_trust())
     elif args.trust_type == "system":
-        check_fn = check_system_trust
+        check_fn = lambda s, a, c: check_system_trust(s, a, c).total
         original_trust_size = len(s1.system_trust())
     elif args.trust_type == "both":
         check_fn = lambda s, a, c: check_both(s1, store, done)
         original_trust_size = len(s1.ancillary_trust()) + len(s1.system_trust())
     else:
-        check_fn = check_all_trust
+        check_fn = lambda s, a, c: check_all_trust(s, a, c).total
         original_trust_size = len(s1.ancillary_trust()) + len(s1.system_trust())
 
     print(f"system contains {original_trust_size} unchecked system trust entries")
@@ -50,7 +50,7 @@ from fapolicy_analyzer.ui.actions import (
     request_users,
     system_trust_load_started,
 )
-from fapolicy_analyzer.ui.changeset_wrapper import TrustChangeset
+from fapolicy_analyzer.ui.changeset_wrapper import RuleChangeset, TrustChangeset
 from fapolicy_analyzer.ui.features.system_feature import create_system_feature
 from fapolicy_analyzer.ui.store import dispatch, init_store
 from fapolicy_analyzer.ui.strings import SYSTEM_INITIALIZATION_ERROR
@@ -146,25 +146,24 @@ def test_apply_changset_epic(mocker):
         return_value=result_system,
     )
     mock_system = MagicMock()
-    mock_apply = MagicMock()
-    changeset = TrustChangeset()
-    changeset.apply_to_system = mock_apply
+    changesets = (TrustChangeset(), RuleChangeset(), TrustChangeset())
     init_store(mock_system)
-    dispatch(apply_changesets(changeset))
-    mock_apply.assert_called_with(mock_system)
-    mock_add_action.assert_called_with((changeset,))
+    dispatch(apply_changesets(*changesets))
+    mock_system.apply_changesets.assert_called_once_with(
+        [c.wrapped for c in changesets]
+    )
+    mock_add_action.assert_called_with(changesets)
 
 
 def test_apply_changset_epic_error(mocker):
     mock_error_action = mocker.patch(
         "fapolicy_analyzer.ui.features.system_feature.error_apply_changesets"
     )
-    mock_changeset = MagicMock(
-        apply_to_system=MagicMock(side_effect=Exception("apply changeset error"))
+    mock_system = MagicMock(
+        apply_changesets=MagicMock(side_effect=Exception("apply changeset error"))
     )
-    mock_system = MagicMock()
     init_store(mock_system)
-    dispatch(apply_changesets(mock_changeset))
+    dispatch(apply_changesets(TrustChangeset()))
     mock_error_action.assert_called_with("apply changeset error")
 
 
@@ -174,11 +173,11 @@ def test_apply_changset_epic_error(mocker):
         (
             request_events,
             (LogType.debug, MagicMock()),
-            "load_debuglog",
+            "follow_debuglog",
             received_events,
         ),
-        (request_events, (LogType.syslog, None), "load_syslog", received_events),
-        (request_events, (LogType.audit, None), "load_auditlog", received_events),
+        (request_events, (LogType.syslog, None), "follow_syslog", received_events),
+        (request_events, (LogType.audit, None), "follow_auditlog", received_events),
         (request_users, None, "users", received_users),
         (request_groups, None, "groups", received_groups),
         (request_rules, None, "rules", received_rules),
@@ -202,12 +201,71 @@ def test_request_epic(
     mock_received_action.assert_called_with(mock_return_value)
 
 
+@pytest.mark.parametrize(
+    "log_type, file, system_fn_to_mock, expected_args",
+    [
+        (LogType.debug, "foo", "follow_debuglog", ("foo", 1)),
+        (LogType.syslog, None, "follow_syslog", (1,)),
+        (LogType.audit, None, "follow_auditlog", (1,)),
+    ],
+)
+def test_request_events_in_window(log_type, file, system_fn_to_mock, expected_args):
+    mock_system_fn = MagicMock()
+    mock_system = MagicMock(**{system_fn_to_mock: mock_system_fn})
+
+    init_store(mock_system)
+    dispatch(request_events(log_type, file, begin=1))
+
+    mock_system_fn.assert_called_once_with(*expected_args)
+
+
+def test_request_events_refreshes_followed_log():
+    mock_log = MagicMock()
+    mock_system = MagicMock(follow_syslog=MagicMock(return_value=mock_log))
+
+    init_store(mock_system)
+    dispatch(request_events(LogType.syslog, begin=10))
+    dispatch(request_events(LogType.syslog, begin=20))
+
+    mock_system.follow_syslog.assert_called_once_with(10)
+    mock_log.refresh.assert_called_once()
+
+
+def test_request_events_refreshes_with_merged_trust(mocker):
+    mock_check = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.check_system_trust"
+    )
+    mock_log = MagicMock()
+    mock_system = MagicMock(follow_syslog=MagicMock(return_value=mock_log))
+
+    init_store(mock_system)
+    dispatch(request_events(LogType.syslog, begin=10))
+    dispatch(request_system_trust())
+    _, update, _ = mock_check.call_args[0]
+    update([MagicMock()], 1)
+
+    dispatch(request_events(LogType.syslog, begin=20))
+    mock_log.refresh.assert_called_once_with(mock_system)
+    dispatch(request_events(LogType.syslog, begin=30))
+    mock_log.refresh.assert_called_with()
+
+
+def test_request_events_rereads_earlier_window():
+    mock_system = MagicMock()
+
+    init_store(mock_system)
+    dispatch(request_events(LogType.syslog, begin=20))
+    dispatch(request_events(LogType.syslog, begin=10))
+
+    mock_system.follow_syslog.assert_has_calls([call(20), call(10)])
+
+
 @pytest.mark.parametrize(
     "action_to_dispatch, payload, system_fn_to_mock, error_action_to_mock",
     [
-        (request_events, (LogType.debug, MagicMock()), "load_debuglog", error_events),
-        (request_events, (LogType.audit, MagicMock()), "load_auditlog", error_events),
-        (request_events, (LogType.syslog, None), "load_syslog", error_events),
+        (request_events, (LogType.debug, MagicMock()), "follow_debuglog", error_events),
+        (request_events, (LogType.audit, MagicMock()), "follow_auditlog", error_events),
+        (request_events, (LogType.syslog, None), "follow_syslog", error_events),
         (request_users, None, "users", error_users),
         (request_groups, None, "groups", error_groups),
         (request_rules, None, "rules", error_rules),
@@ -264,7 +322,38 @@ def test_request_trust(
     dispatch(action_to_dispatch(*(payload or [])))
 
     mock_system_fn.assert_called()
-    mock_received_action.assert_called_with(mock_return_value, 1)
+    mock_received_action.assert_called_with(mock_return_value.total, 1)
+
+
+@pytest.mark.parametrize(
+    "action_to_dispatch, system_fn_to_mock",
+    [
+        (request_ancillary_trust, "check_ancillary_trust"),
+        (request_system_trust, "check_system_trust"),
+    ],
+)
+def test_request_trust_cancels_superseded(
+    action_to_dispatch, system_fn_to_mock, mocker
+):
+    first_check = MagicMock()
+    second_check = MagicMock()
+    mocker.patch(
+        f"fapolicy_analyzer.ui.features.system_feature.{system_fn_to_mock}",
+        side_effect=[first_check, second_check],
+    )
+    mocker.patch("fapolicy_analyzer.ui.features.system_feature.add_changesets")
+
+    mock_system = MagicMock()
+    init_store(mock_system)
+    dispatch(action_to_dispatch())
+    # repeat requests for the same system do not start another check
+    dispatch(action_to_dispatch())
+    first_check.cancel.assert_not_called()
+
+    dispatch(apply_changesets(MagicMock()))
+    dispatch(action_to_dispatch())
+    first_check.cancel.assert_called_once()
+    second_check.cancel.assert_not_called()
 
 
 @pytest.mark.parametrize(
@@ -26,6 +26,7 @@ from fapolicy_analyzer.ui.reducers.trust_reducer import (
     handle_trust_load_complete,
     handle_trust_load_started,
 )
+from fapolicy_analyzer.util.chunked_list import ChunkedList
 
 import context  # noqa: F401 # isort: skip
 
@@ -96,6 +97,23 @@ def test_handle_received_trust_update(initial_state):
     )
 
 
+def test_handle_received_trust_update_keeps_previous_state(initial_state):
+    timestamp = time.time()
+    started = handle_trust_load_started(
+        initial_state, MagicMock(payload=(3, timestamp))
+    )
+    first = handle_received_trust_update(
+        started, MagicMock(payload=(["a", "b"], 2, timestamp))
+    )
+    second = handle_received_trust_update(
+        first, MagicMock(payload=(["c"], 3, timestamp))
+    )
+    assert isinstance(second.trust, ChunkedList)
+    assert first.trust == ["a", "b"]
+    assert second.trust == ["a", "b", "c"]
+    assert second.last_set_completed == ["c"]
+
+
 def test_handle_trust_load_complete(initial_state):
     trust = [MagicMock()]
     incoming_state = TrustState(
@@ -0,0 +1,85 @@
+# Copyright Concurrent Technologies Corporation 2021
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import time
+import tracemalloc
+from collections import namedtuple
+
+from fapolicy_analyzer.ui.actions import (
+    received_system_trust_update,
+    system_trust_load_started,
+)
+from fapolicy_analyzer.ui.reducers.trust_reducer import (
+    TrustState,
+    system_trust_reducer,
+)
+
+import context  # noqa: F401 # isort: skip
+
+ENTRIES = 200_000
+BATCH_SIZE = 100
+
+Entry = namedtuple("Entry", ["path", "size", "hash"])
+
+
+def _stream(batches, timestamp):
+    state = system_trust_reducer(
+        TrustState(
+            error=None,
+            trust=[],
+            loading=False,
+            percent_complete=-1,
+            last_set_completed=None,
+            trust_count=0,
+            timestamp=0,
+        ),
+        system_trust_load_started(ENTRIES, timestamp),
+    )
+    running_count = 0
+    for batch in batches:
+        running_count += len(batch)
+        state = system_trust_reducer(
+            state, received_system_trust_update(batch, running_count, timestamp)
+        )
+    return state
+
+
+def test_streamed_trust_update_benchmark():
+    """
+    Streams 200k entries through the reducer in the batches the trust check
+    produces, reporting the total time and the peak memory allocated.
+    """
+    entries = [Entry(f"/usr/bin/{i}", i, "0" * 64) for i in range(ENTRIES)]
+    batches = [entries[i : i + BATCH_SIZE] for i in range(0, ENTRIES, BATCH_SIZE)]
+    timestamp = time.time()
+
+    start = time.perf_counter()
+    state = _stream(batches, timestamp)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    _stream(batches, timestamp)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"\n{ENTRIES} entries in {len(batches)} updates: "
+        f"{elapsed:.3f} seconds, {peak / 2**20:.1f} MiB peak"
+    )
+    assert len(state.trust) == ENTRIES
+    assert list(state.trust) == entries
+    assert state.percent_complete == 100
+    # each update holds a reference to its batch, the entries are never copied
+    assert peak < 32 * 2**20
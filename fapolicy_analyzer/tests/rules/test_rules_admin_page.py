@@ -14,7 +14,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import context  # noqa: F401 # isort: skip
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
 
 import gi
 import pytest
@@ -91,6 +91,18 @@ def test_creates_widget(widget):
     assert type(widget.get_ref()) is Gtk.Paned
 
 
+@pytest.mark.usefixtures(
+    "mock_dispatch", "mock_system_feature", "mock_notifications_feature"
+)
+def test_invalidates_rule_paths_on_load(mocker):
+    mock_invalidate = mocker.patch(
+        "fapolicy_analyzer.ui.rules.rules_admin_page.invalidate_rule_paths"
+    )
+    init_store(mock_System())
+    RulesAdminPage()
+    mock_invalidate.assert_called_once_with()
+
+
 @pytest.mark.usefixtures("mock_system_feature")
 def test_disposes(mocker):
     mockDispose = MagicMock()
@@ -309,6 +321,18 @@ def test_save_click_invalid(widget, mock_dispatch, mocker):
     mock_dispatch.assert_not_any_call(InstanceOf(Action) & Attrs(type=APPLY_CHANGESETS))
 
 
+def test_validate_parses_from_last_changeset(widget, mocker):
+    mock_changeset = mocker.patch(
+        "fapolicy_analyzer.ui.rules.rules_admin_page.RuleChangeset"
+    )
+    first = mock_changeset.return_value
+    widget._text_view.rules_changed("allow perm=any all : all")
+    widget.on_validate_clicked()
+    widget._text_view.rules_changed("allow perm=open all : all")
+    widget.on_validate_clicked()
+    assert mock_changeset.call_args_list == [call(None), call(first)]
+
+
 def test_changeset_parse_error(widget, mock_dispatch, mocker):
     mocker.patch(
         "fapolicy_analyzer.ui.rules.rules_admin_page.RuleChangeset.parse",
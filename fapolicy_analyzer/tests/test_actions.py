@@ -311,21 +311,28 @@ def test_request_audit_log_events():
     action = request_events(LogType.audit)
     assert type(action) is Action
     assert action.type == REQUEST_EVENTS
-    assert action.payload == (LogType.audit, None)
+    assert action.payload == (LogType.audit, None, None)
+
+
+def test_request_log_events_in_window():
+    action = request_events(LogType.audit, begin=1)
+    assert type(action) is Action
+    assert action.type == REQUEST_EVENTS
+    assert action.payload == (LogType.audit, None, 1)
 
 
 def test_request_sys_log_events():
     action = request_events(LogType.syslog)
     assert type(action) is Action
     assert action.type == REQUEST_EVENTS
-    assert action.payload == (LogType.syslog, None)
+    assert action.payload == (LogType.syslog, None, None)
 
 
 def test_request_debug_log_events():
     action = request_events(LogType.debug, "foo")
     assert type(action) is Action
     assert action.type == REQUEST_EVENTS
-    assert action.payload == (LogType.debug, "foo")
+    assert action.payload == (LogType.debug, "foo", None)
 
 
 def test_received_events():
@@ -69,6 +69,16 @@ def test_RuleChangeset_parse(mocker):
     mock().parse.assert_called_with("foo")
 
 
+def test_RuleChangeset_from_previous(mocker):
+    mock = mocker.patch(
+        "fapolicy_analyzer.ui.changeset_wrapper.fapolicy_analyzer.RuleChangeset"
+    )
+    previous = RuleChangeset()
+    sut = RuleChangeset(previous)
+    mock().successor.assert_called_once_with()
+    assert sut.wrapped == mock().successor()
+
+
 def test_RuleChangeset_rules(mocker):
     mock = mocker.patch(
         "fapolicy_analyzer.ui.changeset_wrapper.fapolicy_analyzer.RuleChangeset"
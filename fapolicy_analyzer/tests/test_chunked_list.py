@@ -0,0 +1,64 @@
+# Copyright Concurrent Technologies Corporation 2021
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+
+from fapolicy_analyzer.util.chunked_list import ChunkedList
+
+import context  # noqa: F401
+
+
+def test_empty():
+    empty = ChunkedList()
+    assert len(empty) == 0
+    assert list(empty) == []
+    assert empty == []
+
+
+def test_append_leaves_previous_version():
+    first = ChunkedList([1, 2])
+    second = first.append([3])
+    assert list(first) == [1, 2]
+    assert list(second) == [1, 2, 3]
+    assert len(second) == 3
+
+
+def test_append_nothing_is_same_version():
+    first = ChunkedList([1])
+    assert first.append([]) is first
+
+
+def test_branch_from_older_version():
+    base = ChunkedList([1]).append([2])
+    newer = base.append([3])
+    branch = base.append([4, 5])
+    assert list(newer) == [1, 2, 3]
+    assert list(branch) == [1, 2, 4, 5]
+    assert list(base) == [1, 2]
+
+
+def test_getitem():
+    items = ChunkedList([0, 1]).append([2, 3, 4]).append([5])
+    assert [items[i] for i in range(len(items))] == [0, 1, 2, 3, 4, 5]
+    assert items[-1] == 5
+    assert items[1:4] == [1, 2, 3]
+    with pytest.raises(IndexError):
+        items[6]
+
+
+def test_equals_sequence():
+    assert ChunkedList([1]).append([2]) == [1, 2]
+    assert [1, 2] == ChunkedList([1, 2])
+    assert ChunkedList([1]) != [1, 2]
@@ -71,6 +71,35 @@ def test_load_path_action_list():
     assert (CHANGESET_ACTION_DEL_TRUST, "/tmp/del.txt") in [(r[0], r[1]) for r in rows]
 
 
+def test_load_trust_difference(mocker):
+    changeset = TrustChangeset()
+    changeset.add("/tmp/add.txt")
+    changeset.add("/tmp/twice.txt")
+    changeset.delete("/tmp/twice.txt")
+    mock_diff = mocker.patch(
+        "fapolicy_analyzer.ui.confirm_deployment_dialog.trust_difference",
+        return_value=(["/tmp/add.txt"], ["/tmp/twice.txt"], ["/tmp/mod.txt"]),
+    )
+    mocker.patch(
+        "fapolicy_analyzer.ui.rules.rules_difference_dialog.rules_difference",
+        return_value="",
+    )
+    mocker.patch(
+        "fapolicy_analyzer.ui.config.config_difference_dialog.config_difference",
+        return_value="",
+    )
+    current, previous = MagicMock(), MagicMock()
+    widget = ConfirmDeploymentDialog([changeset], current, previous, Gtk.Window())
+    view = widget.get_object("changesTreeView")
+    rows = [(r[0], r[1]) for r in view.get_model()]
+    mock_diff.assert_called_once_with(previous, current)
+    assert rows == [
+        (CHANGESET_ACTION_ADD_TRUST, "/tmp/add.txt"),
+        (CHANGESET_ACTION_ADD_TRUST, "/tmp/mod.txt"),
+        (CHANGESET_ACTION_DEL_TRUST, "/tmp/twice.txt"),
+    ]
+
+
 def test_load_rules(mocker):
     changeset = RuleChangeset()
     changeset.parse("allow perm=any all : all")
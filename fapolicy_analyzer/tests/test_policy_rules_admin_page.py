@@ -157,7 +157,7 @@ def test_loads_debug_file(mock_dispatch):
     PolicyRulesAdminPage(audit_file=_mock_file)
     mock_dispatch.assert_any_call(
         InstanceOf(Action)
-        & Attrs(type=REQUEST_EVENTS, payload=(LogType.debug, _mock_file))
+        & Attrs(type=REQUEST_EVENTS, payload=(LogType.debug, _mock_file, None))
     )
 
 
@@ -165,7 +165,8 @@ def test_loads_syslog(mock_dispatch):
     init_store(mock_System())
     PolicyRulesAdminPage(which_log=LogType.syslog)
     mock_dispatch.assert_any_call(
-        InstanceOf(Action) & Attrs(type=REQUEST_EVENTS, payload=(LogType.syslog, None))
+        InstanceOf(Action)
+        & Attrs(type=REQUEST_EVENTS, payload=(LogType.syslog, None, InstanceOf(int)))
     )
 
 
@@ -173,7 +174,8 @@ def test_loads_auditlog(mock_dispatch):
     init_store(mock_System())
     PolicyRulesAdminPage(which_log=LogType.audit)
     mock_dispatch.assert_any_call(
-        InstanceOf(Action) & Attrs(type=REQUEST_EVENTS, payload=(LogType.audit, None))
+        InstanceOf(Action)
+        & Attrs(type=REQUEST_EVENTS, payload=(LogType.audit, None, InstanceOf(int)))
     )
 
 
@@ -391,6 +393,16 @@ def test_reloads_views_after_refresh(
     assert prev_selected_objects == cur_selected_objects
 
 
+def test_reloads_followed_log_after_refresh(widget, mock_system_features, states):
+    log = states[0]["events"].log
+    log.begin.assert_called_once()
+
+    widget.on_refresh_clicked()
+    # a followed log is refreshed in place and received again
+    mock_system_features.on_next(states[0])
+    assert log.begin.call_count == 2
+
+
 @pytest.mark.parametrize(
     "aclListView",
     [pytest.lazy_fixture("userListView"), pytest.lazy_fixture("groupListView")],
@@ -733,5 +745,6 @@ def test_open_file_button_clicked(widget, mock_dispatch, mocker):
     on_click()
     mock_get_Filename.assert_called()
     mock_dispatch.assert_any_call(
-        InstanceOf(Action) & Attrs(type=REQUEST_EVENTS, payload=(LogType.debug, "foo"))
+        InstanceOf(Action)
+        & Attrs(type=REQUEST_EVENTS, payload=(LogType.debug, "foo", None))
     )
@@ -104,6 +104,61 @@ def test_filtering(widget):
     assert "baz" not in paths
 
 
+def test_filtering_by_glob(widget):
+    view = widget.get_object("treeView")
+    viewFilter = widget.get_object("search")
+    viewFilter.set_text("b?z")
+    widget.on_search_activate()
+    refresh_gui(delay=0.3)
+    assert ["baz"] == [x[0] for x in view.get_model()]
+
+    viewFilter.set_text("")
+    widget.on_search_activate()
+    refresh_gui(delay=0.3)
+    assert ["baz", "foo"] == [x[0] for x in view.get_model()]
+
+
+def test_filtering_ignores_status(widget):
+    view = widget.get_object("treeView")
+    viewFilter = widget.get_object("search")
+    viewFilter.set_text("status:T fo")
+    widget.on_search_activate()
+    refresh_gui(delay=0.3)
+    assert ["foo"] == [x[0] for x in view.get_model()]
+
+    viewFilter.set_text("status:T")
+    widget.on_search_activate()
+    refresh_gui(delay=0.3)
+    assert ["baz", "foo"] == [x[0] for x in view.get_model()]
+
+
+def test_filtering_tree_store():
+    column = Gtk.TreeViewColumn("foo", Gtk.CellRendererText(), text=0)
+    widget = SearchableList([column])
+    store = Gtk.TreeStore(str)
+    foo = store.append(None, ["foo"])
+    store.append(foo, ["foo/bar"])
+    baz = store.append(None, ["baz"])
+    store.append(baz, ["baz/foo"])
+    widget.load_store(store)
+
+    widget.get_object("search").set_text("foo")
+    widget.on_search_activate()
+    model = widget.get_object("treeView").get_model()
+    assert ["foo"] == [x[0] for x in model]
+    assert ["foo/bar"] == [x[0] for x in model[0].iterchildren()]
+
+
+def test_filters_new_store(widget):
+    widget.get_object("search").set_text("fo")
+    store = Gtk.ListStore(str)
+    store.append(["bar"])
+    store.append(["food"])
+    widget.load_store(store)
+    view = widget.get_object("treeView")
+    assert ["food"] == [x[0] for x in view.get_model()]
+
+
 def test_loads_data_on_refresh(widget, mocker):
     widget._load_data = MagicMock(side_effect=widget._load_data)
     widget.refresh()
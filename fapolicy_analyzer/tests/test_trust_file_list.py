@@ -25,6 +25,7 @@ from gi.repository import Gtk
 from helpers import refresh_gui
 
 from fapolicy_analyzer.ui.trust_file_list import TrustFileList, epoch_to_string
+from fapolicy_analyzer.ui.trust_list_model import TrustListModel
 
 _trust = [
     MagicMock(status="u", path="/tmp/bar", actual=MagicMock(last_modified=123456789)),
@@ -48,27 +49,19 @@ def test_uses_custom_trust_func():
     trust_func.assert_called()
 
 
-def test_uses_custom_markup_func(mocker):
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.ThreadPoolExecutor",
-        return_value=MagicMock(submit=lambda x, *args: x(*args)),
-    )
+def test_uses_custom_markup_func():
     markup_func = MagicMock(return_value="t")
     widget = TrustFileList(trust_func=MagicMock(), markup_func=markup_func)
     widget.init_list(2)
     widget.append_trust(_trust)
+    refresh_gui(delay=0.5)
+    # rows are made as they are read from the model
+    markup_func.assert_not_called()
+    assert ["t", "t"] == [x[0] for x in widget.get_object("treeView").get_model()]
     markup_func.assert_called_with("t")
 
 
-def test_loads_trust_store(widget, mocker):
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.ThreadPoolExecutor",
-        return_value=MagicMock(submit=lambda x: x()),
-    )
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.GLib.idle_add",
-        side_effect=lambda x, args: x(args),
-    )
+def test_loads_trust_store(widget):
     widget.init_list(2)
     widget.append_trust(_trust)
     refresh_gui(delay=0.5)
@@ -77,24 +70,35 @@ def test_loads_trust_store(widget, mocker):
     assert [t.path for t in _trust] == [x[2] for x in view.get_model()]
 
 
-def test_cancels_load_trust_store(widget, mocker):
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.ThreadPoolExecutor",
-        return_value=MagicMock(submit=lambda x: x()),
-    )
-    mockIdleAdd = mocker.patch("fapolicy_analyzer.ui.trust_file_list.GLib.idle_add")
+def test_cancels_load_trust_store(widget):
     widget.init_list(2)
-    # trust_file_list._executorCanceled = True
     widget.on_destroy()
 
     widget.append_trust(_trust)
     refresh_gui(delay=0.5)
-    mockIdleAdd.assert_not_called()
+    assert len(widget.get_object("treeView").get_model()) == 0
+
+
+def test_sorts_by_column(widget):
+    widget.init_list(2)
+    widget.append_trust(_trust)
+    refresh_gui(delay=0.5)
+    view = widget.get_object("treeView")
+    pathColumn = view.get_column(2)
+
+    pathColumn.clicked()
+    assert ["/tmp/foo", "/tmp/bar"] == [x[2] for x in view.get_model()]
+    assert pathColumn.get_sort_order() == Gtk.SortType.DESCENDING
+
+    view.get_column(0).clicked()
+    assert ["t", "u"] == [x[0] for x in view.get_model()]
 
 
 def test_fires_trust_selection_changed(widget):
-    store = Gtk.ListStore(str, str, str, object, str)
-    store.append(["f", "o", "o", _trust[0], "baz"])
+    store = TrustListModel(
+        (str, str, str, object, str, str), lambda t: ["f", "o", "o", t, "b", "a"]
+    )
+    store.extend([_trust[0]])
     widget.load_store(1, store)
     mockHandler = MagicMock()
     widget.trust_selection_changed += mockHandler
@@ -121,45 +125,21 @@ def test_epoch_to_string():
     assert epoch_to_string(None) == "Missing"
 
 
-def test_tree_count_full(widget, mocker):
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.ThreadPoolExecutor",
-        return_value=MagicMock(submit=lambda x: x()),
-    )
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.GLib.idle_add",
-        side_effect=lambda x, args: x(args),
-    )
+def test_tree_count_full(widget):
     widget.init_list(2)
     widget.append_trust(_trust)
     refresh_gui(delay=0.5)
     assert widget.treeCount.get_text() == "2  files"
 
 
-def test_tree_count_empty(widget, mocker):
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.ThreadPoolExecutor",
-        return_value=MagicMock(submit=lambda x: x()),
-    )
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.GLib.idle_add",
-        side_effect=lambda x, args: x(args),
-    )
+def test_tree_count_empty(widget):
     widget.init_list(0)
     widget.append_trust([])
     refresh_gui(delay=0.5)
     assert widget.treeCount.get_text() == "0  files"
 
 
-def test_tree_count_partial(widget, mocker):
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.ThreadPoolExecutor",
-        return_value=MagicMock(submit=lambda x: x()),
-    )
-    mocker.patch(
-        "fapolicy_analyzer.ui.trust_file_list.GLib.idle_add",
-        side_effect=lambda x, args: x(args),
-    )
+def test_tree_count_partial(widget):
     widget.init_list(2)
     widget.append_trust(_trust)
     refresh_gui(delay=0.5)
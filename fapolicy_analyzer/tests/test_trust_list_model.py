@@ -0,0 +1,113 @@
+# Copyright Concurrent Technologies Corporation 2021
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import gi
+import pytest
+
+import context  # noqa: F401 # isort: skip
+from fapolicy_analyzer.ui.trust_list_model import TrustListModel, sort_index
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk  # isort: skip
+
+_entries = [
+    SimpleNamespace(status="T", path="/b", actual=SimpleNamespace(last_modified=3)),
+    SimpleNamespace(status="D", path="/c", actual=SimpleNamespace(last_modified=1)),
+    SimpleNamespace(status="T", path="/a", actual=None),
+]
+
+
+@pytest.fixture
+def model():
+    model = TrustListModel((str, str, object), lambda e: [e.status, e.path, e])
+    model.extend(_entries)
+    model.sort(2, Gtk.SortType.ASCENDING)
+    return model
+
+
+def paths(model):
+    return [row[1] for row in model]
+
+
+def test_sort_index():
+    assert sort_index(_entries, "path") == [2, 0, 1]
+    assert sort_index(_entries, "status") == [1, 2, 0]
+    assert sort_index(_entries, "mtime") == [2, 1, 0]
+
+
+def test_rows_in_path_order(model):
+    assert len(model) == 3
+    assert paths(model) == ["/a", "/b", "/c"]
+    assert model[0][2] is _entries[2]
+
+
+def test_sort(model):
+    model.sort(0, Gtk.SortType.ASCENDING)
+    assert paths(model) == ["/c", "/a", "/b"]
+    model.sort(1, Gtk.SortType.DESCENDING)
+    assert paths(model) == ["/c", "/b", "/a"]
+
+
+def test_refilter(model):
+    model.refilter("status:T")
+    assert paths(model) == ["/a", "/b"]
+    assert model.entry_count == 3
+    model.refilter("/c")
+    assert paths(model) == ["/c"]
+    model.refilter()
+    assert paths(model) == ["/a", "/b", "/c"]
+
+
+def test_refilter_after_extend(model):
+    model.refilter("/0*")
+    assert paths(model) == []
+    model.extend([SimpleNamespace(status="U", path="/0", actual=None)])
+    assert paths(model) == ["/0"]
+
+
+def test_extend_appends_until_sorted(model):
+    inserted = []
+    model.connect("row-inserted", lambda m, path, it: inserted.append(str(path)))
+    model.extend([SimpleNamespace(status="U", path="/0", actual=None)])
+    assert inserted == ["3"]
+    assert paths(model) == ["/a", "/b", "/c", "/0"]
+
+    reordered = MagicMock()
+    model.connect("rows-reordered", reordered)
+    model.sort(2, Gtk.SortType.ASCENDING)
+    reordered.assert_called_once()
+    assert paths(model) == ["/0", "/a", "/b", "/c"]
+
+
+def test_pinned_rows_first(model):
+    pinned = SimpleNamespace(status="D", path="/z")
+    model.pin(pinned, ["D", "/z", pinned])
+    assert paths(model) == ["/z", "/a", "/b", "/c"]
+    model.refilter("/a")
+    assert paths(model) == ["/a"]
+    model.refilter("status:d")
+    assert paths(model) == ["/z", "/c"]
+
+
+def test_rows_made_on_demand():
+    row_func = MagicMock(side_effect=lambda e: [e.status, e.path, e])
+    model = TrustListModel((str, str, object), row_func)
+    model.extend(_entries)
+    row_func.assert_not_called()
+    assert model[0][1] == "/b"
+    row_func.assert_called_once_with(_entries[0])
@@ -216,8 +216,8 @@ def restore_system_checkpoint() -> Action:
     return _create_action(RESTORE_SYSTEM_CHECKPOINT)
 
 
-def request_events(log_type: LogType, file: str = None) -> Action:
-    return _create_action(REQUEST_EVENTS, (log_type, file))
+def request_events(log_type: LogType, file: str = None, begin: int = None) -> Action:
+    return _create_action(REQUEST_EVENTS, (log_type, file, begin))
 
 
 def received_events(events: Sequence[Event]) -> Action:
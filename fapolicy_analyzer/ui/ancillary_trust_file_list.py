@@ -87,9 +87,8 @@ class AncillaryTrustFileList(TrustFileList):
     def set_changesets(self, changesets):
         self.__changeset_map = self._changesets_to_map(changesets)
 
-    def init_list(self, count_of_trust_entries):
-        store = Gtk.ListStore(str, str, str, object, str, str, str)
-        self.load_store(count_of_trust_entries, store)
+    def _column_types(self):
+        return (*super()._column_types(), str)
 
     def load_store(self, count_of_trust_entries, store):
         # Hide changes column if there are no changes
@@ -103,7 +102,8 @@ class AncillaryTrustFileList(TrustFileList):
             data = SimpleNamespace(path=pth, status=status)
             secs_epoch = int(os.path.getmtime(pth)) if file_exists else None
             date_time = epoch_to_string(secs_epoch)
-            store.append(
+            store.pin(
+                data,
                 [
                     "T/D",
                     date_time,
@@ -112,7 +112,7 @@ class AncillaryTrustFileList(TrustFileList):
                     Colors.WHITE,
                     Colors.BLACK,
                     strings.CHANGESET_ACTION_DEL,
-                ]
+                ],
             )
 
         super().load_store(count_of_trust_entries, store)
@@ -14,7 +14,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import json
 from abc import ABC, abstractmethod
-from typing import Dict, Generic, TypeVar, List
+from typing import Any, Dict, Generic, List, Optional, TypeVar
 
 import fapolicy_analyzer
 from fapolicy_analyzer import System, ConfigInfo
@@ -31,6 +31,11 @@ class Changeset(ABC, Generic[T]):
     def apply_to_system(self, system: System) -> System:
         """Apply this changeset to the given system"""
 
+    @property
+    @abstractmethod
+    def wrapped(self) -> Any:
+        """The native changeset wrapped by this changeset"""
+
     @abstractmethod
     def serialize(self) -> T:
         """Serialize this changeset to a serializable object"""
@@ -77,6 +82,10 @@ class ConfigChangeset(Changeset[str]):
     def apply_to_system(self, system: System) -> System:
         return system.apply_config_changes(self.__wrapped)
 
+    @property
+    def wrapped(self) -> Any:
+        return self.__wrapped
+
     def serialize(self) -> Dict[str, str]:
         return {
             "type": "config",
@@ -91,8 +100,13 @@ class ConfigChangeset(Changeset[str]):
 
 
 class RuleChangeset(Changeset[str]):
-    def __init__(self):
-        self.__wrapped = fapolicy_analyzer.RuleChangeset()
+    def __init__(self, previous: Optional["RuleChangeset"] = None):
+        # an edit of the rules of a previous changeset is parsed incrementally
+        self.__wrapped = (
+            previous.wrapped.successor()
+            if previous is not None
+            else fapolicy_analyzer.RuleChangeset()
+        )
 
     def parse(self, change: str):
         self.__wrapped.parse(change)
@@ -103,6 +117,10 @@ class RuleChangeset(Changeset[str]):
     def apply_to_system(self, system: System) -> System:
         return system.apply_rule_changes(self.__wrapped)
 
+    @property
+    def wrapped(self) -> Any:
+        return self.__wrapped
+
     def serialize(self) -> Dict[str, str]:
         return {"type": "rules", "data": self.__wrapped.text()}
 
@@ -129,6 +147,10 @@ class TrustChangeset(Changeset[Dict[str, str]]):
     def apply_to_system(self, system: System) -> System:
         return system.apply_changeset(self.__wrapped)
 
+    @property
+    def wrapped(self) -> Any:
+        return self.__wrapped
+
     def serialize(self) -> Dict[str, str]:
         return {
             "type": "trust",
@@ -17,7 +17,7 @@ from locale import gettext as _
 from typing import Sequence, Tuple
 
 import gi
-from fapolicy_analyzer import System
+from fapolicy_analyzer import System, trust_difference
 from fapolicy_analyzer.ui.rules.rules_difference_dialog import (
     RulesDifferenceDialog,
     filter_rule_diff,
@@ -130,11 +130,20 @@ class ConfirmDeploymentDialog(UIBuilderWidget):
             return ([(_(message), "Config")], diffs)
 
         def trust_changes():
+            trust_changesets = [e for e in changesets if isinstance(e, TrustChangeset)]
+            if not trust_changesets:
+                return []
+            if not previous_system or not current_system:
+                return [
+                    t
+                    for e in trust_changesets
+                    for t in json.loads(e.serialize()["data"]).items()
+                ]
+            # the net change to trust, modified entries were added again
+            added, removed, modified = trust_difference(previous_system, current_system)
             return [
-                t
-                for e in changesets
-                if isinstance(e, TrustChangeset)
-                for t in json.loads(e.serialize()["data"]).items()
+                *((p, "Add") for p in sorted(added + modified)),
+                *((p, "Del") for p in removed),
             ]
 
         rule_messages, rule_diff = rules_changes()
@@ -17,8 +17,8 @@ import logging
 import time
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-from threading import Event
-from typing import Callable, Dict, Sequence
+from threading import Lock
+from typing import Callable, Dict, Optional, Sequence, Tuple
 
 import gi
 from rx import of
@@ -26,8 +26,10 @@ from rx.core.pipe import pipe
 from rx.operators import catch, filter, map
 
 from fapolicy_analyzer import (
+    EventLog,
     System,
     Trust,
+    TrustCheck,
     check_ancillary_trust,
     check_system_trust,
     rollback_fapolicyd,
@@ -108,8 +110,17 @@ def create_system_feature(
               a new System object will be initialized.  Used for testing purposes only.
     """
 
-    system_trust_checks: Dict[System, Event] = {}
-    ancillary_trust_checks: Dict[System, Event] = {}
+    system_trust_checks: Dict[System, TrustCheck] = {}
+    ancillary_trust_checks: Dict[System, TrustCheck] = {}
+    # guards registering a check against its completion callback
+    trust_checks_lock = Lock()
+    # logs followed on the current system by type and file, with the start of
+    # the window they were read from and the trust version they analyze with
+    followed_logs: Dict[
+        Tuple[LogType, Optional[str]], Tuple[Optional[int], EventLog, int]
+    ] = {}
+    # counts the trust updates merged into the current system
+    trust_version = 0
 
     def _init_system() -> Action:
         def execute_system():
@@ -146,30 +157,30 @@ def create_system_feature(
     def _idle_dispatch(action: Action):
         GLib.idle_add(dispatch, action)
 
+    def _cancel_superseded(checks: Dict[System, TrustCheck], current: System):
+        # checks still running against any other system are replaced
+        with trust_checks_lock:
+            for system in [s for s in checks if s is not current]:
+                checks.pop(system).cancel()
+
     def _set_system(system: System):
         global _system
         nonlocal ancillary_trust_checks, system_trust_checks
 
-        events = [
-            e
-            for e in (
-                ancillary_trust_checks.pop(system, None),
-                system_trust_checks.pop(system, None),
-            )
-            if e
-        ]
-        for e in events:
-            e.set()
+        _cancel_superseded(ancillary_trust_checks, system)
+        _cancel_superseded(system_trust_checks, system)
 
+        # events are analyzed against the trust of the system they were read with
+        followed_logs.clear()
         _system = system
 
     def _apply_changesets(action: Action) -> Action:
         global _system
         changesets = action.payload
 
-        for c in changesets:
-            _system = c.apply_to_system(_system)
-            _set_system(_system)
+        # the changesets are folded into a single new system
+        _system = _system.apply_changesets([c.wrapped for c in changesets])
+        _set_system(_system)
 
         dispatch(system_received(_system))
         return add_changesets(changesets)
@@ -178,86 +189,87 @@ def create_system_feature(
         updates: Sequence[Trust],
         count: int,
         action_fn: Callable[[Trust, int, float], Action],
-        event: Event,
         timestamp: float,
     ):
-        if event.is_set():
-            return
-
+        nonlocal trust_version
         # merge the updated trust into the system
         _system.merge(updates)
+        trust_version += 1
         # dispatch the update
         _idle_dispatch(action_fn(updates, count, timestamp))
 
     def _check_disk_trust_complete(
         action_fn: Callable[[float], Action],
         flag_fn: Callable[[], None],
-        event: Event,
         timestamp: float,
     ):
-        if not event.is_set():
-            _idle_dispatch(action_fn(timestamp))
+        # a cancelled check never completes
+        _idle_dispatch(action_fn(timestamp))
         flag_fn()
 
     def _get_ancillary_trust(action: Action) -> Action:
         nonlocal ancillary_trust_checks
 
+        system = _system
+
         def checking_finished():
             nonlocal ancillary_trust_checks
-            ancillary_trust_checks.pop(_system)
+            with trust_checks_lock:
+                ancillary_trust_checks.pop(system, None)
 
         if _system in ancillary_trust_checks:
             return action
 
-        event = Event()
+        _cancel_superseded(ancillary_trust_checks, system)
         timestamp = time.time()
-        ancillary_trust_checks[_system] = event
 
         update = partial(
             _check_disk_trust_update,
             action_fn=received_ancillary_trust_update,
-            event=event,
             timestamp=timestamp,
         )
         done = partial(
             _check_disk_trust_complete,
             action_fn=ancillary_trust_load_complete,
             flag_fn=checking_finished,
-            event=event,
             timestamp=timestamp,
         )
-        total_to_check = check_ancillary_trust(_system, update, done)
-        return ancillary_trust_load_started(total_to_check, timestamp)
+        with trust_checks_lock:
+            check = check_ancillary_trust(_system, update, done)
+            ancillary_trust_checks[system] = check
+        return ancillary_trust_load_started(check.total, timestamp)
 
     def _get_system_trust(action: Action) -> Action:
         nonlocal system_trust_checks
 
+        system = _system
+
         def checking_finished():
             nonlocal system_trust_checks
-            system_trust_checks.pop(_system)
+            with trust_checks_lock:
+                system_trust_checks.pop(system, None)
 
         if _system in system_trust_checks:
             return action
 
-        event = Event()
+        _cancel_superseded(system_trust_checks, system)
         timestamp = time.time()
-        system_trust_checks[_system] = event
 
         update = partial(
             _check_disk_trust_update,
             action_fn=received_system_trust_update,
-            event=event,
             timestamp=timestamp,
         )
         done = partial(
             _check_disk_trust_complete,
             action_fn=system_trust_load_complete,
             flag_fn=checking_finished,
-            event=event,
             timestamp=timestamp,
         )
-        total_to_check = check_system_trust(_system, update, done)
-        return system_trust_load_started(total_to_check, timestamp)
+        with trust_checks_lock:
+            check = check_system_trust(_system, update, done)
+            system_trust_checks[system] = check
+        return system_trust_load_started(check.total, timestamp)
 
     def _deploy_system(_: Action) -> Action:
         if not fapd_dbase_snapshot():
@@ -278,15 +290,31 @@ def create_system_feature(
         return system_received(_system)
 
     def _get_events(action: Action) -> Action:
-        log_type, file = action.payload
+        log_type, file, begin = action.payload
+        key = (log_type, file)
+
+        # a followed log only reads what was logged since it was last read,
+        # it is reused unless the window now starts before what it has read
+        if key in followed_logs:
+            start, events, version = followed_logs[key]
+            if start is None or (begin is not None and begin >= start):
+                # trust merged since the log was read replaces the trust it has
+                if version == trust_version:
+                    events.refresh()
+                else:
+                    events.refresh(_system)
+                    followed_logs[key] = (start, events, trust_version)
+                return received_events(events)
+
         if log_type == LogType.debug:
-            events = _system.load_debuglog(file)
+            events = _system.follow_debuglog(file, begin)
         elif log_type == LogType.audit:
-            events = _system.load_auditlog()
+            events = _system.follow_auditlog(begin)
         elif log_type == LogType.syslog:
-            events = _system.load_syslog()
+            events = _system.follow_syslog(begin)
         else:
-            events = []
+            return received_events([])
+        followed_logs[key] = (begin, events, trust_version)
         return received_events(events)
 
     def _get_users(_: Action) -> Action:
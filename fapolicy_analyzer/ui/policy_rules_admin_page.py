@@ -216,18 +216,24 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
         self.__groups_loading = True
         dispatch(request_users())
         dispatch(request_groups())
+        # only the selected time window is read from the log
         if self.__which_log == LogType.syslog:
             self.__events_loading = True
-            dispatch(request_events(LogType.syslog))
+            dispatch(request_events(LogType.syslog, begin=self.__time_window_start()))
             self.get_object("time_bar").set_visible(True)
         elif self.__which_log == LogType.audit:
             self.__events_loading = True
-            dispatch(request_events(LogType.audit))
+            dispatch(request_events(LogType.audit, begin=self.__time_window_start()))
             self.get_object("time_bar").set_visible(True)
         elif self.__audit_file:
             self.__events_loading = True
             dispatch(request_events(LogType.debug, self.__audit_file))
 
+    def __time_window_start(self) -> int:
+        tzdelta = int(time.localtime().tm_gmtoff)
+        delay = 3600 if self._time_delay < 0 else self._time_delay
+        return int(time.time()) + tzdelta - delay
+
     def __populate_list(
         self,
         list,
@@ -463,18 +469,11 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
                     NotificationType.ERROR,
                 )
             )
-        elif (
-            self.__events_loading
-            and not eventsState.loading
-            and self.__log != eventsState.log
-        ):
+        elif self.__events_loading and not eventsState.loading:
+            # a followed log is refreshed in place, so the same log is received again
             self.__events_loading = False
             self.__log = eventsState.log
-            tzdelta = int(time.localtime().tm_gmtoff)
-            if self._time_delay < 0:
-                self.__log.begin(int(time.time()) + tzdelta - 3600)
-            else:
-                self.__log.begin(int(time.time()) + tzdelta - self._time_delay)
+            self.__log.begin(self.__time_window_start())
             exec_primary_data_func()
 
         if userState.error and not userState.loading and self.__users_loading:
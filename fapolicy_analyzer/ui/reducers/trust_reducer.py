@@ -29,6 +29,7 @@ from fapolicy_analyzer.ui.actions import (
     SYSTEM_TRUST_LOAD_COMPLETE,
     SYSTEM_TRUST_LOAD_STARTED,
 )
+from fapolicy_analyzer.util.chunked_list import ChunkedList
 
 
 class TrustState(NamedTuple):
@@ -58,7 +59,7 @@ def handle_trust_load_started(state: TrustState, action: Action) -> TrustState:
         state,
         loading=True,
         percent_complete=0,
-        trust=[],
+        trust=ChunkedList(),
         last_set_completed=None,
         error=None,
         trust_count=count,
@@ -73,12 +74,18 @@ def handle_received_trust_update(state: TrustState, action: Action) -> TrustStat
     if timestamp < state.timestamp:
         return state
 
+    # updates are appended as chunks shared with the previous state
+    trust = (
+        state.trust
+        if isinstance(state.trust, ChunkedList)
+        else ChunkedList(state.trust)
+    )
     return _create_state(
         state,
         percent_complete=running_count / state.trust_count * 100
         if state.trust_count != 0
         else 100,
-        trust=[*state.trust, *update],
+        trust=trust.append(update),
         last_set_completed=update,
         error=None,
         timestamp=timestamp,
@@ -110,7 +117,7 @@ system_trust_reducer: Reducer = handle_actions(
     },
     TrustState(
         error=None,
-        trust=[],
+        trust=ChunkedList(),
         loading=False,
         percent_complete=-1,
         last_set_completed=None,
@@ -129,7 +136,7 @@ ancillary_trust_reducer: Reducer = handle_actions(
     },
     TrustState(
         error=None,
-        trust=[],
+        trust=ChunkedList(),
         loading=False,
         percent_complete=-1,
         last_set_completed=None,
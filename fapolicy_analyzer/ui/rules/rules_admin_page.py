@@ -17,7 +17,7 @@ import gi
 import logging
 from typing import Any, Optional, Sequence, Tuple
 
-from fapolicy_analyzer import Rule, System
+from fapolicy_analyzer import Rule, System, invalidate_rule_paths
 from fapolicy_analyzer.ui.actions import (
     Notification,
     NotificationType,
@@ -95,6 +95,7 @@ class RulesAdminPage(UIConnectedWidget, UIPage):
         self.__loading_rules: bool = False
         self.__loading_text: bool = False
         self.__changesets: Sequence[Changeset] = []
+        self.__last_changeset: Optional[RuleChangeset] = None
         self.__saving: bool = False
         self._unsaved_changes = False
         self._first_pass = True
@@ -132,6 +133,8 @@ class RulesAdminPage(UIConnectedWidget, UIPage):
         self.get_object("statusInfoContainer").add(self.__status_info.get_ref())
 
     def __load_rules(self):
+        # paths may have changed on disk since the rules were last linted
+        invalidate_rule_paths()
         self.__loading_rules = True
         dispatch(request_rules())
         self.__loading_text = True
@@ -161,7 +164,8 @@ class RulesAdminPage(UIConnectedWidget, UIPage):
     def __build_and_validate_changeset(
         self, show_notifications=True
     ) -> Tuple[RuleChangeset, bool]:
-        changeset = RuleChangeset()
+        # each validation parses the edits since the last one incrementally
+        changeset = RuleChangeset(self.__last_changeset)
         valid = True
 
         try:
@@ -176,6 +180,7 @@ class RulesAdminPage(UIConnectedWidget, UIPage):
             )
             return changeset, False
 
+        self.__last_changeset = changeset
         self.__rules_validated = True
         self.__clear_validation_notifications()
         rules = changeset.rules()
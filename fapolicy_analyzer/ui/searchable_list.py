@@ -17,6 +17,7 @@ from typing import Any
 
 import gi
 
+from fapolicy_analyzer import PathIndex
 from fapolicy_analyzer.ui.strings import FILTERING_DISABLED_DURING_LOADING_MESSAGE
 
 gi.require_version("Gtk", "3.0")
@@ -57,6 +58,9 @@ class SearchableList(UIBuilderWidget, Events):
             return tree_view, tree_selection
 
         self.searchColumnIndex = searchColumnIndex
+        self.__rows = None
+        self.__search_index = None
+        self.__search_keys = []
         self.defaultSortIndex = defaultSortIndex
         self.defaultSortDirection = defaultSortDirection
         self.treeCount = self.get_object("treeCount")
@@ -71,9 +75,53 @@ class SearchableList(UIBuilderWidget, Events):
         )  # progress bar only show when needed
         self.set_action_buttons(*actionButtons)
 
-    def _filter_view(self, model, iter, data):
+    def __index_rows(self, store):
+        # the searched column of every row is indexed when the store is loaded,
+        # each position of the index is kept with the path of its row
+        rows = []
+        store.foreach(
+            lambda model, path, iter: rows.append(
+                (tuple(path.get_indices()), model[iter][self.searchColumnIndex])
+            )
+        )
+        self.__search_keys = [key for key, _ in rows]
+        self.__search_index = PathIndex(
+            ["" if text is None else str(text) for _, text in rows]
+        )
+
+    def __search_rows(self, store):
+        # a copy of the store with only the rows at the positions found by the
+        # search, a child row is only kept along with its parent
         filter = self.get_object("search").get_text()
-        return True if not filter else filter in model[iter][self.searchColumnIndex]
+        if not filter or self.__search_index is None:
+            return store
+
+        columns = range(store.get_n_columns())
+        nested = isinstance(store, Gtk.TreeStore)
+        found = (Gtk.TreeStore if nested else Gtk.ListStore)(
+            *[store.get_column_type(c) for c in columns]
+        )
+        copied = {}
+        for i in self.__search_index.search(filter):
+            key = self.__search_keys[i]
+            values = list(store.get(store.get_iter(key), *columns))
+            if not nested:
+                found.append(values)
+            elif len(key) == 1:
+                copied[key] = found.append(None, values)
+            elif key[:-1] in copied:
+                copied[key] = found.append(copied[key[:-1]], values)
+        return found
+
+    def __apply_prev_sort(self, model):
+        currentModel = self.treeView.get_model()
+        currentSort = (
+            currentModel.get_sort_column_id()
+            if currentModel and all(currentModel)
+            else (self.defaultSortIndex, self.defaultSortDirection)
+        )
+        model.set_sort_column_id(*currentSort)
+        return model
 
     def _load_data(self):
         pass
@@ -101,23 +149,15 @@ class SearchableList(UIBuilderWidget, Events):
         self.progress_bar.set_fraction(progress_pct / 100)
 
     def load_store(self, store, filterable=True, **kwargs):
-        def apply_prev_sort(model):
-            currentModel = self.treeView.get_model()
-            currentSort = (
-                currentModel.get_sort_column_id()
-                if currentModel and all(currentModel)
-                else (self.defaultSortIndex, self.defaultSortDirection)
-            )
-            model.set_sort_column_id(*currentSort)
-            return model
-
+        self.__search_index = None
         if filterable:
-            self._store = store.filter_new()
-            self._store.set_visible_func(self._filter_view)
-            model = apply_prev_sort(Gtk.TreeModelSort(model=self._store))
+            self.__rows = store
+            self.__index_rows(store)
+            self._store = self.__search_rows(store).filter_new()
+            model = self.__apply_prev_sort(Gtk.TreeModelSort(model=self._store))
         else:
             self._store = store
-            model = apply_prev_sort(store)
+            model = self.__apply_prev_sort(store)
 
         self.treeView.set_model(model)
         if self.treeView.get_selection():
@@ -185,5 +225,10 @@ class SearchableList(UIBuilderWidget, Events):
         self.selection_changed(data)
 
     def on_search_activate(self, *args):
-        self._store.refilter()
+        if self.__search_index is None:
+            return
+        self._store = self.__search_rows(self.__rows).filter_new()
+        self.treeView.set_model(
+            self.__apply_prev_sort(Gtk.TreeModelSort(model=self._store))
+        )
         self._update_list_status(self._get_tree_count())
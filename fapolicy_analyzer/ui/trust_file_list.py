@@ -13,9 +13,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from locale import gettext as _  # skip
-from queue import Queue
 from threading import Event
 from time import localtime, mktime, strftime, strptime
 
@@ -29,6 +28,7 @@ from fapolicy_analyzer.ui.strings import (
     FILES_LABEL,
     FILTERING_DISABLED_DURING_LOADING_MESSAGE,
 )
+from fapolicy_analyzer.ui.trust_list_model import TrustListModel
 from fapolicy_analyzer.util.format import f
 
 gi.require_version("Gtk", "3.0")
@@ -69,8 +69,13 @@ class TrustFileList(SearchableList):
         )
         self.trust_func = trust_func
         self.markup_func = markup_func
-        self.__executor = ThreadPoolExecutor(max_workers=100)
         self.__event = Event()
+        self.__pending = []
+        self.__sort_column = (self.defaultSortIndex, self.defaultSortDirection)
+        self.__sort_ids = {}
+        self.__init_sorting()
+        self.treeView.set_fixed_height_mode(True)
+        self.treeView.get_selection().connect("changed", self.on_view_selection_changed)
         self.refresh()
         self.selection_changed += self.__handle_selection_changed
         self.get_ref().connect("destroy", self.on_destroy)
@@ -80,6 +85,51 @@ class TrustFileList(SearchableList):
         trust = [datum[3] for datum in data] if data else None
         self.trust_selection_changed(trust)
 
+    def __init_sorting(self):
+        columns = self.treeView.get_columns()
+        for column in columns:
+            # rows are a single line, fixed height mode needs fixed columns
+            column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            column.set_fixed_width(100)
+            column.set_resizable(True)
+
+            # the model sorts by its own indexes, so the columns sort it directly
+            column_id = column.get_sort_column_id()
+            if column_id >= 0:
+                column.set_sort_column_id(-1)
+                column.set_clickable(True)
+                column.connect("clicked", self.__on_column_clicked, column_id)
+                self.__sort_ids[column] = column_id
+        columns[-1].set_expand(True)
+        self.__show_sort_indicator()
+
+    def __on_column_clicked(self, column, column_id):
+        sort_id, direction = self.__sort_column
+        direction = (
+            Gtk.SortType.DESCENDING
+            if sort_id == column_id and direction == Gtk.SortType.ASCENDING
+            else Gtk.SortType.ASCENDING
+        )
+        self.__sort_column = (column_id, direction)
+        self.__show_sort_indicator()
+        if isinstance(getattr(self, "_store", None), TrustListModel):
+            self._store.sort(column_id, direction)
+
+    def __show_sort_indicator(self):
+        sort_id, direction = self.__sort_column
+        for column, column_id in self.__sort_ids.items():
+            column.set_sort_indicator(column_id == sort_id)
+            column.set_sort_order(direction)
+
+    def __update_model(self, update):
+        # filtering is not signalled by the model, the view is rebuilt around it
+        model = getattr(self, "_store", None)
+        if not isinstance(model, TrustListModel):
+            return
+        self.treeView.set_model(None)
+        update(model)
+        self.treeView.set_model(model)
+
     def _columns(self):
         def txt_color_func(col, renderer, model, iter, *args):
             color = model.get_value(iter, 5)
@@ -140,66 +190,64 @@ class TrustFileList(SearchableList):
 
     def on_destroy(self, *args):
         self.__event.set()
-        self.__executor.shutdown()
         return False
 
     def refresh(self):
         self.trust_func()
 
+    def _column_types(self):
+        return (str, str, str, object, str, str)
+
+    def _create_model(self):
+        return TrustListModel(self._column_types(), self._row_data, self.__sort_column)
+
     def init_list(self, count_of_trust_entries):
-        store = Gtk.ListStore(str, str, str, object, str, str)
-        self.load_store(count_of_trust_entries, store)
+        self.load_store(count_of_trust_entries, self._create_model())
 
     def load_store(self, count_of_trust_entries, store):
-        def process_rows(queue, total, store, event):
-            columns = range(store.get_n_columns())
-            for i in range(200):
-                if queue.empty() or event.is_set():
-                    break
-                row = queue.get()
-                store.insert_with_valuesv(-1, columns, row)
-                queue.task_done()
-
+        def process_rows(total, event):
             if event.is_set():
                 return False
 
-            count = self._get_tree_count()
+            if self.__pending:
+                # the new rows are shown as they arrive and sorted once loaded
+                batches, self.__pending = self.__pending, []
+                self._store.extend(chain(*batches))
+
+            count = self._store.entry_count
             if count < total:
                 pct = int(count / total * 100)
                 self._update_loading_status(f(_("Loading trust {pct}% complete...")))
                 self._update_progress(pct)
                 return True
             else:
-                super(TrustFileList, self).load_store(store)
+                self._store.sort(*self.__sort_column)
+                self._update_list_status(self._get_tree_count())
                 self._update_progress(100)
                 self.search.set_sensitive(True)
                 self.search.set_tooltip_text(None)
                 return False
 
         self.__event.set()  # cancel any processing currently running
-        super().load_store(store, filterable=False)
+        self._store = store
+        self.treeView.set_model(store)
         self._update_loading_status("Loading trust 0% complete...")
         self.set_loading(False)
         self.search.set_sensitive(False)
         self.search.set_tooltip_text(FILTERING_DISABLED_DURING_LOADING_MESSAGE)
         self.total = count_of_trust_entries
-        self.__queue = Queue()
+        self.__pending = []
         self.__event = Event()
-        GLib.timeout_add(
-            200,
-            process_rows,
-            self.__queue,
-            count_of_trust_entries,
-            self._store,
-            self.__event,
-        )
+        GLib.timeout_add(200, process_rows, count_of_trust_entries, self.__event)
 
     def append_trust(self, trust):
-        def process_trust(trust, event):
-            for data in trust:
-                if event.is_set():
-                    return
-                self.__queue.put(self._row_data(data))
-
+        # rows are only made when they are shown, the entries are queued as is
         if not self.__event.is_set():
-            self.__executor.submit(process_trust, trust, self.__event)
+            self.__pending.append(trust)
+
+    def on_search_activate(self, *args):
+        text = self.search.get_text()
+        if not isinstance(getattr(self, "_store", None), TrustListModel):
+            return
+        self.__update_model(lambda model: model.refilter(text))
+        self._update_list_status(self._get_tree_count())
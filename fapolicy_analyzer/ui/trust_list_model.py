@@ -0,0 +1,249 @@
+# Copyright Concurrent Technologies Corporation 2021
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import gi
+
+from fapolicy_analyzer import PathIndex, Trust, trust_sort_index
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GObject, Gtk  # isort: skip
+
+# model columns that are sorted by a property of the trust entry
+SORT_KEYS = {0: "status", 1: "mtime", 2: "path"}
+
+_GTYPES = {
+    str: GObject.TYPE_STRING,
+    int: GObject.TYPE_INT,
+    object: GObject.TYPE_PYOBJECT,
+}
+
+_ENTRY_KEYS: Dict[str, Callable[[Any], Any]] = {
+    "status": lambda e: (e.status, e.path),
+    "mtime": lambda e: (e.actual.last_modified if e.actual else -1, e.path),
+    "path": lambda e: e.path,
+}
+
+# bound on the rows kept materialized, a few screens worth
+_ROW_CACHE_SIZE = 1024
+
+
+def sort_index(entries: Sequence[Any], key: str) -> List[int]:
+    """
+    Positions of the entries ordered by status, mtime, or path.
+
+    Trust entries are ordered by the native index, other entries such as the
+    pending deletes of the ancillary list are ordered here.
+    """
+    if all(isinstance(e, Trust) for e in entries):
+        return trust_sort_index(entries, key)
+    return sorted(range(len(entries)), key=lambda i: _ENTRY_KEYS[key](entries[i]))
+
+
+def _path_index(data: Sequence[Any]) -> PathIndex:
+    return PathIndex([d.path for d in data], [d.status for d in data])
+
+
+class TrustListModel(GObject.Object, Gtk.TreeModel):
+    """
+    A flat tree model that materializes the rows of trust entries on demand.
+
+    The entries are held by reference and turned into rows by the row function
+    only when the view asks for a value, so the cost of a model is the cost of
+    the rows on screen. Pinned rows are shown before the entries. The entries are
+    shown in the order of a list of positions that is rebuilt when the entries
+    are sorted or filtered; the orders of each sort column, and the path index
+    searched by the filter, are kept until the entries change.
+
+    Extended entries are shown after the rows already shown, in the order given,
+    until the model is sorted again; the inserted rows and the new order are
+    signalled to the view. Pinned and filtered rows are not signalled, the model
+    must be detached from the view while it is pinned or filtered.
+    """
+
+    def __init__(
+        self,
+        column_types: Sequence[type],
+        row_func: Callable[[Any], Sequence[Any]],
+        sort_column: Tuple[int, Gtk.SortType] = (2, Gtk.SortType.ASCENDING),
+    ):
+        super().__init__()
+        self.__column_types = [_GTYPES.get(t, t) for t in column_types]
+        self.__row_func = row_func
+        self.__entries: List[Any] = []
+        self.__pinned: List[Tuple[Any, Sequence[Any]]] = []
+        self.__sort_column = sort_column
+        self.__search: Optional[str] = None
+        self.__path_index: Optional[PathIndex] = None
+        self.__indexes: Dict[int, List[int]] = {}
+        self.__order: List[int] = []
+        self.__shown_pinned: List[Sequence[Any]] = []
+        self.__rows: Dict[int, Sequence[Any]] = {}
+
+    @property
+    def entry_count(self) -> int:
+        """The number of entries, filtered or not"""
+        return len(self.__entries)
+
+    def pin(self, data: Any, row: Sequence[Any]):
+        """Show a row ahead of the entries, the data is matched by filters"""
+        self.__pinned.append((data, row))
+        self.__rebuild()
+
+    def extend(self, entries: Iterable[Any]):
+        """Show the entries after the rows shown, each inserted row is signalled"""
+        first = len(self.__entries)
+        added = list(entries)
+        self.__entries.extend(added)
+        self.__indexes.clear()
+        self.__path_index = None
+
+        positions = range(first, first + len(added))
+        if self.__search:
+            mask = self.__matches(_path_index(added))
+            positions = [p for p in positions if mask[p - first]]
+        for p in positions:
+            self.__order.append(p)
+            n = len(self) - 1
+            self.row_inserted(Gtk.TreePath((n,)), self.__iter(n))
+
+    def get_sort_column(self) -> Tuple[int, Gtk.SortType]:
+        return self.__sort_column
+
+    def sort(self, column: int, direction: Gtk.SortType):
+        """Order the entries by the column, the new order is signalled"""
+        self.__sort_column = (column, direction)
+        shown = {p: n for n, p in enumerate(self.__order)}
+        self.__rebuild()
+        if not self.__order:
+            return
+        pinned = len(self.__shown_pinned)
+        new_order = [*range(pinned), *(pinned + shown[p] for p in self.__order)]
+        self.rows_reordered(Gtk.TreePath(), None, new_order)
+
+    def refilter(self, search: Optional[str] = None):
+        """Show only the pinned rows and entries that match the search text"""
+        self.__search = search or None
+        self.__rebuild()
+
+    def __index(self, column: int) -> List[int]:
+        if column not in self.__indexes:
+            self.__indexes[column] = (
+                sort_index(self.__entries, SORT_KEYS[column])
+                if column in SORT_KEYS
+                else sorted(
+                    range(len(self.__entries)),
+                    key=lambda i: self.__row_func(self.__entries[i])[column],
+                )
+            )
+        return self.__indexes[column]
+
+    def __matches(self, index: PathIndex) -> bytearray:
+        # a mask over the indexed positions that match the search
+        mask = bytearray(len(index))
+        for i in index.search(self.__search):
+            mask[i] = 1
+        return mask
+
+    def __rebuild(self):
+        column, direction = self.__sort_column
+        order = self.__index(column)
+        if direction == Gtk.SortType.DESCENDING:
+            order = order[::-1]
+        pinned = [r for _, r in self.__pinned]
+        if self.__search:
+            # the entries are indexed on the first search after they change
+            if self.__path_index is None:
+                self.__path_index = _path_index(self.__entries)
+            mask = self.__matches(self.__path_index)
+            order = [i for i in order if mask[i]]
+            mask = self.__matches(_path_index([d for d, _ in self.__pinned]))
+            pinned = [r for i, r in enumerate(pinned) if mask[i]]
+        self.__order = order
+        self.__shown_pinned = pinned
+        self.__rows.clear()
+
+    def __len__(self) -> int:
+        return len(self.__shown_pinned) + len(self.__order)
+
+    def __row(self, n: int) -> Sequence[Any]:
+        if n < len(self.__shown_pinned):
+            return self.__shown_pinned[n]
+        row = self.__rows.get(n)
+        if row is None:
+            if len(self.__rows) >= _ROW_CACHE_SIZE:
+                self.__rows.clear()
+            entry = self.__entries[self.__order[n - len(self.__shown_pinned)]]
+            row = self.__rows[n] = self.__row_func(entry)
+        return row
+
+    # iters carry the row number offset by one, a null user_data is not valid
+    def __iter(self, n: int) -> Gtk.TreeIter:
+        it = Gtk.TreeIter()
+        it.user_data = n + 1
+        return it
+
+    def do_get_flags(self):
+        return Gtk.TreeModelFlags.LIST_ONLY
+
+    def do_get_n_columns(self):
+        return len(self.__column_types)
+
+    def do_get_column_type(self, n):
+        return self.__column_types[n]
+
+    def do_get_iter(self, path):
+        indices = path.get_indices()
+        if len(indices) == 1 and 0 <= indices[0] < len(self):
+            return True, self.__iter(indices[0])
+        return False, None
+
+    def do_get_path(self, it):
+        return Gtk.TreePath((it.user_data - 1,))
+
+    def do_get_value(self, it, column):
+        return self.__row(it.user_data - 1)[column]
+
+    def do_iter_next(self, it):
+        if it.user_data < len(self):
+            it.user_data += 1
+            return True
+        return False
+
+    def do_iter_previous(self, it):
+        if it.user_data > 1:
+            it.user_data -= 1
+            return True
+        return False
+
+    def do_iter_children(self, parent):
+        if parent is None and len(self):
+            return True, self.__iter(0)
+        return False, None
+
+    def do_iter_has_child(self, it):
+        return False
+
+    def do_iter_n_children(self, it):
+        return len(self) if it is None else 0
+
+    def do_iter_nth_child(self, parent, n):
+        if parent is None and 0 <= n < len(self):
+            return True, self.__iter(n)
+        return False, None
+
+    def do_iter_parent(self, child):
+        return False, None
@@ -0,0 +1,93 @@
+# Copyright Concurrent Technologies Corporation 2021
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from bisect import bisect_right
+from itertools import chain, islice
+from typing import Generic, Iterable, Iterator, List, Sequence, TypeVar, Union, overload
+
+T = TypeVar("T")
+
+
+class ChunkedList(Sequence[T], Generic[T]):
+    """
+    An immutable sequence that is extended by appending chunks of items.
+
+    The chunks are kept in a list that is shared by every version derived from
+    the first, each version sees only the chunks that existed when it was made.
+    Appending to the newest version extends the shared list in place, so a
+    stream of updates costs time in proportion to the update and not to the
+    size of the sequence. Appending to an older version copies its chunk list
+    before extending it, leaving the newer versions untouched.
+    """
+
+    __slots__ = ("_chunks", "_ends", "_count")
+
+    def __init__(self, items: Iterable[T] = ()):
+        chunk = tuple(items)
+        self._chunks: List[Sequence[T]] = [chunk] if chunk else []
+        self._ends: List[int] = [len(chunk)] if chunk else []
+        self._count = len(self._chunks)
+
+    def append(self, items: Iterable[T]) -> "ChunkedList[T]":
+        """Returns a new version with the items appended as one chunk"""
+        chunk = tuple(items)
+        if not chunk:
+            return self
+
+        other = ChunkedList.__new__(ChunkedList)
+        if self._count == len(self._chunks):
+            other._chunks, other._ends = self._chunks, self._ends
+        else:
+            other._chunks = self._chunks[: self._count]
+            other._ends = self._ends[: self._count]
+        other._chunks.append(chunk)
+        other._ends.append(len(self) + len(chunk))
+        other._count = self._count + 1
+        return other
+
+    def __len__(self) -> int:
+        return self._ends[self._count - 1] if self._count else 0
+
+    def __iter__(self) -> Iterator[T]:
+        return chain.from_iterable(islice(self._chunks, self._count))
+
+    @overload
+    def __getitem__(self, index: int) -> T:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[T]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, Sequence[T]]:
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("ChunkedList index out of range")
+        c = bisect_right(self._ends, index, 0, self._count)
+        start = self._ends[c - 1] if c else 0
+        return self._chunks[c][index - start]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"ChunkedList({list(self)!r})"